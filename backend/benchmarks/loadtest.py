@@ -0,0 +1,215 @@
+"""HTTP load generator for a running API (see benchmarks.serve_stub for a local instance with stub models).
+
+Usage (from backend/):
+    python -m benchmarks.loadtest [--base-url http://127.0.0.1:8000] [--agents 20] [--readers 10]
+        [--uploaders 0] [--duration 120] [--call-seconds 60] [--chunk-seconds 5]
+        [--reader-interval 2] [--upload-interval 10] [--timeout 30] [--ramp-up 10] [--output FILE]
+
+Simulated agents stream a WAV chunk to /live/analyze-chunk every --chunk-seconds,
+like the live recorder does, and finish each call with /live/end-call. Dashboard
+readers cycle through /records, /api/statistics and /api/metrics/* and revalidate
+with If-None-Match like a browser would. Uploaders post whole calls to /analyze.
+
+Reports requests, throughput and p50/p95/p99 latency per endpoint, plus error and
+timeout rates, and optionally writes them as JSON.
+"""
+import argparse
+import asyncio
+import io
+import json
+import random
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+import soundfile as sf
+
+from .synthetic_audio import SAMPLE_RATE, synth_call, synth_voice
+
+DASHBOARD_PATHS = (
+    "/api/feeling-analytics/records?limit=50",
+    "/api/statistics",
+    "/api/metrics/agents",
+    "/api/metrics/emotions",
+    "/api/metrics/daily?days=30",
+)
+
+
+def wav_bytes(audio):
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class Stats:
+    """Latencies and outcomes per endpoint label"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.timeouts = defaultdict(int)
+
+    def record(self, label, seconds, status=None, error=None, timeout=False):
+        self.latencies[label].append(seconds)
+        if timeout:
+            self.timeouts[label] += 1
+        elif error is not None or status is None or status >= 400:
+            self.errors[label] += 1
+        if status is not None:
+            self.statuses[label][status] += 1
+
+    def summary(self, elapsed):
+        report = {}
+        for label, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            count = len(values)
+            report[label] = {
+                'requests': count,
+                'throughput_rps': count / elapsed,
+                'p50_ms': percentile(values, 50) * 1000,
+                'p95_ms': percentile(values, 95) * 1000,
+                'p99_ms': percentile(values, 99) * 1000,
+                'max_ms': values[-1] * 1000,
+                'error_rate': self.errors[label] / count,
+                'timeout_rate': self.timeouts[label] / count,
+                'statuses': dict(self.statuses[label]),
+            }
+        return report
+
+
+async def timed_request(client, stats, label, method, url, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.TimeoutException:
+        stats.record(label, time.perf_counter() - start, timeout=True)
+        return None
+    except httpx.HTTPError as e:
+        stats.record(label, time.perf_counter() - start, error=str(e))
+        return None
+    stats.record(label, time.perf_counter() - start, status=response.status_code)
+    return response
+
+
+async def simulate_agent(index, client, stats, args, deadline, chunk_payload, call_payload):
+    """One agent: back-to-back calls, a chunk every chunk_seconds, then end-call"""
+    await asyncio.sleep(random.uniform(0, args.ramp_up))
+    email = f"loadtest-agent-{index}@example.com"
+    chunks_per_call = max(1, int(args.call_seconds / args.chunk_seconds))
+    while time.monotonic() < deadline:
+        call_start = time.monotonic()
+        for chunk in range(chunks_per_call):
+            # Fixed cadence like the recorder's setInterval; a slow response delays only that chunk
+            await asyncio.sleep(max(0.0, call_start + (chunk + 1) * args.chunk_seconds - time.monotonic()))
+            if time.monotonic() >= deadline:
+                return
+            await timed_request(
+                client, stats, "POST /live/analyze-chunk", "POST",
+                "/api/feeling-analytics/live/analyze-chunk",
+                params={"channel": "caller"},
+                files={"audio": ("chunk.wav", chunk_payload, "audio/wav")},
+            )
+        await timed_request(
+            client, stats, "POST /live/end-call", "POST",
+            "/api/feeling-analytics/live/end-call",
+            params={"agent_email": email, "agent_name": f"Load Agent {index}", "analyze_channels": "both"},
+            files={"audio": ("call-recording.wav", call_payload, "audio/wav")},
+        )
+
+
+async def simulate_reader(client, stats, args, deadline):
+    """One dashboard: polls the read endpoints, revalidating with the last ETag"""
+    await asyncio.sleep(random.uniform(0, args.ramp_up))
+    etags = {}
+    paths = list(DASHBOARD_PATHS)
+    random.shuffle(paths)
+    while time.monotonic() < deadline:
+        for path in paths:
+            headers = {"If-None-Match": etags[path]} if path in etags else {}
+            response = await timed_request(client, stats, f"GET {path.split('?')[0]}", "GET", path, headers=headers)
+            if response is not None and response.headers.get("etag"):
+                etags[path] = response.headers["etag"]
+        await asyncio.sleep(args.reader_interval)
+
+
+async def simulate_uploader(index, client, stats, args, deadline, call_payload):
+    """Whole-call uploads to the synchronous /analyze endpoint"""
+    await asyncio.sleep(random.uniform(0, args.ramp_up))
+    sequence = 0
+    while time.monotonic() < deadline:
+        sequence += 1
+        await timed_request(
+            client, stats, "POST /analyze", "POST", "/api/feeling-analytics/analyze",
+            data={"analyze_channels": "both", "agent_email": f"loadtest-uploader-{index}@example.com"},
+            files={"audio": (f"loadtest-{index}-{sequence}.wav", call_payload, "audio/wav")},
+        )
+        await asyncio.sleep(args.upload_interval)
+
+
+async def run(args):
+    chunk_payload = wav_bytes(synth_voice(args.chunk_seconds, SAMPLE_RATE))
+    call_payload = wav_bytes(synth_call(args.call_seconds, SAMPLE_RATE))
+    stats = Stats()
+    limits = httpx.Limits(max_connections=args.agents + args.readers + args.uploaders + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        started = time.monotonic()
+        deadline = started + args.duration
+        tasks = [
+            *(simulate_agent(i, client, stats, args, deadline, chunk_payload, call_payload) for i in range(args.agents)),
+            *(simulate_reader(client, stats, args, deadline) for _ in range(args.readers)),
+            *(simulate_uploader(i, client, stats, args, deadline, call_payload) for i in range(args.uploaders)),
+        ]
+        print(f"🚦 {args.agents} agents, {args.readers} dashboard readers, {args.uploaders} uploaders "
+              f"against {args.base_url} for {args.duration}s")
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - started
+    return stats.summary(elapsed), elapsed
+
+
+def print_report(report):
+    print(f"\n{'endpoint':<36} {'reqs':>6} {'rps':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err %':>6} {'t/o %':>6}")
+    for label, row in report.items():
+        print(f"{label:<36} {row['requests']:>6} {row['throughput_rps']:>7.2f} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['error_rate'] * 100:>6.1f} {row['timeout_rate'] * 100:>6.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--agents", type=int, default=20, help="Simulated agents streaming live calls")
+    parser.add_argument("--readers", type=int, default=10, help="Simulated dashboards")
+    parser.add_argument("--uploaders", type=int, default=0, help="Clients uploading whole calls to /analyze")
+    parser.add_argument("--duration", type=float, default=120, help="Test length in seconds")
+    parser.add_argument("--call-seconds", type=int, default=60)
+    parser.add_argument("--chunk-seconds", type=int, default=5)
+    parser.add_argument("--reader-interval", type=float, default=2.0)
+    parser.add_argument("--upload-interval", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="Spread client start times over this many seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args(argv)
+    random.seed(args.seed)
+
+    report, elapsed = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps({
+            'config': {key: value for key, value in vars(args).items() if key != 'output'},
+            'elapsed_s': elapsed,
+            'endpoints': report,
+        }, indent=2))
+        print(f"\n💾 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""Score parity and speed A/B between inference configurations.
+
+Usage (from backend/):
+    python -m benchmarks.parity [--corpus DIR] [--calls 12] [--seconds 8,20,45]
+        [--baseline torch/processor] [--candidates torch/torch,compile/torch,torchscript/torch,onnx/torch]
+        [--batch-size 8] [--models stub|real] [--whisper-size base] [--heads 10]
+        [--max-abs-error 0.01] [--mean-abs-error 0.002] [--min-spearman 0.99] [--output benchmarks/parity.json]
+
+A configuration is "<backend>/<frontend>": backend is an INFERENCE_BACKEND (torch,
+compile, torchscript, onnx; torchscript/onnx are exported from the loaded models
+into a temp dir first) and frontend the log-mel features (torch or processor).
+The baseline scores one channel at a time; candidates score --batch-size channels
+per analyze_channels call. All configurations share the same loaded models.
+
+The corpus is every channel of the recordings in --corpus (first 30 s, as the
+analyzer sees them), or --calls synthetic stereo calls of varying voices and
+lengths. --models real loads Whisper and the emotion heads as the API does;
+stub (default) uses randomly initialized models of the same shapes.
+
+For each emotion in MAIN_EMOTIONS with a head, reports the max and mean absolute
+score difference and the Spearman rank correlation against the baseline, next to
+latency per channel and peak RSS growth while scoring. Exits with status 1 when
+any candidate exceeds --max-abs-error or --mean-abs-error, or ranks below
+--min-spearman, on any emotion.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import torch
+from scipy.stats import spearmanr
+
+from feeling_analytics.services.audio_io import AUDIO_EXTENSIONS, decode_file
+from feeling_analytics.services.emotions import MAIN_EMOTIONS
+from feeling_analytics.services.features import LogMelFrontend
+from feeling_analytics.services.inference import EXPORTED_BACKENDS, INFERENCE_BACKENDS, export_scorer
+from feeling_analytics.services.stub_models import build_stub_analyzer
+
+from .synthetic_audio import SAMPLE_RATE, synth_voice
+
+FRONTENDS = ('torch', 'processor')
+# Spearman needs a few distinct scores to mean anything
+MIN_RANKED_ITEMS = 3
+
+
+def parse_config(spec):
+    backend, _, frontend = spec.strip().partition('/')
+    frontend = frontend or 'torch'
+    if backend not in INFERENCE_BACKENDS or frontend not in FRONTENDS:
+        raise argparse.ArgumentTypeError(
+            f"bad configuration {spec!r}: expected <{'|'.join(INFERENCE_BACKENDS)}>/<{'|'.join(FRONTENDS)}>"
+        )
+    return f"{backend}/{frontend}", backend, frontend
+
+
+def synthetic_corpus(calls, lengths):
+    """(name, waveform) per channel of `calls` synthetic calls with different voices and lengths"""
+    corpus = []
+    for index in range(calls):
+        seconds = lengths[index % len(lengths)]
+        for channel, f0 in (('caller', 100.0 + 9 * index), ('client', 180.0 + 13 * index)):
+            corpus.append((f"synthetic_{index}/{channel}", synth_voice(seconds, SAMPLE_RATE, f0=f0, seed=2 * index)))
+    return corpus
+
+
+def file_corpus(directory):
+    """(name, waveform) per channel of each recording under directory"""
+    directory = Path(directory)
+    corpus = []
+    for path in sorted(directory.rglob('*')):
+        if path.suffix.lower() not in AUDIO_EXTENSIONS or not path.is_file():
+            continue
+        decoded = decode_file(str(path))
+        if decoded['error']:
+            print(f"  (skipping {path}: {decoded['error']})")
+            continue
+        name = path.relative_to(directory).as_posix()
+        corpus.extend([(f"{name}/caller", decoded['caller']), (f"{name}/client", decoded['client'])])
+    return corpus
+
+
+def _rss_bytes():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+@contextmanager
+def peak_rss(interval=0.01):
+    """Yield a dict whose 'growth_bytes' is set to the peak RSS above the starting RSS on exit"""
+    result = {'growth_bytes': None}
+    if not os.path.exists('/proc/self/statm'):
+        yield result
+        return
+    start = peak = _rss_bytes()
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(interval):
+            peak = max(peak, _rss_bytes())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield result
+    finally:
+        done.set()
+        sampler.join()
+        result['growth_bytes'] = max(peak, _rss_bytes()) - start
+
+
+class Configurator:
+    """Switches one analyzer between configurations, exporting scorers on first use"""
+
+    def __init__(self, analyzer, workdir):
+        self.analyzer = analyzer
+        self.workdir = Path(workdir)
+        extractor = getattr(analyzer.whisper_processor, 'feature_extractor', analyzer.whisper_processor)
+        self.torch_frontend = LogMelFrontend.from_feature_extractor(extractor)
+        self.exported = set()
+
+    def apply(self, backend, frontend):
+        if backend in EXPORTED_BACKENDS and backend not in self.exported:
+            print(f"📦 Exporting scorer ({backend})...")
+            export_scorer(self.analyzer.build_scorer(), self.workdir, formats=[backend])
+            self.exported.add(backend)
+        self.analyzer.use_backend(backend, self.workdir)
+        self.analyzer.feature_frontend = self.torch_frontend if frontend == 'torch' else None
+
+
+def score(analyzer, corpus, batch_size):
+    """({name: all_scores}, per-channel seconds, peak RSS growth) scoring corpus in batches"""
+    scores, per_channel = {}, []
+    with peak_rss() as memory:
+        for start in range(0, len(corpus), batch_size):
+            batch = corpus[start:start + batch_size]
+            began = time.perf_counter()
+            results = analyzer.analyze_channels([waveform for _, waveform in batch])
+            elapsed = time.perf_counter() - began
+            per_channel.extend([elapsed / len(batch)] * len(batch))
+            for (name, _), result in zip(batch, results):
+                scores[name] = result['all_scores']
+    return scores, per_channel, memory['growth_bytes']
+
+
+def agreement(baseline, candidate, emotions):
+    """Per emotion: max/mean absolute difference and Spearman correlation over the corpus"""
+    names = sorted(baseline)
+    report = {}
+    for emotion in emotions:
+        expected = np.array([baseline[name][emotion] for name in names])
+        actual = np.array([candidate[name][emotion] for name in names])
+        errors = np.abs(actual - expected)
+        rho = None
+        if len(names) >= MIN_RANKED_ITEMS and np.ptp(expected) > 0 and np.ptp(actual) > 0:
+            rho = float(spearmanr(expected, actual).statistic)
+        report[emotion] = {
+            'max_abs_error': float(errors.max()),
+            'mean_abs_error': float(errors.mean()),
+            'spearman': rho,
+        }
+    return report
+
+
+def failures(report, args):
+    """'<emotion>: <reason>' for every threshold the candidate misses"""
+    failed = []
+    for emotion, metrics in report.items():
+        if metrics['max_abs_error'] > args.max_abs_error:
+            failed.append(f"{emotion}: max |Δ| {metrics['max_abs_error']:.2e} > {args.max_abs_error:g}")
+        if metrics['mean_abs_error'] > args.mean_abs_error:
+            failed.append(f"{emotion}: mean |Δ| {metrics['mean_abs_error']:.2e} > {args.mean_abs_error:g}")
+        if metrics['spearman'] is not None and metrics['spearman'] < args.min_spearman:
+            failed.append(f"{emotion}: spearman {metrics['spearman']:.4f} < {args.min_spearman:g}")
+    return failed
+
+
+def _timing(per_channel, memory):
+    return {
+        'median_channel_s': statistics.median(per_channel),
+        'total_s': sum(per_channel),
+        'peak_rss_growth_mb': None if memory is None else memory / 2**20,
+    }
+
+
+def load_analyzer(args):
+    if args.models == 'real':
+        from feeling_analytics.services.sentiment_analyzer import SentimentAnalyzer
+        print("🔧 Loading models (USE_LOCAL_MODELS / WHISPER_MODEL)...")
+        return SentimentAnalyzer(load_models=False).load_eager_models()
+    print(f"🔧 Building stub models (whisper-{args.whisper_size}, {args.heads} heads)...")
+    return build_stub_analyzer(args.whisper_size, MAIN_EMOTIONS[:args.heads])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.parity")
+    parser.add_argument("--corpus", default=None, help="Directory of recordings (default: synthetic calls)")
+    parser.add_argument("--calls", type=int, default=12, help="Synthetic calls when no --corpus is given")
+    parser.add_argument("--seconds", default="8,20,45", help="Synthetic call lengths, cycled, comma separated")
+    parser.add_argument("--baseline", type=parse_config, default="torch/processor")
+    parser.add_argument("--candidates", default="torch/torch,compile/torch,torchscript/torch,onnx/torch",
+                        help="Comma-separated <backend>/<frontend> configurations")
+    parser.add_argument("--batch-size", type=int, default=8, help="Channels per analyze_channels call for candidates")
+    parser.add_argument("--models", choices=["stub", "real"], default="stub")
+    parser.add_argument("--whisper-size", default="base", help="Stub encoder shape: tiny, base or small")
+    parser.add_argument("--heads", type=int, default=len(MAIN_EMOTIONS), help="Number of stub emotion heads")
+    parser.add_argument("--max-abs-error", type=float, default=0.01)
+    parser.add_argument("--mean-abs-error", type=float, default=0.002)
+    parser.add_argument("--min-spearman", type=float, default=0.99)
+    parser.add_argument("--output", default="benchmarks/parity.json")
+    args = parser.parse_args(argv)
+    candidates = [parse_config(spec) for spec in args.candidates.split(",") if spec.strip()]
+
+    analyzer = load_analyzer(args)
+    emotions = [emotion for emotion in MAIN_EMOTIONS if emotion in analyzer.mlp_models]
+    if args.corpus:
+        corpus = file_corpus(args.corpus)
+    else:
+        corpus = synthetic_corpus(args.calls, [int(value) for value in args.seconds.split(",") if value])
+    if not corpus:
+        raise SystemExit("Empty corpus")
+    print(f"🎧 Corpus: {len(corpus)} channels")
+
+    results, failed = {}, {}
+    with tempfile.TemporaryDirectory(prefix="feeling-parity-") as workdir:
+        configurator = Configurator(analyzer, workdir)
+        baseline_name, backend, frontend = args.baseline
+        configurator.apply(backend, frontend)
+        score(analyzer, corpus[:1], 1)  # warmup
+        reference, per_channel, memory = score(analyzer, corpus, 1)
+        results[baseline_name] = {'baseline': True, **_timing(per_channel, memory)}
+        print(f"\n{'configuration':<28} {'ms/channel':>11} {'peak RSS +MB':>13} "
+              f"{'max |Δ|':>10} {'mean |Δ|':>10} {'min ρ':>8}")
+        print(f"{baseline_name + ' (baseline)':<28} {results[baseline_name]['median_channel_s'] * 1000:11.1f} "
+              f"{(memory or 0) / 2**20:13.1f}")
+
+        for name, backend, frontend in candidates:
+            try:
+                configurator.apply(backend, frontend)
+                score(analyzer, corpus[:args.batch_size], args.batch_size)  # warmup (and torch.compile)
+                scores, per_channel, memory = score(analyzer, corpus, args.batch_size)
+            except Exception as e:
+                results[name] = {'error': str(e)}
+                failed[name] = [f"error: {e}"]
+                print(f"{name:<28} {'error':>11}: {e}")
+                continue
+            report = agreement(reference, scores, emotions)
+            results[name] = {'emotions': report, **_timing(per_channel, memory)}
+            missed = failures(report, args)
+            if missed:
+                failed[name] = missed
+            rhos = [metrics['spearman'] for metrics in report.values() if metrics['spearman'] is not None]
+            print(f"{name:<28} {results[name]['median_channel_s'] * 1000:11.1f} {(memory or 0) / 2**20:13.1f} "
+                  f"{max(m['max_abs_error'] for m in report.values()):10.2e} "
+                  f"{max(m['mean_abs_error'] for m in report.values()):10.2e} "
+                  f"{min(rhos) if rhos else float('nan'):8.4f}  {'❌' if missed else '✅'}")
+        analyzer.use_backend('torch')
+
+    report = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'torch': torch.__version__,
+            'torch_threads': torch.get_num_threads(),
+            'device': str(analyzer.device),
+            'models': args.models,
+            'whisper_size': args.whisper_size if args.models == 'stub' else None,
+            'corpus': args.corpus or f"synthetic:{args.calls}",
+            'channels': len(corpus),
+            'batch_size': args.batch_size,
+            'thresholds': {
+                'max_abs_error': args.max_abs_error,
+                'mean_abs_error': args.mean_abs_error,
+                'min_spearman': args.min_spearman,
+            },
+        },
+        'baseline': baseline_name,
+        'results': results,
+        'failures': failed,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n💾 Results written to {output}")
+
+    if failed:
+        for name, missed in failed.items():
+            for reason in missed:
+                print(f"❌ {name}: {reason}")
+        sys.exit(1)
+    print("\n✅ All candidates agree with the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Benchmark suite for the analysis pipeline, using stub models (no downloads, no model files).
+
+Usage (from backend/):
+    python -m benchmarks.run [--lengths 10,60,300] [--formats wav,flac,mp3] [--repeat 5] [--warmup 1]
+        [--whisper-size base] [--heads 10] [--output benchmarks/results.json]
+        [--baseline benchmarks/baseline.json] [--threshold 0.15] [--min-delta-ms 5] [--skip-route]
+        [--backend torch|compile|torchscript|onnx]
+
+Times each stage on synthetic stereo calls: _convert_to_wav, _load_stereo_audio, _stream_stereo_audio,
+feature extraction (torch frontend, and WhisperFeatureExtractor for reference, with
+the max difference between the two), Whisper encoder (+ projection), emotion heads, scoring
+through the --backend inference backend (with its max difference from the eager heads;
+torchscript/onnx are exported from the stub models first), analyze_audio end to end, and POST /api/feeling-analytics/live/analyze-chunk through a TestClient
+(needs the database configured in .env; skipped with --skip-route).
+
+Results are written as JSON keyed by "<stage>/<format>/<seconds>s". With --baseline,
+medians are compared against a previous results file and the command exits with
+status 1 if any stage got slower than --threshold (default 15%) and by more than
+--min-delta-ms. Compare only results produced on the same machine.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import torch
+
+from feeling_analytics.services.audio_io import MemoryBudget
+from feeling_analytics.services.emotions import MAIN_EMOTIONS
+from feeling_analytics.services.features import FEATURE_TOLERANCE, max_feature_error
+from feeling_analytics.services.inference import EXPORTED_BACKENDS, INFERENCE_BACKENDS, SCORE_TOLERANCE, export_scorer
+from feeling_analytics.services.stub_models import build_stub_analyzer
+
+from .synthetic_audio import SAMPLE_RATE, synth_voice, write_call
+
+CHUNK_SECONDS = 5
+
+
+def measure(fn, repeat, warmup):
+    """Median/mean/min/max wall time of fn() over `repeat` runs after `warmup` untimed runs"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            fn()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    return {
+        'median_s': statistics.median(times),
+        'mean_s': statistics.fmean(times),
+        'min_s': min(times),
+        'max_s': max(times),
+        'runs': repeat,
+    }
+
+
+def _record(results, key, fn, args):
+    try:
+        results[key] = measure(fn, args.repeat, args.warmup)
+        print(f"  {key:<45} {results[key]['median_s'] * 1000:10.1f} ms")
+    except Exception as e:
+        results[key] = {'error': str(e)}
+        print(f"  {key:<45} {'error':>10}: {e}")
+
+
+def _remove_converted(original, converted):
+    if converted != original and os.path.exists(converted):
+        os.unlink(converted)
+
+
+def bench_files(analyzer, workdir, args, results):
+    """Stages that depend on the container format: conversion, loading, analyze_audio"""
+    for seconds in args.lengths:
+        for fmt in args.formats:
+            path = write_call(workdir, seconds, fmt)
+            if path is None:
+                print(f"  (skipping {fmt}: cannot be generated here)")
+                continue
+            path = str(path)
+            suffix = f"{fmt}/{seconds}s"
+
+            _record(results, f"convert_to_wav/{suffix}",
+                    lambda: _remove_converted(path, analyzer._convert_to_wav(path)), args)
+            with contextlib.redirect_stdout(io.StringIO()):
+                wav_path = analyzer._convert_to_wav(path)
+            try:
+                _record(results, f"load_stereo_audio/{suffix}",
+                        lambda: analyzer._load_stereo_audio(wav_path), args)
+                _record(results, f"stream_stereo_audio/{suffix}",
+                        lambda: analyzer._stream_stereo_audio(wav_path, MemoryBudget()), args)
+            finally:
+                _remove_converted(path, wav_path)
+            _record(results, f"analyze_audio/{suffix}",
+                    lambda: analyzer.analyze_audio(path, os.path.basename(path), "both"), args)
+
+
+@torch.no_grad()
+def bench_model_stages(analyzer, args, results):
+    """Model stages on one channel; format independent"""
+    for seconds in args.lengths:
+        waveform = synth_voice(seconds, SAMPLE_RATE)
+        suffix = f"pcm/{seconds}s"
+
+        def processor_features():
+            return analyzer.whisper_processor(
+                waveform, sampling_rate=SAMPLE_RATE, return_tensors="pt"
+            ).input_features.to(analyzer.device)
+
+        def features():
+            return analyzer.extract_features([waveform])
+
+        input_features = features()
+        if analyzer.feature_frontend is not None:
+            error = max_feature_error(analyzer.feature_frontend, analyzer.whisper_processor, [waveform])
+            results[f"feature_parity/{suffix}"] = {'max_abs_error': error}
+            flag = "✅" if error <= FEATURE_TOLERANCE else "❌ exceeds tolerance"
+            print(f"  {'feature_parity/' + suffix:<45} {error:10.2e} max |Δ| {flag}")
+        encoder = analyzer.whisper_model.get_encoder()
+
+        def encode():
+            return analyzer.embedding_projection(encoder(input_features=input_features).last_hidden_state)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            embedding = analyzer._get_whisper_embedding(waveform, SAMPLE_RATE)
+
+        def heads():
+            return [analyzer._predict_with_mlp(embedding, model) for model in analyzer.mlp_models.values()]
+
+        _record(results, f"feature_extraction/{suffix}", features, args)
+        _record(results, f"feature_extraction_processor/{suffix}", processor_features, args)
+        _record(results, f"encoder/{suffix}", encode, args)
+        _record(results, f"heads/{suffix}", heads, args)
+
+        def scoring():
+            return analyzer.analyze_channels([waveform])
+
+        if analyzer.backend is not None:
+            scores = analyzer.analyze_channels([waveform])[0]['all_scores']
+            error = max(abs(scores[emotion] - value) for emotion, value in zip(analyzer.mlp_models, heads()))
+            results[f"backend_parity/{suffix}"] = {'max_abs_error': error}
+            flag = "✅" if error <= SCORE_TOLERANCE else "❌ exceeds tolerance"
+            print(f"  {'backend_parity/' + suffix:<45} {error:10.2e} max |Δ| {flag}")
+        _record(results, f"scoring/{suffix}", scoring, args)
+
+
+def bench_chunk_route(analyzer, workdir, args, results):
+    """POST /live/analyze-chunk through a TestClient with the stub analyzer plugged in"""
+    key = f"analyze_chunk_route/wav/{CHUNK_SECONDS}s"
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')  # keep per-request API logs out of the timings
+    try:
+        from fastapi.testclient import TestClient
+        with contextlib.redirect_stdout(io.StringIO()):
+            from feeling_analytics import feeling_analyser_api as api
+    except Exception as e:
+        results[key] = {'skipped': f"API unavailable: {e}"}
+        print(f"  {key:<45} {'skipped':>10}: {e}")
+        return
+
+    api.sentiment_analyzer = analyzer
+    path = write_call(workdir, CHUNK_SECONDS, 'wav')
+    payload = path.read_bytes()
+    client = TestClient(api.app)  # no lifespan: startup would build the real analyzer
+
+    def post_chunk():
+        response = client.post(
+            "/api/feeling-analytics/live/analyze-chunk",
+            files={"audio": ("chunk.wav", payload, "audio/wav")},
+        )
+        response.raise_for_status()
+
+    _record(results, key, post_chunk, args)
+
+
+def compare(results, baseline, threshold, min_delta):
+    """Print current vs baseline medians; return the keys that regressed beyond threshold.
+
+    Differences below min_delta seconds are timer noise and never count as regressions.
+    """
+    regressions = []
+    print(f"\n{'stage':<45} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for key, current in sorted(results.items()):
+        base = baseline.get('results', {}).get(key, {})
+        if 'median_s' not in current or 'median_s' not in base:
+            continue
+        change = current['median_s'] / base['median_s'] - 1
+        flag = ""
+        if change > threshold and current['median_s'] - base['median_s'] > min_delta:
+            regressions.append(key)
+            flag = "  ❌ REGRESSION"
+        elif change < -threshold and base['median_s'] - current['median_s'] > min_delta:
+            flag = "  ✅ faster"
+        print(f"{key:<45} {base['median_s'] * 1000:12.1f} {current['median_s'] * 1000:12.1f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--lengths", default="10,60,300", help="Call lengths in seconds, comma separated")
+    parser.add_argument("--formats", default="wav,flac,mp3", help="wav, flac, ogg, mp3, m4a (mp3/m4a need ffmpeg), ulaw, alaw (8 kHz G.711 wav)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--whisper-size", default="base", help="Stub encoder shape: tiny, base or small")
+    parser.add_argument("--heads", type=int, default=len(MAIN_EMOTIONS), help="Number of emotion heads")
+    parser.add_argument("--output", default="benchmarks/results.json")
+    parser.add_argument("--baseline", default=None, help="Previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown before flagging (0.15 = 15%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Ignore differences smaller than this")
+    parser.add_argument("--skip-route", action="store_true", help="Skip the TestClient analyze-chunk stage")
+    parser.add_argument("--backend", choices=INFERENCE_BACKENDS, default="torch", help="Inference backend to score with")
+    args = parser.parse_args(argv)
+    args.lengths = [int(value) for value in args.lengths.split(",") if value]
+    args.formats = [value.strip().lower() for value in args.formats.split(",") if value]
+
+    print(f"🔧 Building stub models (whisper-{args.whisper_size}, {args.heads} heads)...")
+    analyzer = build_stub_analyzer(args.whisper_size, MAIN_EMOTIONS[:args.heads])
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="feeling-bench-") as workdir:
+        if args.backend in EXPORTED_BACKENDS:
+            print(f"📦 Exporting stub scorer ({args.backend})...")
+            export_scorer(analyzer.build_scorer(), workdir, formats=[args.backend])
+        analyzer.use_backend(args.backend, workdir)
+        print("⏱ Model stages")
+        bench_model_stages(analyzer, args, results)
+        print("⏱ File stages")
+        bench_files(analyzer, workdir, args, results)
+        if not args.skip_route:
+            print("⏱ API route")
+            bench_chunk_route(analyzer, workdir, args, results)
+
+    report = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'torch': torch.__version__,
+            'torch_threads': torch.get_num_threads(),
+            'device': str(analyzer.device),
+            'whisper_size': args.whisper_size,
+            'heads': args.heads,
+            'backend': args.backend,
+            'repeat': args.repeat,
+            'warmup': args.warmup,
+        },
+        'results': results,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n💾 Results written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms / 1000)
+        if regressions:
+            print(f"\n❌ {len(regressions)} stage(s) slower than baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Run the API with stub models, for load tests against a local instance.
+
+Usage (from backend/):
+    python -m benchmarks.serve_stub [--host 127.0.0.1] [--port 8000] [--whisper-size base] [--heads 10]
+        [--live-whisper-size tiny]
+
+Uses the database configured in .env / DB_* like the real API; only the models are stubs.
+With --live-whisper-size, live chunks are scored by a second, smaller stub tier
+sharing the heads (MODEL_TIERS=live=<size>,final=<whisper-size>).
+"""
+import argparse
+
+import uvicorn
+
+from feeling_analytics.services.emotions import MAIN_EMOTIONS
+from feeling_analytics.services.model_tiers import ModelRouter
+from feeling_analytics.services.stub_models import build_stub_analyzer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serve_stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--whisper-size", default="base")
+    parser.add_argument("--heads", type=int, default=len(MAIN_EMOTIONS))
+    parser.add_argument("--live-whisper-size", default=None, help="Stub encoder for the live tier")
+    args = parser.parse_args(argv)
+
+    from feeling_analytics import feeling_analyser_api as api
+
+    print(f"🔧 Stub models: whisper-{args.whisper_size}, {args.heads} heads")
+    # Set before startup so the API does not try to load the real models
+    api.sentiment_analyzer = build_stub_analyzer(args.whisper_size, MAIN_EMOTIONS[:args.heads])
+    if args.live_whisper_size:
+        print(f"🔧 Live tier: whisper-{args.live_whisper_size}")
+        live = build_stub_analyzer(args.live_whisper_size, tier='live', heads=api.sentiment_analyzer.mlp_models)
+        api.model_router = ModelRouter.from_analyzers({'live': live, 'final': api.sentiment_analyzer})
+    uvicorn.run(api.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Synthetic stereo call recordings for benchmarks (no real audio needed)."""
+import shutil
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+SAMPLE_RATE = 16000
+SOUNDFILE_FORMATS = {'wav': 'WAV', 'flac': 'FLAC', 'ogg': 'OGG'}
+FFMPEG_FORMATS = ('mp3', 'm4a')
+# 8 kHz G.711 stereo WAVs, as written by telephony recorders
+TELEPHONY_FORMATS = {'ulaw': 'ULAW', 'alaw': 'ALAW'}
+TELEPHONY_RATE = 8000
+
+
+def synth_voice(seconds, sr=SAMPLE_RATE, f0=140.0, seed=0):
+    """Harmonic voice-like signal with syllable-rate amplitude modulation, pauses and noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    pitch = f0 * (1 + 0.05 * np.sin(2 * np.pi * 0.3 * t))
+    phase = 2 * np.pi * np.cumsum(pitch) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * 4.0 * t + rng.uniform(0, np.pi)))
+    # Speaker turns: each channel talks roughly half of the time
+    turns = (np.sin(2 * np.pi * t / 7.0 + rng.uniform(0, 2 * np.pi)) > 0).astype(np.float32)
+    signal = 0.3 * voice * syllables * turns + 0.01 * rng.standard_normal(len(t))
+    return signal.astype(np.float32)
+
+
+def synth_call(seconds, sr=SAMPLE_RATE, seed=0):
+    """(samples, 2) stereo call: agent on the left channel, customer on the right"""
+    caller = synth_voice(seconds, sr, f0=120.0, seed=seed)
+    client = synth_voice(seconds, sr, f0=210.0, seed=seed + 1)
+    return np.stack([caller, client], axis=1)
+
+
+def write_call(directory, seconds, fmt, sr=SAMPLE_RATE, seed=0):
+    """Write a synthetic call as <directory>/call_<seconds>s.<fmt>; None if the format cannot be produced here"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    if fmt in TELEPHONY_FORMATS:
+        path = directory / f"call_{seconds}s.{fmt}.wav"
+        sf.write(path, synth_call(seconds, TELEPHONY_RATE, seed), TELEPHONY_RATE, subtype=TELEPHONY_FORMATS[fmt])
+        return path
+    path = directory / f"call_{seconds}s.{fmt}"
+    audio = synth_call(seconds, sr, seed)
+    if fmt in SOUNDFILE_FORMATS:
+        sf.write(path, audio, sr, format=SOUNDFILE_FORMATS[fmt])
+        return path
+    if fmt in FFMPEG_FORMATS and shutil.which('ffmpeg'):
+        wav_path = directory / f"call_{seconds}s.src.wav"
+        sf.write(wav_path, audio, sr)
+        subprocess.run(['ffmpeg', '-y', '-i', str(wav_path), str(path)], check=True, capture_output=True)
+        wav_path.unlink()
+        return path
+    return None
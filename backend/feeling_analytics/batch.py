@@ -0,0 +1,302 @@
+"""Offline bulk scoring of recorded calls.
+
+Usage:
+    python -m feeling_analytics.batch INPUT [--manifest] [--output db|parquet] [--parquet-dir DIR]
+        [--checkpoint FILE] [--workers N] [--batch-size N] [--channels both|caller|client]
+        [--agent-email EMAIL] [--agent-name NAME] [--rows-per-file N] [--retry-failed]
+
+INPUT is a directory, scanned recursively for audio files (the id_call is the path
+relative to it), or with --manifest a text file listing one audio path per line
+(the id_call is the path as written). Files are decoded in a process pool while the
+main process scores channels in batches and writes results either through
+DatabaseService (one transaction per batch) or to rolling Parquet files.
+
+Every finished call is appended to the checkpoint file (JSON lines), so rerunning
+the same command after an interruption skips calls that are already done.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from .services.audio_io import AUDIO_EXTENSIONS, SAMPLING_RATE, decode_file
+from .services.emotions import EMOTION_COLUMNS, MAIN_EMOTIONS
+from .services.logs import configure_logging
+
+PARQUET_COLUMNS = (
+    'id_call', 'channel', 'filename', 'agent_email', 'agent_name', 'analysis_date',
+    'duration_seconds', 'final_score', 'valence_score', 'arousal_score', 'all_scores', 'advice',
+    *EMOTION_COLUMNS.values(),
+)
+
+
+def iter_inputs(source, manifest=False):
+    """(id_call, path) pairs from a directory tree or a manifest file"""
+    source = Path(source)
+    if manifest:
+        base = source.parent
+        with open(source, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    path = Path(line)
+                    yield line, str(path if path.is_absolute() else base / path)
+        return
+    for path in sorted(source.rglob('*')):
+        if path.suffix.lower() in AUDIO_EXTENSIONS and path.is_file():
+            yield path.relative_to(source).as_posix(), str(path)
+
+
+class Checkpoint:
+    """Append-only JSON-lines log of finished calls"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.status = {}
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from an interrupted run
+                    self.status[entry['id_call']] = entry['status']
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def should_skip(self, id_call, retry_failed=False):
+        status = self.status.get(id_call)
+        return status == 'done' or (status == 'failed' and not retry_failed)
+
+    def record(self, id_call, status, **info):
+        self.status[id_call] = status
+        self._file.write(json.dumps({'id_call': id_call, 'status': status, **info}) + '\n')
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+class DatabaseSink:
+    """Bulk-write results through DatabaseService; calls are durable as soon as write returns"""
+
+    def __init__(self, db_service):
+        self.db = db_service
+
+    def write(self, results):
+        self.db.save_results(results)
+        return [result['id_call'] for result in results]
+
+    def close(self):
+        return []
+
+
+class ParquetSink:
+    """Per-channel rows in rolling Parquet files; calls count as durable once their file is closed"""
+
+    def __init__(self, directory, rows_per_file=100000):
+        from .services.export_service import ParquetFileWriter
+        self._writer_class = ParquetFileWriter
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.rows_per_file = rows_per_file
+        self._run = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+        self._index = 0
+        self._writer = None
+        self._pending = []
+
+    def write(self, results):
+        if self._writer is None:
+            path = self.directory / f"part-{self._run}-{self._index:04d}.parquet.tmp"
+            self._writer = self._writer_class(path, PARQUET_COLUMNS)
+        analysis_date = datetime.utcnow()
+        rows = []
+        for result in results:
+            for channel in ('caller', 'client'):
+                data = result.get(channel)
+                if data is None:
+                    continue
+                scores = data.get('all_scores', {})
+                rows.append((
+                    result['id_call'], channel, result['filename'], result['agent_email'],
+                    result['agent_name'], analysis_date, result['duration_seconds'],
+                    data['final_score'], data['valence_score'], data['arousal_score'],
+                    scores, data['advice'],
+                    *(scores.get(emotion) for emotion in MAIN_EMOTIONS),
+                ))
+            self._pending.append(result['id_call'])
+        self._writer.write(rows)
+        if self._writer.rows >= self.rows_per_file:
+            return self._roll()
+        return []
+
+    def _roll(self):
+        self._writer.close()
+        path = Path(self._writer.path)
+        path.rename(path.with_suffix(''))  # drop .tmp only once the footer is written
+        self._writer = None
+        self._index += 1
+        done, self._pending = self._pending, []
+        return done
+
+    def close(self):
+        return self._roll() if self._writer is not None else []
+
+
+class BatchRunner:
+    def __init__(self, analyzer, sink, checkpoint, workers=None, batch_size=16, analyze_channels='both',
+                 agent_email=None, agent_name=None, progress_every=10.0):
+        self.analyzer = analyzer
+        self.sink = sink
+        self.checkpoint = checkpoint
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.channels = [c for c in ('caller', 'client') if analyze_channels in ('both', c)]
+        self.agent_email = agent_email or 'no-agent'
+        self.agent_name = agent_name or agent_email or 'no-agent'
+        self.progress_every = progress_every
+        self.files_done = 0
+        self.files_failed = 0
+        self.audio_seconds = 0.0
+        self._durations = {}
+
+    def run(self, inputs):
+        self._started = self._last_report = time.monotonic()
+        pending = []
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                for decoded in self._decode(pool, inputs):
+                    if decoded['error']:
+                        self.checkpoint.record(decoded['id_call'], 'failed', error=decoded['error'])
+                        self.files_failed += 1
+                        continue
+                    pending.append(decoded)
+                    if len(pending) * len(self.channels) >= self.batch_size:
+                        self._score(pending)
+                        pending = []
+                    self._report()
+                self._score(pending)
+                pending = []
+        finally:
+            self._commit(self.sink.close())
+            self._report(final=True)
+
+    def _decode(self, pool, inputs):
+        """Decoded files in input order, keeping a bounded number of decodes in flight"""
+        window = []
+        for id_call, path in inputs:
+            window.append((id_call, pool.submit(decode_file, path, SAMPLING_RATE)))
+            if len(window) >= self.workers * 2:
+                yield self._decoded(*window.pop(0))
+        while window:
+            yield self._decoded(*window.pop(0))
+
+    def _decoded(self, id_call, future):
+        decoded = future.result()
+        decoded['id_call'] = id_call
+        return decoded
+
+    def _score(self, decoded):
+        if not decoded:
+            return
+        channels = [item[channel] for item in decoded for channel in self.channels]
+        scores = iter(self.analyzer.analyze_channels(channels))
+        results = []
+        for item in decoded:
+            result = {
+                'id_call': item['id_call'],
+                'filename': os.path.basename(item['path']),
+                'analysis_date': datetime.utcnow().isoformat(),
+                'sample_rate': SAMPLING_RATE,
+                'duration_seconds': item['duration'],
+                'agent_email': self.agent_email,
+                'agent_name': self.agent_name,
+            }
+            for channel in self.channels:
+                result[channel] = next(scores)
+            results.append(result)
+            self._durations[item['id_call']] = item['duration']
+        self._commit(self.sink.write(results))
+
+    def _commit(self, id_calls):
+        """Checkpoint calls the sink reports as durable"""
+        for id_call in id_calls:
+            self.checkpoint.record(id_call, 'done')
+            self.audio_seconds += self._durations.pop(id_call, 0.0)
+        self.checkpoint.flush()
+        self.files_done += len(id_calls)
+
+    def _report(self, final=False):
+        now = time.monotonic()
+        if not final and now - self._last_report < self.progress_every:
+            return
+        self._last_report = now
+        elapsed = max(now - self._started, 1e-9)
+        print(
+            f"{'✅' if final else '📈'} {self.files_done} files done, {self.files_failed} failed | "
+            f"{self.files_done / elapsed:.2f} files/s | "
+            f"{self.audio_seconds / 3600 / elapsed:.4f} audio-h/s | "
+            f"{self.audio_seconds / 3600:.2f} h audio in {elapsed:.0f}s"
+        )
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(prog="python -m feeling_analytics.batch")
+    parser.add_argument("input", help="Directory of recordings, or a manifest file with --manifest")
+    parser.add_argument("--manifest", action="store_true", help="INPUT lists one audio path per line")
+    parser.add_argument("--output", choices=["db", "parquet"], default="db")
+    parser.add_argument("--parquet-dir", default="batch_output")
+    parser.add_argument("--rows-per-file", type=int, default=100000)
+    parser.add_argument("--checkpoint", default=None, help="Defaults to <input>.checkpoint.jsonl")
+    parser.add_argument("--retry-failed", action="store_true", help="Retry calls that failed in earlier runs")
+    parser.add_argument("--workers", type=int, default=None, help="Decode processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=16, help="Channels per model batch")
+    parser.add_argument("--channels", choices=["both", "caller", "client"], default="both")
+    parser.add_argument("--agent-email", default=None)
+    parser.add_argument("--agent-name", default=None)
+    parser.add_argument("--progress-every", type=float, default=10.0, help="Seconds between progress lines")
+    args = parser.parse_args(argv)
+    configure_logging(fmt='text')
+
+    checkpoint = Checkpoint(args.checkpoint or f"{Path(args.input).resolve()}.checkpoint.jsonl")
+    inputs = [
+        (id_call, path) for id_call, path in iter_inputs(args.input, args.manifest)
+        if not checkpoint.should_skip(id_call, args.retry_failed)
+    ]
+    print(f"📂 {len(inputs)} calls to score ({len(checkpoint.status)} already in {checkpoint.path})")
+
+    if args.output == "db":
+        from .services.database_service import DatabaseService
+        db_service = DatabaseService()
+        db_service.create_tables()
+        sink = DatabaseSink(db_service)
+    else:
+        sink = ParquetSink(args.parquet_dir, args.rows_per_file)
+
+    from .services.sentiment_analyzer import SentimentAnalyzer
+    runner = BatchRunner(
+        SentimentAnalyzer(), sink, checkpoint,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        analyze_channels=args.channels,
+        agent_email=args.agent_email,
+        agent_name=args.agent_name,
+        progress_every=args.progress_every,
+    )
+    try:
+        runner.run(inputs)
+    finally:
+        checkpoint.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Export the emotion scorer for the torchscript and onnx inference backends.
+
+Usage:
+    python -m feeling_analytics.export_models [--tier final] [--output DIR] [--formats onnx,torchscript]
+        [--stub tiny|base|small]
+
+Loads Whisper and the emotion heads of a model tier as the API does (USE_LOCAL_MODELS,
+MODEL_TIERS / WHISPER_MODEL), joins them into one EmotionScorer and writes it to
+--output (the tier's export dir by default: EXPORT_DIR, or EXPORT_DIR/<tier>)
+together with the embedding projection and a manifest. Set INFERENCE_BACKEND (or
+TIER_<NAME>_BACKEND) to torchscript or onnx to serve from the export. Rerun for
+each tier after changing its Whisper size or the emotion models.
+
+--stub exports randomly initialized models of that Whisper size instead, for
+benchmarking the backends without model files.
+"""
+import argparse
+import time
+
+from .services.inference import EXPORT_FORMATS
+from .services.logs import configure_logging
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m feeling_analytics.export_models")
+    parser.add_argument("--tier", default=None, help="Model tier from MODEL_TIERS (default: final)")
+    parser.add_argument("--output", default=None, help="Defaults to the tier's export dir")
+    parser.add_argument("--formats", default=",".join(EXPORT_FORMATS), help="Comma-separated: onnx, torchscript")
+    parser.add_argument("--stub", choices=["tiny", "base", "small"], default=None,
+                        help="Export stub models of this Whisper size")
+    args = parser.parse_args(argv)
+    configure_logging(fmt='text')
+
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    unknown = sorted(set(formats) - set(EXPORT_FORMATS))
+    if unknown:
+        parser.error(f"unknown formats: {', '.join(unknown)}")
+
+    from .services.inference import export_scorer
+    from .services.sentiment_analyzer import DEFAULT_TIER, SentimentAnalyzer, load_model_tiers
+
+    tiers = load_model_tiers()
+    tier = tiers.get((args.tier or DEFAULT_TIER).lower())
+    if tier is None:
+        parser.error(f"unknown tier {args.tier!r} (MODEL_TIERS has {', '.join(tiers)})")
+    if args.stub:
+        from .services.stub_models import build_stub_analyzer
+        analyzer = build_stub_analyzer(args.stub)
+        whisper = f"stub-{args.stub}"
+    else:
+        # Eager models regardless of INFERENCE_BACKEND: the export is built from them
+        analyzer = SentimentAnalyzer(load_models=False, tier=tier).load_eager_models()
+        whisper = tier.whisper_model
+    if not analyzer.mlp_models:
+        raise SystemExit("No emotion models loaded, nothing to export")
+
+    start = time.perf_counter()
+    written = export_scorer(
+        analyzer.build_scorer(),
+        args.output or tier.export_dir,
+        formats=formats,
+        n_mels=analyzer.whisper_model.config.num_mel_bins,
+        metadata={'whisper_model': whisper, 'tier': tier.name},
+    )
+    print(f"✓ Exported {', '.join(formats)} in {time.perf_counter() - start:.1f}s")
+    for path in written:
+        print(f"   {path}")
+
+
+if __name__ == "__main__":
+    main()
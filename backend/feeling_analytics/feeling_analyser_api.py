@@ -1,23 +1,83 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import tempfile
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 import os
+import time
 from dotenv import load_dotenv
-import traceback
-from .services.sentiment_analyzer import SentimentAnalyzer
-from .services.database_service import DatabaseService
-from typing import Optional
+from .services.model_tiers import FINAL_QUALITY, LIVE_QUALITY, ModelRouter, TierUnavailable, UnknownQuality
+from .services.audio_io import MODEL_WINDOW_SECONDS, MemoryBudgetExceeded, load_mono, resample
+from .services.database_service import DatabaseService, RECORD_VIEWS
+from .services.export_service import EXPORT_FORMATS, iter_export
+from .services.event_bus import ResultBroadcaster, format_sse
+from .services.job_queue import JobQueue
+from .services.upload_store import UploadStore
+from .services.logs import configure_logging, get_logger, log_context
+from .services.profiling import PROFILE_MODES, ProfileManager
+from .services.telemetry import (
+    INFERENCE_IN_PROGRESS, JOB_QUEUE_DEPTH, REQUEST_SECONDS, collect_stages, render_metrics, stage
+)
+from .responses import FastJSONResponse, ResponseCache
+from .uploads import BodySizeLimit, UploadRoute, spool_upload
+from typing import Optional, List
+from pydantic import BaseModel
+from starlette.requests import ClientDisconnect
+import shutil
 import uuid
+import asyncio
+import re
 from datetime import datetime
 import torch
 import numpy as np
 
 load_dotenv()
+configure_logging()
+logger = get_logger(__name__)
 
+# Analyzer per model tier (MODEL_TIERS); sentiment_analyzer is the final tier's and
+# serves every request when set directly (benchmarks) without a router
+model_router = None
 sentiment_analyzer = None
 db_service = DatabaseService()
 db_service.create_tables()
+job_queue = JobQueue(db_service)
+job_queue.create_table()
+upload_store = UploadStore()
+
+ALLOWED_AUDIO_FORMATS = ['.mp3', '.wav', '.m4a', '.ogg', '.flac']
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+MAX_CHUNK_BYTES = 15 * 1024 * 1024
+
+# Saved results pushed to /api/feeling-analytics/stream; the listener also advances this
+# worker's data version (and drops its cached aggregates) when any worker changes data
+result_broadcaster = ResultBroadcaster(
+    db_service.get_connection,
+    db_service.notify_channel,
+    queue_size=int(os.getenv('STREAM_QUEUE_SIZE', '100')),
+    on_event=lambda event: db_service.observe_data_version(event.get('data_version')),
+)
+STREAM_HEARTBEAT_SECONDS = float(os.getenv('STREAM_HEARTBEAT_SECONDS', '15'))
+
+# Serialized metrics/statistics responses, tagged with the data version as ETag
+metrics_cache = ResponseCache(
+    db_service.get_data_version,
+    ttl=float(os.getenv('METRICS_CACHE_TTL', '30')),
+    maxsize=int(os.getenv('METRICS_CACHE_SIZE', '256')),
+)
+
+# Upper bound on ids per records:batchGet request
+BATCH_GET_MAX_IDS = int(os.getenv('BATCH_GET_MAX_IDS', '200'))
+
+# X-Profile request profiling and analyze-chunk sampling (disabled without PROFILE_ADMIN_TOKEN)
+profiler = ProfileManager()
+ANALYZE_CHUNK_PATH = "/api/feeling-analytics/live/analyze-chunk"
+
+# Upload routes and their file size limits, enforced while the body is still arriving
+UPLOAD_LIMITS = {
+    "/api/feeling-analytics/analyze": MAX_UPLOAD_BYTES,
+    "/api/feeling-analytics/analyze-jobs": MAX_UPLOAD_BYTES,
+    "/api/feeling-analytics/live/end-call": MAX_UPLOAD_BYTES,
+    ANALYZE_CHUNK_PATH: MAX_CHUNK_BYTES,
+}
 
 # Simple in-memory user store for dev/testing (replace with real auth in prod)
 user_store = {}
@@ -29,6 +89,11 @@ app = FastAPI(
     version="2.0.0"
 )
 
+# Multipart file parts are spooled once, to named files that spool_upload links into place
+app.router.route_class = UploadRoute
+
+# Added first so CORSMiddleware wraps it and its 413s carry the CORS headers
+app.add_middleware(BodySizeLimit, limits=UPLOAD_LIMITS)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:3001", "http://localhost:3002", "http://127.0.0.1:3002"],
@@ -37,23 +102,102 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        # Stages timed while handling the request are reported back as Server-Timing
+        with collect_stages() as timings:
+            response = await call_next(request)
+        status = response.status_code
+        if timings.stages:
+            response.headers['Server-Timing'] = timings.server_timing()
+        return response
+    finally:
+        # Route template (e.g. /records/{audio_id}) keeps the label set bounded
+        route = request.scope.get('route')
+        REQUEST_SECONDS.labels(
+            request.method, route.path if route is not None else 'unmatched', str(status)
+        ).observe(time.perf_counter() - start)
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    mode = request.headers.get("x-profile") or request.query_params.get("profile")
+    if mode:
+        if not profiler.is_admin(request.headers.get("x-profile-token")):
+            return JSONResponse(status_code=403, content={"detail": "Profiling requires a valid X-Profile-Token"})
+        if mode not in PROFILE_MODES:
+            return JSONResponse(status_code=400, content={"detail": f"X-Profile must be one of {', '.join(PROFILE_MODES)}"})
+    elif request.url.path == ANALYZE_CHUNK_PATH and profiler.should_sample():
+        mode = profiler.sample_mode
+    else:
+        return await call_next(request)
+
+    label = request.url.path.rstrip("/").rsplit("/", 1)[-1] or "root"
+    with profiler.profile(mode, label) as profile_id:
+        response = await call_next(request)
+    if profile_id:
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """Outermost: every record logged while handling the request carries its id"""
+    with log_context(request.headers.get("x-request-id"), request.url.path) as request_id:
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 @app.on_event("startup")
 async def startup():
-    print("Iniciando API...")
+    logger.info("Iniciando API...")
     try:
         db_service.create_tables()
-        print("Base de datos lista")
+        logger.info("Base de datos lista")
     except Exception as e:
-        print(f"Error en startup: {e}")
+        logger.error("Error en startup: %s", e)
+    result_broadcaster.start(asyncio.get_running_loop())
     # Try to initialize heavy sentiment analyzer but don't fail startup if dependencies missing
-    global sentiment_analyzer
+    global model_router, sentiment_analyzer
     try:
         if sentiment_analyzer is None:
-            print("Inicializando SentimentAnalyzer (puede tardar)...")
-            sentiment_analyzer = SentimentAnalyzer()
-            print("SentimentAnalyzer inicializado")
+            logger.info("Inicializando SentimentAnalyzer (puede tardar)...")
+            # Each tier loads on its own; a failed tier is served by the default one
+            model_router = ModelRouter()
+            model_router.load_all()
+            sentiment_analyzer = model_router.get(FINAL_QUALITY)
+            logger.info("SentimentAnalyzer inicializado (tiers: %s)", ", ".join(model_router.analyzers))
     except Exception as e:
-        print(f"Warning: no se pudo inicializar SentimentAnalyzer en startup: {e}")
+        logger.warning("No se pudo inicializar SentimentAnalyzer en startup: %s", e)
+
+
+def get_analyzer(quality: Optional[str], default: str):
+    """Analyzer of the requested quality tier, or of the endpoint's default; 400 for unknown qualities"""
+    if model_router is None:
+        return sentiment_analyzer
+    try:
+        return model_router.get(quality or default)
+    except UnknownQuality as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TierUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def check_quality(quality: Optional[str]):
+    """Quality stored with queued work, validated here; the worker resolves it with the same MODEL_TIERS"""
+    if not quality:
+        return None
+    if model_router is not None:
+        try:
+            model_router.resolve(quality)
+        except UnknownQuality as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return quality.lower()
+
+@app.on_event("shutdown")
+async def shutdown():
+    result_broadcaster.stop()
 
 @app.get("/")
 async def root():
@@ -72,6 +216,18 @@ async def health():
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    try:
+        counts = await asyncio.to_thread(job_queue.status_counts)
+        for status, count in counts.items():
+            JOB_QUEUE_DEPTH.labels(status).set(count)
+    except Exception as e:
+        logger.warning("No se pudo leer analysis_jobs: %s", e)
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 
 @app.get("/api/auth/register")
 async def auth_register(request: Request):
@@ -124,7 +280,8 @@ async def analyze_audio(
     audio: UploadFile = File(...),
     analyze_channels: str = Form("both"),
     agent_email: Optional[str] = Form(None),
-    agent_name: Optional[str] = Form(None)
+    agent_name: Optional[str] = Form(None),
+    quality: Optional[str] = Form(None)
 ):
     # Clean up empty strings and None from FormData
     if agent_email == "" or agent_email == "None":
@@ -132,58 +289,47 @@ async def analyze_audio(
     if agent_name == "" or agent_name == "None":
         agent_name = None
     
-    # DEBUG: Print EVERYTHING we received including raw request
-    log_msg = f"\n{'='*70}\n📩 /api/feeling-analytics/analyze RECIBIDO:\n{'='*70}\n   audio.filename: {audio.filename}\n   analyze_channels: {analyze_channels}\n   agent_email (tipo: {type(agent_email).__name__}, valor): {repr(agent_email)}\n   agent_name (tipo: {type(agent_name).__name__}, valor): {repr(agent_name)}\n   request headers: {dict(request.headers).get('content-type', 'NO CONTENT-TYPE')}\n{'='*70}\n"
-    print(log_msg)
-    
-    # Also log to file for debugging
-    try:
-        with open("analyze_debug.log", "a") as f:
-            f.write(log_msg)
-    except:
-        pass
+    logger.debug(
+        "📩 /analyze recibido",
+        extra={
+            'upload_filename': audio.filename,
+            'analyze_channels': analyze_channels,
+            'agent_email': agent_email,
+            'agent_name': agent_name,
+            'content_type': request.headers.get('content-type'),
+        },
+    )
     
     if not audio.filename:
         raise HTTPException(status_code=400, detail="Filename required")
     
-    allowed_formats = ['.mp3', '.wav', '.m4a', '.ogg', '.flac']
     file_ext = os.path.splitext(audio.filename)[1].lower()
-    if file_ext not in allowed_formats:
+    if file_ext not in ALLOWED_AUDIO_FORMATS:
         raise HTTPException(status_code=400, detail=f"Unsupported format: {file_ext}")
+    analyzer = get_analyzer(quality, FINAL_QUALITY)
     
-    content = await audio.read()
-    if len(content) > 100 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File too large")
-    
-    temp_file = None
+    temp_file, _ = await spool_upload(audio, file_ext, MAX_UPLOAD_BYTES)
     
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as f:
-            f.write(content)
-            temp_file = f.name
-        
-        print(f"📊 Analizando: {audio.filename} (canales: {analyze_channels}, agente: {agent_name or agent_email})")
-        result = sentiment_analyzer.analyze_audio(temp_file, audio.filename, analyze_channels)
+        logger.info("📊 Analizando: %s (canales: %s, agente: %s)", audio.filename, analyze_channels, agent_name or agent_email)
+        result = analyzer.analyze_audio(temp_file, audio.filename, analyze_channels)
         
         # Attach agent info to result - use values if not provided
         result['agent_email'] = agent_email or 'no-agent'
         result['agent_name'] = agent_name or 'no-agent'
         
-        save_msg = f"✅ Guardando con agent_name='{result.get('agent_name')}', agent_email='{result.get('agent_email')}'\n"
-        print(save_msg)
-        with open("analyze_debug.log", "a") as f:
-            f.write(save_msg)
+        logger.debug("✅ Guardando con agent_name=%r, agent_email=%r", result['agent_name'], result['agent_email'])
         
         saved = db_service.save_result(result)
         result['saved'] = saved
         
         return JSONResponse(content=result)
         
+    except MemoryBudgetExceeded as e:
+        logger.warning("⚠️ /analyze rechazado: %s", e)
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
-        error_msg = f"❌ Error en /analyze: {str(e)}\n{traceback.format_exc()}\n"
-        print(error_msg)
-        with open("analyze_debug.log", "a") as f:
-            f.write(error_msg)
+        logger.exception("❌ Error en /analyze: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     
     finally:
@@ -191,28 +337,209 @@ async def analyze_audio(
             os.unlink(temp_file)
 
 
+@app.post("/api/feeling-analytics/analyze-jobs", status_code=202)
+async def create_analyze_job(
+    audio: UploadFile = File(...),
+    analyze_channels: str = Form("both"),
+    agent_email: Optional[str] = Form(None),
+    agent_name: Optional[str] = Form(None),
+    priority: int = Form(0),
+    quality: Optional[str] = Form(None)
+):
+    """Queue an upload for analysis by the worker pool; poll GET /analyze-jobs/{job_id} for the result"""
+    if not audio.filename:
+        raise HTTPException(status_code=400, detail="Filename required")
+    file_ext = os.path.splitext(audio.filename)[1].lower()
+    if file_ext not in ALLOWED_AUDIO_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {file_ext}")
+    quality = check_quality(quality)
+
+    job_id = str(uuid.uuid4())
+    path = job_queue.storage_path(job_id, file_ext)
+    try:
+        await spool_upload(audio, file_ext, MAX_UPLOAD_BYTES, destination=path)
+        params = {
+            "analyze_channels": analyze_channels,
+            "agent_email": agent_email if agent_email not in ("", "None") else None,
+            "agent_name": agent_name if agent_name not in ("", "None") else None,
+            "quality": quality,
+        }
+        job_queue.enqueue(path, audio.filename, params, priority=priority, job_id=job_id)
+    except Exception as e:
+        path.unlink(missing_ok=True)
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=500, detail=str(e))
+
+    logger.info("📥 Job %s en cola: %s (prioridad %s)", job_id, audio.filename, priority)
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/api/feeling-analytics/analyze-jobs/{job_id}")
+async def get_analyze_job(job_id: str):
+    """Job status; includes the analysis result once status is 'succeeded'"""
+    try:
+        job = job_queue.get(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return FastJSONResponse(content=job)
+
+
+# Resumable uploads: create, PATCH byte ranges (resend only what "missing" lists), finalize
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+
+class UploadCreateRequest(BaseModel):
+    filename: str
+    size: int
+    analyze_channels: str = "both"
+    agent_email: Optional[str] = None
+    agent_name: Optional[str] = None
+    quality: Optional[str] = None
+
+
+class UploadFinalizeRequest(BaseModel):
+    mode: str = "job"
+    priority: int = 0
+
+
+def _get_upload(upload_id: str):
+    upload = upload_store.get(upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+@app.post("/api/feeling-analytics/uploads", status_code=201)
+async def create_upload(body: UploadCreateRequest):
+    """Start a resumable upload of `size` bytes; returns upload_id and the (all missing) byte ranges"""
+    file_ext = os.path.splitext(body.filename)[1].lower()
+    if file_ext not in ALLOWED_AUDIO_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {file_ext}")
+    if body.size < 0 or body.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File too large (max {MAX_UPLOAD_BYTES} bytes)")
+    params = {
+        "analyze_channels": body.analyze_channels,
+        "agent_email": body.agent_email or None,
+        "agent_name": body.agent_name or None,
+        "quality": check_quality(body.quality),
+    }
+    return await asyncio.to_thread(upload_store.create, body.filename, body.size, params)
+
+
+@app.get("/api/feeling-analytics/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    """Received and missing byte ranges ([start, end) offsets) of an upload"""
+    return _get_upload(upload_id)
+
+
+@app.patch("/api/feeling-analytics/uploads/{upload_id}")
+async def upload_range(upload_id: str, request: Request):
+    """Write the request body at the offsets of its Content-Range header ("bytes 0-1048575/104857600").
+
+    Bytes received before a dropped connection are kept.
+    """
+    upload = _get_upload(upload_id)
+    match = CONTENT_RANGE.match(request.headers.get("content-range", ""))
+    if not match:
+        raise HTTPException(status_code=400, detail="Content-Range: bytes <start>-<end>/<size> required")
+    start, end, total = int(match.group(1)), int(match.group(2)), match.group(3)
+    if start > end or end >= upload["size"] or (total != "*" and int(total) != upload["size"]):
+        raise HTTPException(status_code=416, detail=f"Range outside 0-{upload['size'] - 1}")
+
+    try:
+        with upload_store.write_range(upload_id, start, end + 1) as writer:
+            async for chunk in request.stream():
+                if chunk:
+                    await asyncio.to_thread(writer.write, chunk)
+    except ClientDisconnect:
+        logger.warning("⚠️ Upload %s: conexión cortada en el byte %d", upload_id, writer.position)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return _get_upload(upload_id)
+
+
+@app.post("/api/feeling-analytics/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, body: UploadFinalizeRequest = UploadFinalizeRequest()):
+    """Hand a complete upload to the job queue (mode=job, 202 + job_id) or analyze it now (mode=sync)"""
+    upload = _get_upload(upload_id)
+    if not upload["complete"]:
+        raise HTTPException(status_code=409, detail={"message": "Upload incomplete", "missing": upload["missing"]})
+    params = upload["params"]
+    if body.mode not in ("job", "sync"):
+        raise HTTPException(status_code=400, detail="mode must be 'job' or 'sync'")
+
+    # Claimed first, so a concurrent finalize or DELETE cannot take the file away. The upload
+    # is deleted once this succeeds and given back if it fails, so the client can retry
+    # finalize instead of sending the whole file again
+    with upload_store.claimed(upload_id) as data_path:
+        if data_path is None:
+            raise HTTPException(status_code=409, detail="Upload is already being finalized")
+
+        if body.mode == "job":
+            job_id = str(uuid.uuid4())
+            path = job_queue.storage_path(job_id, upload["extension"])
+            await asyncio.to_thread(shutil.move, str(data_path), str(path))
+            try:
+                job_queue.enqueue(path, upload["filename"], params, priority=body.priority, job_id=job_id)
+            except Exception as e:
+                await asyncio.to_thread(shutil.move, str(path), str(data_path))
+                raise HTTPException(status_code=500, detail=str(e))
+            logger.info("📥 Job %s en cola desde upload %s: %s", job_id, upload_id, upload["filename"])
+            return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued"})
+
+        try:
+            result = get_analyzer(params.get("quality"), FINAL_QUALITY).analyze_audio(
+                str(data_path), upload["filename"], params.get("analyze_channels", "both")
+            )
+            result['agent_email'] = params.get("agent_email") or 'no-agent'
+            result['agent_name'] = params.get("agent_name") or 'no-agent'
+            result['saved'] = db_service.save_result(result)
+        except MemoryBudgetExceeded as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except Exception as e:
+            logger.exception("❌ Error en finalize de %s: %s", upload_id, e)
+            raise HTTPException(status_code=500, detail=str(e))
+        if not result['saved']:
+            raise HTTPException(status_code=500, detail="Could not save result")
+        return JSONResponse(content=result)
+
+
+@app.delete("/api/feeling-analytics/uploads/{upload_id}")
+async def delete_upload(upload_id: str):
+    if not upload_store.discard(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return {"deleted": upload_id}
+
+
 @app.post("/api/feeling-analytics/live/analyze-chunk")
 async def analyze_chunk(
     audio: UploadFile = File(...),
     channel: str = "caller",
-    request: Request = None
+    request: Request = None,
+    quality: Optional[str] = None
 ):
-    """Chunk analysis for realtime UI using actual emotion models.
+    """Chunk analysis for realtime UI using actual emotion models (LIVE_QUALITY tier unless quality is given).
     Returns real sentiment scores, valence/arousal, advice and transcript.
     """
     if not audio.filename:
         raise HTTPException(status_code=400, detail="Filename required")
+    analyzer = get_analyzer(quality, LIVE_QUALITY)
 
-    content = await audio.read()
+    file_ext = os.path.splitext(audio.filename)[1].lower() or ".wav"
+    temp_file, size = await spool_upload(audio, file_ext, MAX_CHUNK_BYTES)
     user_agent = request.headers.get("user-agent", "UNKNOWN") if request else "UNKNOWN"
     origin = request.headers.get("origin", "UNKNOWN") if request else "UNKNOWN"
-    print(f"📊 Chunk recibido: {len(content)} bytes, canal: {channel}")
-    print(f"   → User-Agent: {user_agent[:50]}")
-    print(f"   → Origin: {origin}")
+    logger.info("📊 Chunk recibido: %d bytes, canal: %s", size, channel,
+                extra={'user_agent': user_agent[:50], 'origin': origin})
     
     # Más tolerante con archivos pequeños - WAV headers son ~44 bytes
-    if len(content) < 200:
-        print(f"  ⚠️ Archivo demasiado pequeño ({len(content)} bytes)")
+    if size < 200:
+        logger.warning("⚠️ Archivo demasiado pequeño (%d bytes)", size)
+        os.unlink(temp_file)
         return JSONResponse(content={
             "channel": channel,
             "final_score": 0.0,
@@ -224,40 +551,26 @@ async def analyze_chunk(
             "alert_count": 0
         })
 
-    if len(content) > 15 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="Chunk too large")
-
-    temp_file = None
     try:
-        # Save to temp file
-        file_ext = os.path.splitext(audio.filename)[1].lower() or ".wav"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as f:
-            f.write(content)
-            temp_file = f.name
-
-        print(f"  📁 Guardado en: {temp_file}")
+        logger.debug("📁 Guardado en: %s", temp_file)
 
-        # Try to load audio with librosa
-        import librosa
-        
+        # Decode (G.711 WAVs through lookup tables) and resample to 16 kHz
         waveform = None
         samplerate = 16000
         
         try:
-            waveform, samplerate = librosa.load(temp_file, sr=16000, mono=True)
-            print(f"  ✓ Librosa OK: {len(waveform)} samples @ {samplerate}Hz")
+            with stage('decode'):
+                waveform = load_mono(temp_file, samplerate)
+            logger.debug("✓ Decode OK: %d samples @ %dHz", len(waveform), samplerate)
         except Exception as e:
-            print(f"  ⚠️ Librosa failed: {e}, trying scipy...")
+            logger.warning("⚠️ Decode failed: %s, trying scipy...", e)
             try:
-                from scipy import signal, io as scipy_io
+                from scipy import io as scipy_io
                 sr_info, waveform = scipy_io.wavfile.read(temp_file)
-                if sr_info != 16000:
-                    waveform = signal.resample(waveform, int(len(waveform) * 16000 / sr_info))
-                samplerate = 16000
-                waveform = waveform.astype(float) / 32768.0
-                print(f"  ✓ Scipy OK: {len(waveform)} samples")
+                waveform = resample(waveform.astype(np.float32) / 32768.0, sr_info, samplerate)
+                logger.debug("✓ Scipy OK: %d samples", len(waveform))
             except Exception as e2:
-                print(f"  ✗ Scipy also failed: {e2}")
+                logger.error("✗ Scipy also failed: %s", e2)
                 return JSONResponse(content={
                     "channel": channel,
                     "final_score": 0.0,
@@ -269,80 +582,69 @@ async def analyze_chunk(
                     "alert_count": 0
                 })
 
-        # Transcription
-        transcript = ""
-        try:
-            if len(waveform) >= 16000 and sentiment_analyzer.initialized:
-                # Check if audio is mostly silent - more aggressive detection
-                rms_energy = np.sqrt(np.mean(waveform ** 2))
-                peak_amplitude = np.max(np.abs(waveform))
-                print(f"  🔊 RMS Energy: {rms_energy:.6f}, Peak: {peak_amplitude:.6f}")
-                
-                # If RMS < 0.01 OR peak < 0.05, consider it silence (Whisper needs stronger signal)
-                if rms_energy < 0.01 or peak_amplitude < 0.05:
-                    print(f"  ⚠️ Audio is too quiet (RMS={rms_energy:.6f}, Peak={peak_amplitude:.6f}), skipping transcription")
-                    transcript = "[Silence]"
-                else:
-                    proc = sentiment_analyzer.whisper_processor
-                    model = sentiment_analyzer.whisper_model
-                    if proc is not None and model is not None:
-                        with torch.no_grad():
-                            input_features = proc(waveform, sampling_rate=16000, return_tensors="pt").input_features.to(sentiment_analyzer.device)
-                            generated_ids = model.generate(
-                                input_features,
-                                language="en",
-                                task="transcribe",
-                                max_new_tokens=30,  # Shorter to avoid hallucinations
-                                temperature=0.0,    # Greedy decoding - more conservative
-                                no_repeat_ngram_size=3  # Prevent any repetitions
-                            )
-                            transcript = proc.batch_decode(generated_ids, skip_special_tokens=True)[0].strip()
-                            # If transcript is just repetitions or too short, mark it as uncertain
-                            if not transcript or len(transcript) < 2:
-                                print(f"  ⚠️ Transcription too short or empty: '{transcript}'")
-                                transcript = "[Silence]"
-                            elif len(set(transcript.split())) == 1:
-                                print(f"  ⚠️ Transcription is repetitive: '{transcript}'")
-                                transcript = "[Silence]"
-                            else:
-                                print(f"  📝 Transcripción: {transcript[:50] if transcript else '(vacía)'}")
-        except Exception as e:
-            print(f"  ⚠️ Transcription error: {e}")
+        with INFERENCE_IN_PROGRESS.track_inprogress():
+            # Transcription
             transcript = ""
+            try:
+                if len(waveform) >= 16000 and analyzer.initialized:
+                    # Check if audio is mostly silent - more aggressive detection
+                    rms_energy = np.sqrt(np.mean(waveform ** 2))
+                    peak_amplitude = np.max(np.abs(waveform))
+                    logger.debug("🔊 RMS Energy: %.6f, Peak: %.6f", rms_energy, peak_amplitude)
+                
+                    # If RMS < 0.01 OR peak < 0.05, consider it silence (Whisper needs stronger signal)
+                    if rms_energy < 0.01 or peak_amplitude < 0.05:
+                        logger.debug("⚠️ Audio is too quiet (RMS=%.6f, Peak=%.6f), skipping transcription", rms_energy, peak_amplitude)
+                        transcript = "[Silence]"
+                    else:
+                        proc = analyzer.whisper_processor
+                        model = analyzer.whisper_model
+                        if proc is not None and model is not None:
+                            with torch.no_grad():
+                                input_features = analyzer.extract_features([waveform])
+                                with stage('transcribe'):
+                                    generated_ids = model.generate(
+                                        input_features,
+                                        language="en",
+                                        task="transcribe",
+                                        max_new_tokens=30,  # Shorter to avoid hallucinations
+                                        temperature=0.0,    # Greedy decoding - more conservative
+                                        no_repeat_ngram_size=3  # Prevent any repetitions
+                                    )
+                                transcript = proc.batch_decode(generated_ids, skip_special_tokens=True)[0].strip()
+                                # If transcript is just repetitions or too short, mark it as uncertain
+                                if not transcript or len(transcript) < 2:
+                                    logger.debug("⚠️ Transcription too short or empty: %r", transcript)
+                                    transcript = "[Silence]"
+                                elif len(set(transcript.split())) == 1:
+                                    logger.debug("⚠️ Transcription is repetitive: %r", transcript)
+                                    transcript = "[Silence]"
+                                else:
+                                    logger.debug("📝 Transcripción: %s", transcript[:50] if transcript else '(vacía)')
+            except Exception as e:
+                logger.warning("⚠️ Transcription error: %s", e)
+                transcript = ""
 
-        # Use actual sentiment analyzer for emotion scores
-        final_score = 0.0
-        valence = 0.0
-        arousal = 0.0
-        all_scores = {}
+            # Use actual sentiment analyzer for emotion scores
+            final_score = 0.0
+            valence = 0.0
+            arousal = 0.0
+            all_scores = {}
         
-        try:
-            if len(waveform) >= 16000 and sentiment_analyzer.initialized:
-                # Get Whisper embedding
-                embedding = sentiment_analyzer._get_whisper_embedding(waveform, 16000)
-                if embedding is not None:
-                    # Get emotion scores using the MLP models
-                    with torch.no_grad():
-                        for emotion_name, mlp_model in sentiment_analyzer.mlp_models.items():
-                            if mlp_model is not None:  # Skip None models in fallback
-                                embedding_flat = embedding.flatten()
-                                raw_score = mlp_model(embedding_flat.unsqueeze(0)).squeeze().item()
-                                # Apply sigmoid to normalize to [0, 1]
-                                normalized_score = 1.0 / (1.0 + np.exp(-raw_score))
-                                all_scores[emotion_name] = float(max(0.0, min(1.0, normalized_score)))
-                    
+            try:
+                if len(waveform) >= 16000 and analyzer.initialized:
+                    # Emotion scores from the tier's heads or inference backend
+                    all_scores = analyzer.analyze_channels([waveform])[0]['all_scores']
+                
                     # Extract valence and arousal
                     valence = all_scores.get('Valence', 0.0)
                     arousal = all_scores.get('Arousal', 0.0)
                     final_score = float((valence + arousal) / 2.0)
-                    print(f"  ✓ Emotion scores: valence={valence:.3f}, arousal={arousal:.3f}")
+                    logger.debug("✓ Emotion scores: valence=%.3f, arousal=%.3f", valence, arousal)
                 else:
-                    print(f"  ⚠️ Embedding es None")
-            else:
-                print(f"  ⚠️ No se puede analizar: len={len(waveform) if waveform is not None else 'None'}, initialized={sentiment_analyzer.initialized}")
-        except Exception as e:
-            print(f"  ✗ Emotion analysis error: {e}")
-            traceback.print_exc()
+                    logger.debug("⚠️ No se puede analizar: len=%s, initialized=%s", len(waveform) if waveform is not None else None, analyzer.initialized)
+            except Exception as e:
+                logger.exception("✗ Emotion analysis error: %s", e)
 
         # Advice based on scores
         advice = ""
@@ -386,12 +688,11 @@ async def analyze_chunk(
             "all_scores": all_scores
         }
         
-        print(f"  → Retornando: {result}")
+        logger.debug("→ Retornando chunk", extra={'channel': channel, 'final_score': final_score, 'alert_count': result['alert_count']})
         return JSONResponse(content=result)
 
     except Exception as e:
-        print(f"✗ Error in analyze_chunk: {e}")
-        traceback.print_exc()
+        logger.exception("✗ Error in analyze_chunk: %s", e)
         return JSONResponse(status_code=200, content={
             "channel": channel,
             "final_score": 0.0,
@@ -417,21 +718,19 @@ async def end_call(
     agent_email: Optional[str] = None,
     agent_name: Optional[str] = None,
     analyze_channels: str = "both",
-    save: bool = True
+    save: bool = True,
+    quality: Optional[str] = None
 ):
-    """Finalize a live call: run full analysis on the recorded audio and save result with agent metadata.
+    """Finalize a live call: run full analysis on the recorded audio (FINAL_QUALITY tier unless quality is given)
+    and save result with agent metadata.
     """
     if not audio.filename:
         raise HTTPException(status_code=400, detail="Filename required")
+    analyzer = get_analyzer(quality, FINAL_QUALITY)
 
-    content = await audio.read()
     file_ext = os.path.splitext(audio.filename)[1].lower() or ".wav"
-    temp_file = None
+    temp_file, _ = await spool_upload(audio, file_ext, MAX_UPLOAD_BYTES)
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as f:
-            f.write(content)
-            temp_file = f.name
-
         # Build a filename that embeds agent id (fallback) but also record agent_email separately
         call_id = uuid.uuid4().hex
         timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H-%M-%S")
@@ -439,21 +738,22 @@ async def end_call(
         filename = f"{dni_part}_{timestamp}_{call_id}{file_ext}"
 
         # Run full analysis (this is the heavier path)
-        result = sentiment_analyzer.analyze_audio(temp_file, filename, analyze_channels)
+        result = analyzer.analyze_audio(temp_file, filename, analyze_channels)
 
         # Attempt full transcription for record (may be slow)
         full_transcript = ""
         try:
-            if sentiment_analyzer.whisper_processor and sentiment_analyzer.whisper_model:
-                import librosa
-                waveform, sr = librosa.load(temp_file, sr=16000, mono=True)
+            if analyzer.whisper_processor and analyzer.whisper_model:
+                # generate() only sees the first 30 s, so only that much is decoded
+                waveform = load_mono(temp_file, max_seconds=MODEL_WINDOW_SECONDS)
                 if len(waveform) > 1600:
                     with torch.no_grad():
-                        input_features = sentiment_analyzer.whisper_processor(waveform, sampling_rate=16000, return_tensors="pt").input_features.to(sentiment_analyzer.device)
-                        generated_ids = sentiment_analyzer.whisper_model.generate(input_features)
-                        full_transcript = sentiment_analyzer.whisper_processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
+                        input_features = analyzer.extract_features([waveform])
+                        with stage('transcribe'):
+                            generated_ids = analyzer.whisper_model.generate(input_features)
+                        full_transcript = analyzer.whisper_processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
         except Exception as e:
-            print(f"Full transcription failed: {e}")
+            logger.warning("Full transcription failed: %s", e)
 
         # Alerts detection (profanity/anger) using transcript and model scores if available
         profanity_list = ['puta', 'mierda', 'joder', 'cabron', 'imbecil', 'idiota', 'gilipollas', 'coño']
@@ -492,292 +792,381 @@ async def end_call(
 
         return JSONResponse(content={"result": result})
 
+    except MemoryBudgetExceeded as e:
+        logger.warning("end_call rejected: %s", e)
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
-        print(f"Error in end_call: {e}")
-        traceback.print_exc()
+        logger.exception("Error in end_call: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         if temp_file and os.path.exists(temp_file):
             os.unlink(temp_file)
 
+def _require_profile_admin(request: Request):
+    if not profiler.is_admin(request.headers.get("x-profile-token")):
+        raise HTTPException(status_code=403, detail="Profiling requires a valid X-Profile-Token")
+
+@app.get("/api/feeling-analytics/profiles")
+async def list_profiles(request: Request):
+    """Stored request profiles, newest first"""
+    _require_profile_admin(request)
+    return {"profiles": profiler.list()}
+
+@app.get("/api/feeling-analytics/profiles/{profile_id}")
+async def download_profile(profile_id: str, request: Request):
+    _require_profile_admin(request)
+    path = profiler.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=path.name, media_type="application/octet-stream")
+
+@app.get("/api/feeling-analytics/perf/slowest")
+async def get_slowest_calls(limit: int = 20, days: int = 7, format: Optional[str] = None):
+    """Slowest analysed calls with their dominant stage, and tail latency by input format and length"""
+    try:
+        return FastJSONResponse(content=db_service.get_slowest_calls(limit=min(limit, 500), days=days, audio_format=format))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _record_projection(fields: Optional[str], view: Optional[str]):
+    """Column list requested through fields= or view= (None selects every column)"""
+    if fields:
+        try:
+            return db_service.resolve_columns(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if view:
+        if view not in RECORD_VIEWS:
+            raise HTTPException(status_code=400, detail=f"Unknown view: {view}")
+        return list(RECORD_VIEWS[view])
+    return None
+
 @app.get("/api/feeling-analytics/records")
-async def get_records(limit: int = 100, offset: int = 0, agent_email: Optional[str] = None):
-    """Get call records with full sentiment analysis. Can filter by agent_email."""
+async def get_records(
+    limit: int = 100,
+    offset: int = 0,
+    agent_email: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None
+):
+    """Get call records with full sentiment analysis. Can filter by agent_email.
+    fields=a,b,c or view=summary restrict the selected columns."""
+    columns = _record_projection(fields, view)
     try:
         # DEBUG: Show what parameters we received
-        print(f"📊 GET /records: agent_email={agent_email}, limit={limit}, offset={offset}")
+        logger.debug("📊 GET /records: agent_email=%s, limit=%s, offset=%s", agent_email, limit, offset)
         
         # If agent_email is empty string, treat as None
         if agent_email == "":
             agent_email = None
             
-        records = db_service.get_records(limit=limit, offset=offset, agent_email=agent_email)
-        print(f"   → Devolviendo {len(records)} registros")
-        
-        # Convert any datetimes
-        for record in records:
-            for k, v in record.items():
-                if hasattr(v, "isoformat"):
-                    record[k] = v.isoformat()
+        records = db_service.get_records(limit=limit, offset=offset, agent_email=agent_email, columns=columns)
+        logger.debug("→ Devolviendo %d registros", len(records))
         
-        return JSONResponse(content=records)
+        return FastJSONResponse(content=records)
+    except Exception as e:
+        logger.exception("✗ Error en get_records: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/feeling-analytics/stream")
+async def stream_results(request: Request, agent_email: Optional[str] = None):
+    """Server-Sent Events feed of saved results.
+
+    Sends a 'statistics' snapshot on connect (the agent's own totals with agent_email),
+    then one 'result' event per saved call carrying per-channel scores and stats_delta
+    (record_count/sum_final_score) to fold into the snapshot. Events at or below the
+    snapshot's data_version are already counted and are not sent. 'invalidate' (after
+    retention or backfills) and 'resync' (events were dropped) mean: refetch and continue.
+    """
+    # Subscribed before the snapshot is read, so no commit falls between the two
+    queue = result_broadcaster.subscribe()
+
+    async def events():
+        try:
+            stats = await asyncio.to_thread(db_service.get_statistics_snapshot, agent_email or None)
+            snapshot_version = stats['data_version']
+            yield format_sse("statistics", stats)
+            while not await request.is_disconnected():
+                try:
+                    event_id, event = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment frame keeps proxies and load balancers from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                if event.get('data_version', snapshot_version + 1) <= snapshot_version:
+                    continue
+                if agent_email and event.get('type') == 'result' and event.get('agent_email') != agent_email:
+                    continue
+                yield format_sse(event.get('type', 'result'), event, event_id)
+        finally:
+            result_broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/feeling-analytics/export")
+async def export_records(
+    format: str = "ndjson",
+    channel: str = "caller",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    agent_email: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Stream every matching record as NDJSON, CSV or Parquet (server-side cursor, constant memory)"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    if channel not in ("caller", "client"):
+        raise HTTPException(status_code=400, detail=f"Unknown channel: {channel}")
+    try:
+        columns = db_service.resolve_columns(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    batches = db_service.iter_records(
+        channel=channel, columns=columns, since=since, until=until, agent_email=agent_email or None
+    )
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        iter_export(format, columns, batches),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{channel}_records.{extension}"'}
+    )
+
+class BatchGetRequest(BaseModel):
+    id_calls: List[str]
+    fields: Optional[str] = None
+    view: Optional[str] = None
+
+
+@app.post("/api/feeling-analytics/records:batchGet")
+async def batch_get_records(body: BatchGetRequest):
+    """Get full records (both channels) for up to BATCH_GET_MAX_IDS calls in one query, keyed by id_call.
+    fields=a,b,c or view=summary restrict the selected columns."""
+    id_calls = list(dict.fromkeys(body.id_calls))
+    if len(id_calls) > BATCH_GET_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_GET_MAX_IDS} id_calls per request")
+    columns = _record_projection(body.fields, body.view)
+    try:
+        records = db_service.get_records_by_id_calls(id_calls, columns=columns)
+        return FastJSONResponse(content={
+            "records": records,
+            "missing": [id_call for id_call in id_calls if id_call not in records]
+        })
     except Exception as e:
-        print(f"✗ Error en get_records: {e}")
-        import traceback
-        traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/feeling-analytics/records/{audio_id}")
-async def get_record(audio_id: str):
+async def get_record(audio_id: str, fields: Optional[str] = None, view: Optional[str] = None):
+    """Get a call's record with both channels; fields=a,b,c or view=summary restrict the selected columns"""
+    columns = _record_projection(fields, view)
     try:
-        record = db_service.get_record_by_id_call(audio_id)
+        record = db_service.get_record_by_id_call(audio_id, columns=columns)
         if not record:
             raise HTTPException(status_code=404, detail="Record not found")
-        for k, v in record.items():
-            if hasattr(v, "isoformat"):
-                record[k] = v.isoformat()
-        return JSONResponse(content=record)
+        return FastJSONResponse(content=record)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/feeling-analytics/caller-records")
-async def get_caller_records(limit: int = 100, offset: int = 0, agent_email: Optional[str] = None):
+async def get_caller_records(
+    limit: int = 100,
+    offset: int = 0,
+    agent_email: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None
+):
     """Get records from caller table, optionally filtered by agent_email"""
+    columns = _record_projection(fields, view)
     try:
-        records = db_service.get_caller_records(limit=limit, offset=offset, agent_email=agent_email)
-        for record in records:
-            for k, v in record.items():
-                if hasattr(v, "isoformat"):
-                    record[k] = v.isoformat()
-        return JSONResponse(content=records)
+        records = db_service.get_caller_records(limit=limit, offset=offset, agent_email=agent_email, columns=columns)
+        return FastJSONResponse(content=records)
     except Exception as e:
-        print("ERROR IN GET_CALLER_RECORDS:", e)
+        logger.exception("Error in get_caller_records: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/feeling-analytics/client-records")
-async def get_client_records(limit: int = 100, offset: int = 0, agent_email: Optional[str] = None):
+async def get_client_records(
+    limit: int = 100,
+    offset: int = 0,
+    agent_email: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None
+):
     """Get records from client table, optionally filtered by agent_email"""
+    columns = _record_projection(fields, view)
     try:
-        records = db_service.get_client_records(limit=limit, offset=offset, agent_email=agent_email)
-        for record in records:
-            for k, v in record.items():
-                if hasattr(v, "isoformat"):
-                    record[k] = v.isoformat()
-        return JSONResponse(content=records)
+        records = db_service.get_client_records(limit=limit, offset=offset, agent_email=agent_email, columns=columns)
+        return FastJSONResponse(content=records)
     except Exception as e:
-        print("ERROR IN GET_CLIENT_RECORDS:", e)
+        logger.exception("Error in get_client_records: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/feeling-analytics/caller-records/{audio_id}")
-async def get_caller_record(audio_id: str):
+async def get_caller_record(audio_id: str, fields: Optional[str] = None, view: Optional[str] = None):
     """Get specific caller record by audio ID"""
+    columns = _record_projection(fields, view)
     try:
-        record = db_service.get_caller_by_id(audio_id)
+        record = db_service.get_caller_by_id(audio_id, columns=columns)
         if not record:
             raise HTTPException(status_code=404, detail="Caller record not found")
-        for k, v in record.items():
-            if hasattr(v, "isoformat"):
-                record[k] = v.isoformat()
-        return JSONResponse(content=record)
+        return FastJSONResponse(content=record)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/feeling-analytics/client-records/{audio_id}")
-async def get_client_record(audio_id: str):
+async def get_client_record(audio_id: str, fields: Optional[str] = None, view: Optional[str] = None):
     """Get specific client record by audio ID"""
+    columns = _record_projection(fields, view)
     try:
-        record = db_service.get_client_by_id(audio_id)
+        record = db_service.get_client_by_id(audio_id, columns=columns)
         if not record:
             raise HTTPException(status_code=404, detail="Client record not found")
-        for k, v in record.items():
-            if hasattr(v, "isoformat"):
-                record[k] = v.isoformat()
-        return JSONResponse(content=record)
+        return FastJSONResponse(content=record)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _statistics_payload():
+    stats = db_service.get_statistics()
+    return {
+        "total_audios": stats.get("total_records", 0),
+        "total_llamadas": stats.get("total_records", 0),
+        "confianza_promedio": round(stats.get("avg_final_score", 0.0), 2),
+        "avg_caller_score": round(stats.get("avg_caller_score", 0.0), 2),
+        "avg_client_score": round(stats.get("avg_client_score", 0.0), 2),
+        "total_caller_records": stats.get("total_caller_records", 0),
+        "total_client_records": stats.get("total_client_records", 0),
+        "stereo_percentage": 50.0,  # Placeholder - calculate from DB if needed
+        "mono_percentage": 50.0     # Placeholder - calculate from DB if needed
+    }
+
 @app.get("/api/statistics")
-async def get_statistics():
+async def get_statistics(request: Request):
     """Alias for /api/feeling-analytics/statistics"""
     try:
-        stats = db_service.get_statistics()
-        return JSONResponse(content={
-            "total_audios": stats.get("total_records", 0),
-            "total_llamadas": stats.get("total_records", 0),
-            "confianza_promedio": round(stats.get("avg_final_score", 0.0), 2),
-            "avg_caller_score": round(stats.get("avg_caller_score", 0.0), 2),
-            "avg_client_score": round(stats.get("avg_client_score", 0.0), 2),
-            "total_caller_records": stats.get("total_caller_records", 0),
-            "total_client_records": stats.get("total_client_records", 0),
-            "stereo_percentage": 50.0,  # Placeholder - calculate from DB if needed
-            "mono_percentage": 50.0     # Placeholder - calculate from DB if needed
-        })
+        return metrics_cache.respond(request, _statistics_payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/records")
-async def get_records_alias(limit: int = 100, offset: int = 0, agent_email: Optional[str] = None):
+async def get_records_alias(
+    limit: int = 100,
+    offset: int = 0,
+    agent_email: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None
+):
     """Alias for /api/feeling-analytics/records"""
+    columns = _record_projection(fields, view)
     try:
-        records = db_service.get_records(limit=limit, offset=offset, agent_email=agent_email)
-        for record in records:
-            for k, v in record.items():
-                if hasattr(v, "isoformat"):
-                    record[k] = v.isoformat()
-        return JSONResponse(content=records)
+        records = db_service.get_records(limit=limit, offset=offset, agent_email=agent_email, columns=columns)
+        return FastJSONResponse(content=records)
     except Exception as e:
-        print(f"Error en get_records: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error en get_records: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/metrics/agents")
-async def get_metrics_agents(limit: int = 1000):
-    """Get agent metrics - performance by each agent"""
-    try:
-        records = db_service.get_records(limit=limit)
-        agent_stats = {}
+def _agent_metrics(limit):
+    records = db_service.get_records(
+        limit=limit, columns=['agent_name', 'agent_email', 'final_score', 'valence_score', 'arousal_score']
+    )
+    agent_stats = {}
+    
+    for record in records:
+        # Use agent_name if available, fallback to agent_email
+        name = record.get('agent_name') or record.get('agent_email', 'unknown')
+        email = record.get('agent_email', 'unknown')
         
-        for record in records:
-            # Use agent_name if available, fallback to agent_email
-            name = record.get('agent_name') or record.get('agent_email', 'unknown')
-            email = record.get('agent_email', 'unknown')
-            
-            if name not in agent_stats:
-                agent_stats[name] = {
-                    'name': name,
-                    'email': email,
-                    'total_calls': 0,
-                    'avg_confidence': 0.0,
-                    'avg_valence': 0.0,
-                    'avg_arousal': 0.0,
-                    'scores': [],
-                    'valences': [],
-                    'arousals': []
-                }
-            
-            agent_stats[name]['total_calls'] += 1
-            final_score = float(record.get('final_score', 0.0) or 0.0)
-            agent_stats[name]['scores'].append(final_score)
-            
-            # Get valence and arousal directly from record (not from nested 'caller' object)
-            valence = float(record.get('valence_score', 0.0) or 0.0)
-            arousal = float(record.get('arousal_score', 0.0) or 0.0)
-            agent_stats[name]['valences'].append(valence)
-            agent_stats[name]['arousals'].append(arousal)
+        if name not in agent_stats:
+            agent_stats[name] = {
+                'name': name,
+                'email': email,
+                'total_calls': 0,
+                'avg_confidence': 0.0,
+                'avg_valence': 0.0,
+                'avg_arousal': 0.0,
+                'scores': [],
+                'valences': [],
+                'arousals': []
+            }
         
-        # Calculate averages
-        for name in agent_stats:
-            stats = agent_stats[name]
-            if stats['scores']:
-                stats['avg_confidence'] = round(sum(stats['scores']) / len(stats['scores']) * 100, 2)
-            if stats['valences']:
-                stats['avg_valence'] = round(sum(stats['valences']) / len(stats['valences']), 3)
-            if stats['arousals']:
-                stats['avg_arousal'] = round(sum(stats['arousals']) / len(stats['arousals']), 3)
-            
-            # Clean up
-            stats.pop('scores', None)
-            stats.pop('valences', None)
-            stats.pop('arousals', None)
+        agent_stats[name]['total_calls'] += 1
+        final_score = float(record.get('final_score', 0.0) or 0.0)
+        agent_stats[name]['scores'].append(final_score)
+        
+        # Get valence and arousal directly from record (not from nested 'caller' object)
+        valence = float(record.get('valence_score', 0.0) or 0.0)
+        arousal = float(record.get('arousal_score', 0.0) or 0.0)
+        agent_stats[name]['valences'].append(valence)
+        agent_stats[name]['arousals'].append(arousal)
+    
+    # Calculate averages
+    for name in agent_stats:
+        stats = agent_stats[name]
+        if stats['scores']:
+            stats['avg_confidence'] = round(sum(stats['scores']) / len(stats['scores']) * 100, 2)
+        if stats['valences']:
+            stats['avg_valence'] = round(sum(stats['valences']) / len(stats['valences']), 3)
+        if stats['arousals']:
+            stats['avg_arousal'] = round(sum(stats['arousals']) / len(stats['arousals']), 3)
         
-        return JSONResponse(content=list(agent_stats.values()))
+        # Clean up
+        stats.pop('scores', None)
+        stats.pop('valences', None)
+        stats.pop('arousals', None)
+    
+    return list(agent_stats.values())
+
+@app.get("/api/metrics/agents")
+async def get_metrics_agents(request: Request, limit: int = 1000):
+    """Get agent metrics - performance by each agent"""
+    try:
+        return metrics_cache.respond(request, lambda: _agent_metrics(limit))
     except Exception as e:
-        print(f"Error in get_metrics_agents: {e}")
+        logger.exception("Error in get_metrics_agents: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/metrics/emotions")
-async def get_metrics_emotions():
-    """Get emotion metrics"""
+async def get_metrics_emotions(request: Request, agent_email: Optional[str] = None, channel: Optional[str] = None):
+    """Get emotion metrics across caller and client channels (aggregated in SQL)"""
+    if channel not in (None, "caller", "client"):
+        raise HTTPException(status_code=400, detail=f"Unknown channel: {channel}")
     try:
-        records = db_service.get_records(limit=1000)
-        emotion_stats = {}
-        for record in records:
-            # Get all_scores from both caller and client
-            for channel in ['caller', 'client']:
-                channel_data = record.get(channel, {})
-                all_scores = channel_data.get('all_scores', {})
-                for emotion, score in all_scores.items():
-                    if emotion not in emotion_stats:
-                        emotion_stats[emotion] = {'emotion': emotion, 'avg_score': 0.0, 'count': 0, 'scores': []}
-                    emotion_stats[emotion]['scores'].append(score)
-                    emotion_stats[emotion]['count'] += 1
-        
-        # Calculate averages
-        for emotion in emotion_stats:
-            if emotion_stats[emotion]['scores']:
-                emotion_stats[emotion]['avg_score'] = round(sum(emotion_stats[emotion]['scores']) / len(emotion_stats[emotion]['scores']), 2)
-            emotion_stats[emotion].pop('scores', None)
-        
-        return JSONResponse(content=list(emotion_stats.values()))
+        return metrics_cache.respond(
+            request, lambda: db_service.get_emotion_metrics(agent_email=agent_email or None, channel=channel)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/metrics/daily")
-async def get_metrics_daily(days: int = 30):
-    """Get daily metrics for last N days"""
+async def get_metrics_daily(request: Request, days: int = 30, agent_email: Optional[str] = None):
+    """Get daily metrics for last N days (served from the daily_metrics rollup)"""
     try:
-        from datetime import timedelta
-        records = db_service.get_records(limit=10000)
-        daily_stats = {}
-        
-        for record in records:
-            analysis_date = record.get('analysis_date')
-            if isinstance(analysis_date, str):
-                date_obj = datetime.fromisoformat(analysis_date.replace('Z', '+00:00'))
-                date_key = date_obj.strftime('%Y-%m-%d')
-            else:
-                date_key = 'unknown'
-            
-            if date_key not in daily_stats:
-                daily_stats[date_key] = {
-                    'date': date_key,
-                    'total_calls': 0,
-                    'avg_score': 0.0,
-                    'scores': []
-                }
-            daily_stats[date_key]['total_calls'] += 1
-            daily_stats[date_key]['scores'].append(record.get('final_score', 0.0))
-        
-        # Calculate averages
-        for date in daily_stats:
-            if daily_stats[date]['scores']:
-                daily_stats[date]['avg_score'] = round(sum(daily_stats[date]['scores']) / len(daily_stats[date]['scores']), 2)
-            daily_stats[date].pop('scores', None)
-        
-        return JSONResponse(content=list(daily_stats.values()))
+        return metrics_cache.respond(
+            request, lambda: db_service.get_daily_metrics(days=days, agent_email=agent_email or None)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/feeling-analytics/statistics")
-async def get_statistics_short():
+async def get_statistics_short(request: Request):
     """Get statistics (backward compatibility route)"""
     try:
-        stats = db_service.get_statistics()
-        return JSONResponse(content={
-            "total_audios": stats.get("total_records", 0),
-            "total_llamadas": stats.get("total_records", 0),
-            "confianza_promedio": round(stats.get("avg_final_score", 0.0), 2),
-            "avg_caller_score": round(stats.get("avg_caller_score", 0.0), 2),
-            "avg_client_score": round(stats.get("avg_client_score", 0.0), 2),
-            "total_caller_records": stats.get("total_caller_records", 0),
-            "total_client_records": stats.get("total_client_records", 0),
-            "stereo_percentage": 50.0,  # Placeholder
-            "mono_percentage": 50.0     # Placeholder
-        })
+        return metrics_cache.respond(request, _statistics_payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
-    print("Iniciando API de Análisis de Sentimientos Multichannel...")
-    print("API: http://localhost:8000")
-    print("Docs: http://localhost:8000/docs")
+    logger.info("Iniciando API de Análisis de Sentimientos Multichannel...")
+    logger.info("API: http://localhost:8000 | Docs: http://localhost:8000/docs")
     
     uvicorn.run("feeling_analyser_api:app", host="0.0.0.0", port=8000, reload=True)
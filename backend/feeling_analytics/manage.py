@@ -0,0 +1,125 @@
+"""Maintenance commands for the feeling analytics database.
+
+Usage:
+    python -m feeling_analytics.manage backfill-daily-metrics
+    python -m feeling_analytics.manage backfill-emotion-columns [--batch-size N]
+    python -m feeling_analytics.manage backfill-result-counters
+    python -m feeling_analytics.manage partition-tables
+    python -m feeling_analytics.manage ensure-partitions
+    python -m feeling_analytics.manage apply-retention [--keep-months N] [--archive-dir DIR] [--dry-run]
+    python -m feeling_analytics.manage purge-jobs [--keep-days N]
+    python -m feeling_analytics.manage export --output FILE [--format ndjson|csv|parquet]
+        [--channel caller|client] [--since ISO] [--until ISO] [--agent-email EMAIL] [--fields a,b,c]
+
+apply-retention is meant to run from cron (e.g. monthly); it detaches result
+partitions older than the retention window, archives them as .csv.gz and drops them.
+"""
+import argparse
+from datetime import datetime
+
+from .services.database_service import DatabaseService
+from .services.export_service import EXPORT_FORMATS, write_export
+from .services.job_queue import JobQueue
+from .services.logs import configure_logging
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m feeling_analytics.manage")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser(
+        "backfill-daily-metrics",
+        help="Rebuild the daily_metrics rollup from caller_results/client_results"
+    )
+    emotions_parser = subparsers.add_parser(
+        "backfill-emotion-columns",
+        help="Copy all_scores JSONB into the typed per-emotion columns"
+    )
+    emotions_parser.add_argument("--batch-size", type=int, default=5000)
+    subparsers.add_parser(
+        "backfill-result-counters",
+        help="Recompute the result_counters rows used by the statistics endpoints"
+    )
+    subparsers.add_parser(
+        "partition-tables",
+        help="Migrate legacy caller_results/client_results into monthly partitions"
+    )
+    subparsers.add_parser(
+        "ensure-partitions",
+        help="Create monthly partitions up to PARTITION_MONTHS_AHEAD"
+    )
+    retention_parser = subparsers.add_parser(
+        "apply-retention",
+        help="Archive and drop result partitions older than the retention window"
+    )
+    retention_parser.add_argument("--keep-months", type=int, default=None)
+    retention_parser.add_argument("--archive-dir", default=None)
+    retention_parser.add_argument("--dry-run", action="store_true")
+    purge_parser = subparsers.add_parser(
+        "purge-jobs",
+        help="Delete finished analysis jobs older than JOB_RETENTION_DAYS (workers also do this while idle)"
+    )
+    purge_parser.add_argument("--keep-days", type=float, default=None)
+    export_parser = subparsers.add_parser(
+        "export",
+        help="Stream analysis records to a NDJSON, CSV or Parquet file"
+    )
+    export_parser.add_argument("--output", required=True)
+    export_parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson")
+    export_parser.add_argument("--channel", choices=["caller", "client"], default="caller")
+    export_parser.add_argument("--since", type=datetime.fromisoformat, default=None)
+    export_parser.add_argument("--until", type=datetime.fromisoformat, default=None)
+    export_parser.add_argument("--agent-email", default=None)
+    export_parser.add_argument("--fields", default=None)
+    export_parser.add_argument("--itersize", type=int, default=2000)
+    args = parser.parse_args(argv)
+    configure_logging(fmt='text')
+
+    db_service = DatabaseService()
+    db_service.create_tables()
+
+    if args.command == "backfill-daily-metrics":
+        rows = db_service.backfill_daily_metrics()
+        print(f"✓ daily_metrics rebuilt: {rows} rows")
+    elif args.command == "backfill-emotion-columns":
+        rows = db_service.backfill_emotion_columns(batch_size=args.batch_size)
+        print(f"✓ Emotion columns backfilled: {rows} rows")
+    elif args.command == "backfill-result-counters":
+        db_service.backfill_result_counters()
+        print("✓ result_counters rebuilt")
+    elif args.command == "partition-tables":
+        db_service.migrate_to_partitioned()
+        db_service.ensure_partitions()
+    elif args.command == "ensure-partitions":
+        horizon = db_service.ensure_partitions()
+        print(f"✓ Partitions ready until {horizon}")
+    elif args.command == "apply-retention":
+        archived = db_service.apply_retention(
+            keep_months=args.keep_months,
+            archive_dir=args.archive_dir,
+            dry_run=args.dry_run
+        )
+        label = "Would archive" if args.dry_run else "Archived"
+        print(f"✓ {label} {len(archived)} partitions")
+        for item in archived:
+            print(f"   {item}")
+    elif args.command == "purge-jobs":
+        queue = JobQueue(db_service)
+        queue.create_table()
+        purged = queue.purge_finished(keep_days=args.keep_days)
+        print(f"✓ Purged {purged} finished jobs")
+    elif args.command == "export":
+        columns = db_service.resolve_columns(args.fields)
+        batches = db_service.iter_records(
+            channel=args.channel,
+            columns=columns,
+            since=args.since,
+            until=args.until,
+            agent_email=args.agent_email,
+            itersize=args.itersize
+        )
+        written = write_export(args.output, args.format, columns, batches)
+        print(f"✓ Exported {args.channel} records to {args.output} ({written} bytes)")
+
+
+if __name__ == "__main__":
+    main()
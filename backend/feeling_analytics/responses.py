@@ -0,0 +1,40 @@
+from fastapi.responses import JSONResponse, Response
+
+from .services.cache import TTLCache
+from .services.serialization import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson; datetimes, numpy types and Decimal need no pre-processing"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class ResponseCache:
+    """Serialized JSON responses keyed by path + query and tagged with the data version.
+
+    The ETag is W/"<data version>", so If-None-Match is answered with 304 from memory,
+    and entries from an older version are never served (the version is part of the key).
+    """
+
+    def __init__(self, version, ttl, maxsize):
+        self._version = version
+        self._cache = TTLCache(ttl, maxsize=maxsize)
+
+    def respond(self, request, compute, ttl=None):
+        version = self._version()
+        etag = f'W/"{version}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+
+        key = (version, request.url.path, tuple(sorted(request.query_params.multi_items())))
+        body = self._cache.get(key)
+        if body is None:
+            body = dumps(compute())
+            self._cache.set(key, body, ttl)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def clear(self):
+        self._cache.clear()
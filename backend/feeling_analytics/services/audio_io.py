@@ -0,0 +1,405 @@
+"""
+Audio decoding helpers that do not depend on the model stack.
+
+Everything here is a plain module-level function so it can run in worker
+processes (ProcessPoolExecutor) without importing torch or loading models.
+
+Files are decoded at their native rate and resampled once with soxr's polyphase
+resampler; RESAMPLE_QUALITY picks fast, balanced (default, librosa's soxr_hq) or
+high. 8 kHz G.711 (mu-law / A-law) WAVs, the usual call-center recording, are
+decoded straight from the bytes through 256-entry lookup tables.
+
+stream_channels() decodes in DECODE_BLOCK_SECONDS blocks and keeps only what the
+analysis needs: the first MODEL_WINDOW_SECONDS of each channel (all Whisper sees)
+and running statistics over the whole recording. Buffers are charged to a
+MemoryBudget (ANALYSIS_MEMORY_BUDGET_MB), so a long file cannot grow memory
+with its length, and the peak is reported with the result.
+"""
+
+import os
+from contextlib import contextmanager
+import struct
+import subprocess
+import tempfile
+
+import librosa
+import numpy as np
+import soundfile as sf
+import soxr
+
+SAMPLING_RATE = 16000
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.m4a', '.ogg', '.flac')
+# Containers libsndfile decodes itself, so no WAV conversion is needed first
+NATIVE_EXTENSIONS = ('.wav', '.flac', '.ogg')
+
+# RESAMPLE_QUALITY -> soxr preset; balanced is what librosa.load used before
+RESAMPLE_QUALITIES = {
+    'fast': 'LQ',
+    'balanced': 'HQ',
+    'high': 'VHQ',
+}
+RESAMPLE_QUALITY = os.getenv('RESAMPLE_QUALITY', 'balanced').lower()
+
+DECODE_BLOCK_SECONDS = float(os.getenv('DECODE_BLOCK_SECONDS', '10'))
+ANALYSIS_MEMORY_BUDGET_MB = float(os.getenv('ANALYSIS_MEMORY_BUDGET_MB', '128'))
+# Whisper pads/truncates its input to 30 s; later audio never reaches the model
+MODEL_WINDOW_SECONDS = 30
+
+WAVE_FORMAT_ALAW = 6
+WAVE_FORMAT_MULAW = 7
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _mulaw_table():
+    codes = ~np.arange(256, dtype=np.uint8)
+    exponent = (codes >> 4) & 0x07
+    mantissa = (codes & 0x0F).astype(np.int32)
+    magnitude = (((mantissa << 3) + 0x84) << exponent) - 0x84
+    return (np.where(codes & 0x80, -magnitude, magnitude) / 32768.0).astype(np.float32)
+
+
+def _alaw_table():
+    codes = np.arange(256, dtype=np.uint8) ^ 0x55
+    exponent = ((codes >> 4) & 0x07).astype(np.int32)
+    mantissa = (codes & 0x0F).astype(np.int32)
+    magnitude = np.where(
+        exponent == 0,
+        (mantissa << 4) + 8,
+        ((mantissa << 4) + 0x108) << np.maximum(exponent - 1, 0),
+    )
+    return (np.where(codes & 0x80, magnitude, -magnitude) / 32768.0).astype(np.float32)
+
+
+# G.711 byte -> float32 sample, same scale as libsndfile's 16-bit PCM decode
+G711_TABLES = {WAVE_FORMAT_MULAW: _mulaw_table(), WAVE_FORMAT_ALAW: _alaw_table()}
+
+
+def _wav_chunks(f):
+    """Yield (chunk id, size, offset of data) for each chunk of a RIFF/WAVE file"""
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return
+        chunk_id, size = struct.unpack('<4sI', chunk)
+        offset = f.tell()
+        yield chunk_id, size, offset
+        f.seek(offset + size + (size & 1))
+
+
+def _g711_header(f):
+    """(table, channels, rate, data bytes) with f positioned at the samples, or None if not G.711"""
+    fmt = None
+    for chunk_id, size, offset in _wav_chunks(f):
+        if chunk_id == b'fmt ':
+            fmt = f.read(size)
+            if len(fmt) < 16:
+                return None
+        elif chunk_id == b'data' and fmt is not None:
+            format_tag, channels, rate = struct.unpack('<HHI', fmt[:8])
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                # First two bytes of the SubFormat GUID carry the real format tag
+                format_tag = struct.unpack('<H', fmt[24:26])[0]
+            table = G711_TABLES.get(format_tag)
+            if table is None or channels == 0:
+                return None
+            return table, channels, rate, size
+    return None
+
+
+def _decode_g711(table, codes, channels):
+    codes = np.frombuffer(codes, dtype=np.uint8)
+    codes = codes[:len(codes) - len(codes) % channels]
+    return table[codes].reshape(-1, channels)
+
+
+def read_g711_wav(path):
+    """((channels, frames) float32, rate) for a mu-law/A-law WAV, or None for anything else"""
+    with open(path, 'rb') as f:
+        header = _g711_header(f)
+        if header is None:
+            return None
+        table, channels, rate, size = header
+        return _decode_g711(table, f.read(size), channels).T, rate
+
+
+def resample(waveform, orig_sr, target_sr=SAMPLING_RATE, quality=None):
+    """Resample a 1-D signal to target_sr as float32; a no-op when the rates match"""
+    orig_sr, target_sr = int(orig_sr), int(target_sr)
+    waveform = np.asarray(waveform, dtype=np.float32)
+    if orig_sr == target_sr:
+        return waveform
+    quality = quality or RESAMPLE_QUALITY
+    if quality not in RESAMPLE_QUALITIES:
+        raise ValueError(f"Unknown resample quality: {quality}")
+    return soxr.resample(waveform, orig_sr, target_sr, quality=RESAMPLE_QUALITIES[quality])
+
+
+def ffmpeg_to_wav(path, sr=SAMPLING_RATE):
+    """Convert a file to a 16-bit PCM WAV at `sr` with ffmpeg, streamed to disk; returns the temp path"""
+    wav_path = tempfile.NamedTemporaryFile(suffix='.wav', delete=False).name
+    try:
+        subprocess.run(
+            ['ffmpeg', '-i', path, '-acodec', 'pcm_s16le', '-ar', str(sr), wav_path, '-y'],
+            check=True, capture_output=True
+        )
+    except Exception:
+        os.unlink(wav_path)
+        raise
+    return wav_path
+
+
+class MemoryBudgetExceeded(MemoryError):
+    pass
+
+
+class MemoryBudget:
+    """Bytes held by one analysis' audio buffers; reserving past the limit raises MemoryBudgetExceeded"""
+
+    def __init__(self, limit_mb=None):
+        self.limit = int((ANALYSIS_MEMORY_BUDGET_MB if limit_mb is None else limit_mb) * 1024 * 1024)
+        self.used = 0
+        self.peak = 0
+
+    def reserve(self, nbytes):
+        if self.limit > 0 and self.used + nbytes > self.limit:
+            raise MemoryBudgetExceeded(
+                f"Audio buffers need {(self.used + nbytes) / 2**20:.1f} MB, "
+                f"over the {self.limit / 2**20:.0f} MB analysis budget"
+            )
+        self.used += nbytes
+        self.peak = max(self.peak, self.used)
+
+    def release(self, nbytes):
+        self.used -= nbytes
+
+    @contextmanager
+    def hold(self, nbytes):
+        self.reserve(nbytes)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
+
+
+class ChannelStats:
+    """First keep_samples samples of a channel plus sample count, energy and peak of all of it"""
+
+    def __init__(self, keep_samples):
+        self.head = np.zeros(keep_samples, dtype=np.float32)
+        self.kept = 0
+        self.samples = 0
+        self.sum_squares = 0.0
+        self.peak = 0.0
+
+    def update(self, block):
+        if not len(block):
+            return
+        self.samples += len(block)
+        self.sum_squares += float(np.dot(block, block))
+        self.peak = max(self.peak, float(np.max(np.abs(block))))
+        take = min(len(block), len(self.head) - self.kept)
+        if take > 0:
+            self.head[self.kept:self.kept + take] = block[:take]
+            self.kept += take
+
+    @property
+    def rms(self):
+        return float(np.sqrt(self.sum_squares / self.samples)) if self.samples else 0.0
+
+    @property
+    def waveform(self):
+        """The kept head, scaled by the whole channel's peak when it exceeds 1 (as the model input is)"""
+        head = self.head[:self.kept]
+        return head / self.peak if self.peak > 1 else head
+
+
+@contextmanager
+def _open_blocks(path, sr, block_seconds, budget):
+    """(native rate, channels, iterator of (frames, channels) float32 blocks)"""
+    if path.lower().endswith('.wav'):
+        with open(path, 'rb') as f:
+            header = _g711_header(f)
+            if header is not None:
+                table, channels, rate, size = header
+                block_bytes = max(1, int(block_seconds * rate)) * channels
+
+                def g711_blocks():
+                    remaining = size
+                    while remaining > 0:
+                        codes = f.read(min(block_bytes, remaining))
+                        if not codes:
+                            return
+                        remaining -= len(codes)
+                        yield _decode_g711(table, codes, channels)
+
+                yield rate, channels, g711_blocks()
+                return
+
+    wav_path = None
+    try:
+        try:
+            source = sf.SoundFile(path)
+        except Exception:
+            try:
+                wav_path = ffmpeg_to_wav(path, sr)
+                source = sf.SoundFile(wav_path)
+            except Exception:
+                source = None
+        if source is not None:
+            with source:
+                frames = max(1, int(block_seconds * source.samplerate))
+                yield source.samplerate, source.channels, source.blocks(frames, dtype='float32', always_2d=True)
+            return
+
+        # Last resort (audioread backends): the whole file is decoded at once, so its
+        # estimated size is reserved before decoding and the actual size held after
+        estimate = estimate_decoded_bytes(path)
+        if estimate is None:
+            raise ValueError(f"Cannot read {os.path.basename(path)}: unsupported format")
+        with budget.hold(estimate):
+            waveform, rate = librosa.load(path, sr=None, mono=False)
+        waveform = np.atleast_2d(waveform).T
+        with budget.hold(waveform.nbytes):
+            frames = max(1, int(block_seconds * rate))
+            yield rate, waveform.shape[1], (waveform[i:i + frames] for i in range(0, len(waveform), frames))
+    finally:
+        if wav_path:
+            os.unlink(wav_path)
+
+
+def stream_channels(path, sr=SAMPLING_RATE, keep_seconds=MODEL_WINDOW_SECONDS, block_seconds=None, budget=None):
+    """Decode a file block by block into (caller, client, native rate); channels are ChannelStats at `sr`.
+
+    Mono files return the same ChannelStats twice. Memory stays at the kept heads
+    plus one block, whatever the length of the recording.
+    """
+    budget = budget or MemoryBudget()
+    block_seconds = block_seconds or DECODE_BLOCK_SECONDS
+    keep_samples = int(keep_seconds * sr)
+    with _open_blocks(path, sr, block_seconds, budget) as (rate, channels, blocks):
+        stats = [ChannelStats(keep_samples) for _ in range(min(channels, 2))]
+        heads_bytes = sum(channel.head.nbytes for channel in stats)
+        budget.reserve(heads_bytes)
+        try:
+            resampler = None
+            if rate != sr:
+                resampler = soxr.ResampleStream(
+                    rate, sr, len(stats), dtype='float32', quality=RESAMPLE_QUALITIES[RESAMPLE_QUALITY]
+                )
+            for block in blocks:
+                with budget.hold(block.nbytes):
+                    block = np.ascontiguousarray(block[:, :len(stats)])
+                    if resampler is not None:
+                        block = resampler.resample_chunk(block)
+                    with budget.hold(block.nbytes):
+                        for index, channel in enumerate(stats):
+                            channel.update(block[:, index])
+            if resampler is not None:
+                tail = resampler.resample_chunk(np.zeros((0, len(stats)), dtype=np.float32), last=True)
+                for index, channel in enumerate(stats):
+                    channel.update(tail[:, index])
+        finally:
+            budget.release(heads_bytes)
+    return stats[0], stats[-1], rate
+
+
+def is_native(path):
+    """True if the file can be decoded without converting it to WAV first"""
+    return path.lower().endswith(NATIVE_EXTENSIONS)
+
+
+def read_audio(path, sr=SAMPLING_RATE):
+    """(channels, frames) float32 at the file's own rate, plus that rate"""
+    if path.lower().endswith('.wav'):
+        decoded = read_g711_wav(path)
+        if decoded is not None:
+            return decoded
+    try:
+        waveform, rate = sf.read(path, dtype='float32', always_2d=True)
+        return waveform.T, rate
+    except Exception:
+        pass
+    try:
+        # audioread backends (mp3 without libsndfile support, ...)
+        waveform, rate = librosa.load(path, sr=None, mono=False)
+    except Exception:
+        # Containers libsndfile/audioread cannot open (e.g. some m4a) go through ffmpeg
+        wav_path = ffmpeg_to_wav(path, sr)
+        try:
+            waveform, rate = sf.read(wav_path, dtype='float32', always_2d=True)
+            waveform = waveform.T
+        finally:
+            os.unlink(wav_path)
+    return np.atleast_2d(waveform), rate
+
+
+def load_channels(path, sr=SAMPLING_RATE):
+    """Decode a file into (caller, client) float32 signals at `sr`; mono files return the same signal twice"""
+    waveform, rate = read_audio(path, sr)
+    caller = resample(np.ascontiguousarray(waveform[0]), rate, sr)
+    if waveform.shape[0] == 1:
+        return caller, caller
+    client = resample(np.ascontiguousarray(waveform[1]), rate, sr)
+    return caller, client
+
+
+def load_mono(path, sr=SAMPLING_RATE, max_seconds=None):
+    """Decode a file into one float32 signal at `sr`, averaging its channels.
+
+    With max_seconds only the start of the file is decoded.
+    """
+    if max_seconds is None:
+        waveform, rate = read_audio(path, sr)
+    else:
+        with _open_blocks(path, sr, DECODE_BLOCK_SECONDS, MemoryBudget()) as (rate, channels, blocks):
+            # One extra second keeps the resampler's edge effects past the cut
+            wanted = int((max_seconds + 1) * rate)
+            pieces, frames = [], 0
+            for block in blocks:
+                pieces.append(block)
+                frames += len(block)
+                if frames >= wanted:
+                    break
+            waveform = (np.concatenate(pieces) if pieces else np.zeros((0, channels), dtype=np.float32))[:wanted].T
+    mono = waveform[0] if waveform.shape[0] == 1 else waveform.mean(axis=0)
+    mono = resample(np.ascontiguousarray(mono), rate, sr)
+    return mono if max_seconds is None else mono[:int(max_seconds * sr)]
+
+
+def probe(path):
+    """(native sample rate, channel count) from the file header, or (None, None) if libsndfile cannot read it"""
+    try:
+        info = sf.info(path)
+        return info.samplerate, info.channels
+    except Exception:
+        return None, None
+
+
+def estimate_decoded_bytes(path):
+    """float32 size of the whole file decoded at its own rate, from its header (libsndfile or audioread); None if unreadable"""
+    try:
+        info = sf.info(path)
+        return info.frames * info.channels * 4
+    except Exception:
+        pass
+    try:
+        import audioread
+        with audioread.audio_open(path) as f:
+            return int(f.duration * f.samplerate * f.channels * 4)
+    except Exception:
+        return None
+
+
+def decode_file(path, sr=SAMPLING_RATE):
+    """Process-pool entry point: the model window of each channel plus duration, or the error message"""
+    try:
+        caller, client, _ = stream_channels(path, sr)
+        return {
+            'path': path, 'caller': caller.waveform, 'client': client.waveform,
+            'duration': caller.samples / sr, 'error': None,
+        }
+    except Exception as e:
+        return {'path': path, 'caller': None, 'client': None, 'duration': 0.0, 'error': str(e)}
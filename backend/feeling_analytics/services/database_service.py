@@ -1,9 +1,43 @@
 import os
+import gzip
+import time
+import uuid
+import threading
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import datetime
-import json
-import numpy as np
+from pathlib import Path
+from .emotions import MAIN_EMOTIONS, EMOTION_COLUMNS
+from .cache import TTLCache
+from .logs import get_logger
+from .serialization import dumps_str
+from .telemetry import DB_CONNECT_SECONDS, current_timings, stage
+from .partitions import (
+    month_start, add_months, is_partitioned, create_month_partitions, list_month_tables
+)
+
+logger = get_logger(__name__)
+
+# (result key, table) for each analysed audio channel
+RESULT_TABLES = (('caller', 'caller_results'), ('client', 'client_results'))
+
+# Columns that callers may select from the result tables
+RECORD_COLUMNS = (
+    'id', 'id_call', 'dni', 'agent_email', 'agent_name', 'analysis_date',
+    'final_score', 'valence_score', 'arousal_score', 'all_scores', 'advice',
+    'transcript', 'alerts', 'alert_count', 'top_emotions', 'created_at',
+    *EMOTION_COLUMNS.values(),
+)
+
+# Per-channel fields nested under 'caller'/'client' in combined records
+CHANNEL_FIELDS = ('final_score', 'valence_score', 'arousal_score', 'all_scores', 'advice', 'transcript', 'top_emotions')
+
+# Named column selections for the record endpoints (view=...)
+RECORD_VIEWS = {
+    'summary': ('id_call', 'agent_name', 'analysis_date', 'final_score', 'valence_score', 'arousal_score'),
+    'full': RECORD_COLUMNS,
+}
+
 
 class DatabaseService:
     def __init__(self):
@@ -12,8 +46,21 @@ class DatabaseService:
         self.user = os.getenv('DB_USER', 'postgres')
         self.password = os.getenv('DB_PASSWORD', 'admin')
         self.port = os.getenv('DB_PORT', '5432')
+        # /health, /api/statistics and the dashboards all read statistics; keep them briefly in memory
+        self._stats_cache = TTLCache(float(os.getenv('STATS_CACHE_TTL', '5')))
+        # Monthly partitions of the result tables: how far ahead to create them and how long to keep them
+        self.partition_months_ahead = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+        self.retention_months = int(os.getenv('RETENTION_MONTHS', '12'))
+        self.archive_dir = Path(os.getenv('ARCHIVE_DIR', str(Path(__file__).parent.parent.parent / 'archive')))
+        self._partitions_ready_until = None
+        # Postgres NOTIFY channel that carries saved results to the /stream listeners
+        self.notify_channel = os.getenv('RESULTS_NOTIFY_CHANNEL', 'analysis_results')
+        # Last data_version seen by this process (loaded lazily, advanced by saves and notifications)
+        self._data_version = None
+        self._data_version_lock = threading.Lock()
 
     def get_connection(self):
+        start = time.perf_counter()
         try:
             return psycopg2.connect(
                 host=self.host,
@@ -23,8 +70,10 @@ class DatabaseService:
                 port=self.port
             )
         except Exception as e:
-            print(f"Error connecting to DB: {e}")
+            logger.error("Error connecting to DB: %s", e)
             raise
+        finally:
+            DB_CONNECT_SECONDS.observe(time.perf_counter() - start)
 
     def create_tables(self):
         """Create all necessary tables if they don't exist"""
@@ -46,45 +95,9 @@ class DatabaseService:
                 )
             """)
 
-            # caller_results table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS caller_results (
-                    id SERIAL PRIMARY KEY,
-                    id_call VARCHAR(255) UNIQUE NOT NULL,
-                    dni VARCHAR(50),
-                    agent_email VARCHAR(255),
-                    analysis_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    final_score FLOAT,
-                    valence_score FLOAT,
-                    arousal_score FLOAT,
-                    all_scores JSONB,
-                    advice TEXT,
-                    transcript TEXT,
-                    alerts JSONB,
-                    alert_count INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # client_results table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS client_results (
-                    id SERIAL PRIMARY KEY,
-                    id_call VARCHAR(255) UNIQUE NOT NULL,
-                    dni VARCHAR(50),
-                    agent_email VARCHAR(255),
-                    analysis_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    final_score FLOAT,
-                    valence_score FLOAT,
-                    arousal_score FLOAT,
-                    all_scores JSONB,
-                    advice TEXT,
-                    transcript TEXT,
-                    alerts JSONB,
-                    alert_count INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+            # caller_results / client_results (partitioned by month on analysis_date)
+            self._create_result_table(cursor, 'caller_results')
+            self._create_result_table(cursor, 'client_results')
 
             # Add agent_email column if it doesn't exist
             cursor.execute("""
@@ -116,127 +129,672 @@ class DatabaseService:
                 ADD COLUMN IF NOT EXISTS top_emotions JSONB
             """)
 
+            # One typed REAL column per emotion so aggregations never touch the JSONB blobs
+            for _, table in RESULT_TABLES:
+                for column in EMOTION_COLUMNS.values():
+                    cursor.execute(f"""
+                        ALTER TABLE {table}
+                        ADD COLUMN IF NOT EXISTS {column} REAL
+                    """)
+
+            # Partitions and indexes only apply once the tables are partitioned (see migrate_to_partitioned)
+            for _, table in RESULT_TABLES:
+                if is_partitioned(cursor, table):
+                    self._create_result_indexes(cursor, table)
+            self._ensure_partitions(cursor)
+
+            # daily_metrics rollup (maintained incrementally by save_result)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS daily_metrics (
+                    day DATE NOT NULL,
+                    agent_email VARCHAR(255) NOT NULL,
+                    channel VARCHAR(16) NOT NULL,
+                    call_count BIGINT NOT NULL DEFAULT 0,
+                    sum_final_score DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    sumsq_final_score DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    sum_valence_score DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    sumsq_valence_score DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    sum_arousal_score DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    sumsq_arousal_score DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, agent_email, channel)
+                )
+            """)
+
+            # Per-channel counters maintained by save_result, so statistics never scan the result tables
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS result_counters (
+                    channel VARCHAR(16) PRIMARY KEY,
+                    record_count BIGINT NOT NULL DEFAULT 0,
+                    sum_final_score DOUBLE PRECISION NOT NULL DEFAULT 0
+                )
+            """)
+            # Bumped in the same transaction as every data change; backs the metrics ETags
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS data_version (
+                    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                    version BIGINT NOT NULL DEFAULT 0
+                )
+            """)
+            cursor.execute("INSERT INTO data_version (id, version) VALUES (TRUE, 0) ON CONFLICT (id) DO NOTHING")
+            # Stage timing breakdown per analysed call (see telemetry.collect_stages)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_perf (
+                    id_call VARCHAR(255) PRIMARY KEY,
+                    recorded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    total_seconds DOUBLE PRECISION NOT NULL,
+                    dominant_stage VARCHAR(64),
+                    stages JSONB NOT NULL,
+                    audio_format VARCHAR(16),
+                    duration_seconds DOUBLE PRECISION,
+                    sample_rate INTEGER,
+                    channels SMALLINT,
+                    peak_memory_bytes BIGINT,
+                    model_tier VARCHAR(32)
+                )
+            """)
+            cursor.execute("ALTER TABLE analysis_perf ADD COLUMN IF NOT EXISTS peak_memory_bytes BIGINT")
+            cursor.execute("ALTER TABLE analysis_perf ADD COLUMN IF NOT EXISTS model_tier VARCHAR(32)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS analysis_perf_recorded_idx ON analysis_perf (recorded_at DESC, total_seconds DESC)")
+
+            cursor.execute("SELECT channel FROM result_counters")
+            seeded = {row[0] for row in cursor.fetchall()}
+            for channel, table in RESULT_TABLES:
+                if channel not in seeded:
+                    self._seed_result_counter(cursor, channel, table)
+
             conn.commit()
-            print("✓ Database tables created/verified")
+            logger.info("✓ Database tables created/verified")
         except Exception as e:
-            print(f"Error creating tables: {e}")
+            logger.error("Error creating tables: %s", e)
             conn.rollback()
         finally:
             cursor.close()
             conn.close()
 
-    def _convert_numpy_types(self, obj):
-        """Convert numpy types to native Python types for JSON serialization"""
-        if isinstance(obj, dict):
-            return {k: self._convert_numpy_types(v) for k, v in obj.items()}
-        elif isinstance(obj, (list, tuple)):
-            return [self._convert_numpy_types(item) for item in obj]
-        elif isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        elif isinstance(obj, datetime):
-            return obj.isoformat()
-        return obj
+    def _create_result_table(self, cursor, table):
+        """Create a result table range-partitioned by month on analysis_date"""
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id SERIAL,
+                id_call VARCHAR(255) NOT NULL,
+                dni VARCHAR(50),
+                agent_email VARCHAR(255),
+                analysis_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                final_score FLOAT,
+                valence_score FLOAT,
+                arousal_score FLOAT,
+                all_scores JSONB,
+                advice TEXT,
+                transcript TEXT,
+                alerts JSONB,
+                alert_count INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, analysis_date)
+            ) PARTITION BY RANGE (analysis_date)
+        """)
+
+    def _create_result_indexes(self, cursor, table):
+        """Indexes on a partitioned result table (cascade to every partition)"""
+        # id_call can no longer be UNIQUE (it would have to include analysis_date);
+        # save_result enforces one row per call under an advisory lock instead
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_id_call_idx ON {table} (id_call)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_analysis_date_idx ON {table} (analysis_date DESC)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_agent_date_idx ON {table} (agent_email, analysis_date DESC)")
+
+    def _ensure_partitions(self, cursor, now=None):
+        """Create monthly partitions from the current month up to partition_months_ahead"""
+        current = month_start(now or datetime.utcnow())
+        horizon = add_months(current, self.partition_months_ahead)
+        # Several workers may start at once; serialize partition DDL
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext('result_partitions'))")
+        for _, table in RESULT_TABLES:
+            if is_partitioned(cursor, table):
+                create_month_partitions(cursor, table, current, horizon)
+        self._partitions_ready_until = horizon
+        return horizon
+
+    def ensure_partitions(self):
+        """Create upcoming monthly partitions in their own transaction"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            horizon = self._ensure_partitions(cursor)
+            conn.commit()
+            return horizon
+        finally:
+            cursor.close()
+            conn.close()
+
+    def migrate_to_partitioned(self):
+        """One-off migration of legacy heap tables to monthly partitions.
+
+        Copies every row under an ACCESS EXCLUSIVE lock, so run it in a maintenance window.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            for _, table in RESULT_TABLES:
+                if is_partitioned(cursor, table):
+                    logger.info("✓ %s already partitioned", table)
+                    continue
+                staging = f"{table}_partitioned"
+                cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+                cursor.execute(f"""
+                    UPDATE {table} SET analysis_date = COALESCE(created_at, now())
+                    WHERE analysis_date IS NULL
+                """)
+                cursor.execute(f"SELECT MIN(analysis_date), MAX(analysis_date) FROM {table}")
+                first, last = cursor.fetchone()
+                now = datetime.utcnow()
+                first_month = month_start(first or now)
+                last_month = max(month_start(last or now), add_months(month_start(now), self.partition_months_ahead))
+
+                # LIKE keeps every column added over time, in the same order, with its defaults
+                cursor.execute(f"""
+                    CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS)
+                    PARTITION BY RANGE (analysis_date)
+                """)
+                cursor.execute(f"ALTER TABLE {staging} ALTER COLUMN analysis_date SET NOT NULL")
+                cursor.execute(f"ALTER TABLE {staging} ADD PRIMARY KEY (id, analysis_date)")
+                # Keep the id sequence alive when the legacy table is dropped
+                cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (table,))
+                sequence = cursor.fetchone()[0]
+                if sequence:
+                    cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {staging}.id")
+                create_month_partitions(cursor, staging, first_month, last_month, name_base=table)
+
+                cursor.execute(f"INSERT INTO {staging} SELECT * FROM {table}")
+                logger.info("✓ %s: %d rows copied into monthly partitions", table, cursor.rowcount)
+                cursor.execute(f"DROP TABLE {table}")
+                cursor.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+                cursor.execute(f"ALTER INDEX {staging}_pkey RENAME TO {table}_pkey")
+                self._create_result_indexes(cursor, table)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def apply_retention(self, keep_months=None, archive_dir=None, dry_run=False):
+        """Detach partitions older than keep_months, archive them as gzipped CSV and drop them.
+
+        daily_metrics keeps the aggregates of archived months; result_counters is reduced.
+        analysis_perf rows older than the cutoff are deleted.
+        """
+        keep_months = self.retention_months if keep_months is None else keep_months
+        archive_dir = Path(archive_dir or self.archive_dir)
+        cutoff = add_months(month_start(datetime.utcnow()), -keep_months)
+        archived = []
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            for channel, table in RESULT_TABLES:
+                for name, month, attached in list_month_tables(cursor, table):
+                    if month >= cutoff:
+                        continue
+                    if dry_run:
+                        archived.append(name)
+                        continue
+                    if attached:
+                        # DETACH locks the parent before the partition, in the same order as
+                        # readers and saves; the detached rows are counted in the same transaction
+                        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                        cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(final_score), 0) FROM {name}")
+                        count, total = cursor.fetchone()
+                        self._apply_result_counter(cursor, channel, -count, -total)
+                        conn.commit()
+                    # A detached table that failed to archive earlier is picked up again here
+                    path = self._archive_table(cursor, name, archive_dir)
+                    cursor.execute(f"DROP TABLE {name}")
+                    conn.commit()
+                    archived.append(str(path))
+                    logger.info("✓ Archived %s → %s", name, path)
+            if not dry_run:
+                cursor.execute("DELETE FROM analysis_perf WHERE recorded_at < %s", (cutoff,))
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+            if archived:
+                self.publish_data_change()
+        return archived
+
+    def _archive_table(self, cursor, name, archive_dir):
+        """Stream a table to <archive_dir>/<name>.csv.gz with COPY"""
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        path = archive_dir / f"{name}.csv.gz"
+        partial = archive_dir / f"{name}.csv.gz.part"
+        with gzip.open(partial, 'wb') as f:
+            cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", f)
+            f.flush()
+            os.fsync(f.fileobj.fileno())
+        os.replace(partial, path)
+        return path
 
     def save_result(self, result):
         """Save analysis result to database"""
         conn = self.get_connection()
         cursor = conn.cursor()
         try:
-            call_id = result.get('id_call', f"call_{datetime.utcnow().isoformat()}")
+            with stage('db_save'):
+                version = self._write_results(cursor, [result])
+                conn.commit()
+            self.observe_data_version(version)
+            logger.info("✓ Result saved: %s (Agent: %s)", result['id_call'], result.get('agent_name', result.get('agent_email', 'unknown')))
+        except Exception as e:
+            logger.exception("Error saving result: %s", e)
+            conn.rollback()
+            cursor.close()
+            conn.close()
+            return False
+
+        # After the commit so db_save is part of the stored breakdown; never fails the save
+        try:
+            if result.get('perf'):
+                self._save_perf(cursor, result['id_call'], result['perf'])
+                conn.commit()
+        except Exception as e:
+            logger.warning("Could not store analysis_perf for %s: %s", result['id_call'], e)
+            conn.rollback()
+        finally:
+            cursor.close()
+            conn.close()
+        return True
+
+    def _save_perf(self, cursor, call_id, perf):
+        stages = perf.get('stages') or {}
+        timings = current_timings()
+        total = timings.elapsed() if timings is not None and timings.stages is stages else sum(stages.values())
+        cursor.execute("""
+            INSERT INTO analysis_perf
+                (id_call, total_seconds, dominant_stage, stages, audio_format, duration_seconds, sample_rate, channels,
+                 peak_memory_bytes, model_tier)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (id_call) DO UPDATE SET
+                recorded_at = CURRENT_TIMESTAMP,
+                total_seconds = EXCLUDED.total_seconds,
+                dominant_stage = EXCLUDED.dominant_stage,
+                stages = EXCLUDED.stages,
+                audio_format = EXCLUDED.audio_format,
+                duration_seconds = EXCLUDED.duration_seconds,
+                sample_rate = EXCLUDED.sample_rate,
+                channels = EXCLUDED.channels,
+                peak_memory_bytes = EXCLUDED.peak_memory_bytes,
+                model_tier = EXCLUDED.model_tier
+        """, (
+            call_id, total, max(stages, key=stages.get) if stages else None, dumps_str(stages),
+            perf.get('audio_format'), perf.get('duration_seconds'), perf.get('sample_rate'), perf.get('channels'),
+            perf.get('peak_memory_bytes'), perf.get('model_tier'),
+        ))
+
+    def get_slowest_calls(self, limit=20, days=7, audio_format=None):
+        """Slowest analyses of the last N days with their dominant stage, plus tail latency by format and length"""
+        where = "p.recorded_at > (now() AT TIME ZONE 'UTC') - make_interval(days => %s)"
+        params = [max(1, int(days))]
+        if audio_format:
+            where += " AND p.audio_format = %s"
+            params.append(audio_format.lower().lstrip('.'))
+
+        conn = self.get_connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            cursor.execute(f"""
+                SELECT p.id_call, p.recorded_at, p.total_seconds, p.dominant_stage,
+                       (p.stages ->> p.dominant_stage)::float AS dominant_seconds, p.stages,
+                       p.audio_format, p.duration_seconds, p.sample_rate, p.channels, p.peak_memory_bytes, p.model_tier,
+                       c.agent_email
+                FROM analysis_perf p
+                LEFT JOIN caller_results c ON c.id_call = p.id_call
+                WHERE {where}
+                ORDER BY p.total_seconds DESC
+                LIMIT %s
+            """, (*params, max(1, int(limit))))
+            calls = cursor.fetchall()
+
+            cursor.execute(f"""
+                SELECT p.audio_format,
+                       CASE WHEN p.duration_seconds IS NULL THEN NULL
+                            WHEN p.duration_seconds < 60 THEN '<1m'
+                            WHEN p.duration_seconds < 300 THEN '1-5m'
+                            WHEN p.duration_seconds < 900 THEN '5-15m'
+                            ELSE '15m+' END AS length_bucket,
+                       COUNT(*) AS calls,
+                       AVG(p.total_seconds) AS avg_seconds,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY p.total_seconds) AS p95_seconds,
+                       MAX(p.total_seconds) AS max_seconds
+                FROM analysis_perf p
+                WHERE {where}
+                GROUP BY 1, 2
+                ORDER BY p95_seconds DESC
+            """, params)
+            return {'calls': calls, 'by_format': cursor.fetchall()}
+        finally:
+            cursor.close()
+            conn.close()
+
+    def save_results(self, results):
+        """Save many analysis results in one transaction (offline batch scoring); raises on failure"""
+        if not results:
+            return 0
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            with stage('db_save'):
+                version = self._write_results(cursor, results)
+                conn.commit()
+            self.observe_data_version(version)
+            return len(results)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _write_results(self, cursor, results):
+        """Write results inside the caller's transaction, queue their NOTIFYs and return the new data version"""
+        analysis_date = datetime.utcnow()
+        if self._partitions_ready_until is None or month_start(analysis_date) > self._partitions_ready_until:
+            self.ensure_partitions()
+
+        for result in results:
+            result.setdefault('id_call', f"call_{datetime.utcnow().isoformat()}")
+        # Serialize concurrent saves of the same call so rollup deltas stay exact;
+        # sorted so two batches sharing calls cannot deadlock
+        for call_id in sorted({result['id_call'] for result in results}):
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (call_id,))
+
+        events = []
+        for result in results:
+            call_id = result['id_call']
             agent_email = result.get('agent_email', 'unknown')
             agent_name = result.get('agent_name', result.get('agent_email', 'unknown'))
+            channels = {}
+            for channel, table in RESULT_TABLES:
+                if channel in result:
+                    channels[channel] = self._save_channel_result(
+                        cursor, table, channel, call_id, result,
+                        agent_email, agent_name, analysis_date
+                    )
+            events.append({
+                'type': 'result',
+                'id_call': call_id,
+                'agent_email': agent_email,
+                'agent_name': agent_name,
+                'analysis_date': analysis_date,
+                'channels': channels,
+            })
+
+        # Delivered to every listener only once the transaction commits
+        version = self._bump_data_version(cursor)
+        for event in events:
+            event['data_version'] = version
+            cursor.execute("SELECT pg_notify(%s, %s)", (self.notify_channel, dumps_str(event)))
+        return version
+
+    def _save_channel_result(self, cursor, table, channel, call_id, result, agent_email, agent_name, analysis_date):
+        """Insert or update one channel row, apply its delta to the rollups and return a summary for the result feed"""
+        data = result[channel]
+        cursor.execute(f"""
+            SELECT analysis_date, agent_email, final_score, valence_score, arousal_score
+            FROM {table} WHERE id_call = %s FOR UPDATE
+        """, (call_id,))
+        previous = cursor.fetchone()
+
+        scores = (
+            float(data.get('final_score', 0)),
+            float(data.get('valence_score', 0)),
+            float(data.get('arousal_score', 0)),
+        )
+        all_scores = data.get('all_scores', {}) or {}
+        emotion_values = [
+            float(all_scores[emotion]) if all_scores.get(emotion) is not None else None
+            for emotion in MAIN_EMOTIONS
+        ]
+        values = {
+            'final_score': scores[0],
+            'valence_score': scores[1],
+            'arousal_score': scores[2],
+            'all_scores': dumps_str(all_scores),
+            'advice': data.get('advice', ''),
+            'transcript': result.get('transcript', ''),
+            'alerts': dumps_str(result.get('alerts', {})),
+            'alert_count': result.get('alert_count', 0),
+            'agent_name': agent_name,
+            'top_emotions': dumps_str(data.get('top_emotions', [])),
+        }
+        values.update(zip(EMOTION_COLUMNS.values(), emotion_values))
+
+        # Partitioned tables cannot keep UNIQUE(id_call), so update-or-insert under the advisory lock
+        if previous:
+            assignments = ", ".join(f"{column} = %s" for column in values)
+            cursor.execute(f"""
+                UPDATE {table} SET {assignments}
+                WHERE id_call = %s AND analysis_date IS NOT DISTINCT FROM %s
+            """, (*values.values(), call_id, previous[0]))
+        else:
+            row = {
+                'id_call': call_id,
+                'dni': result.get('dni', ''),
+                'agent_email': agent_email,
+                'analysis_date': analysis_date,
+                **values,
+            }
+            cursor.execute(f"""
+                INSERT INTO {table} ({", ".join(row)})
+                VALUES ({", ".join(["%s"] * len(row))})
+            """, tuple(row.values()))
+
+        # An update keeps analysis_date and agent_email, so it stays in the original bucket
+        if previous:
+            day = (previous[0] or analysis_date).date()
+            self._apply_daily_rollup(cursor, day, previous[1] or 'unknown', channel, 0, scores, previous[2:])
+            stats_delta = (0, scores[0] - float(previous[2] or 0.0))
+        else:
+            self._apply_daily_rollup(cursor, analysis_date.date(), agent_email or 'unknown', channel, 1, scores)
+            stats_delta = (1, scores[0])
+        self._apply_result_counter(cursor, channel, *stats_delta)
 
-            # Save caller analysis
-            if 'caller' in result:
-                caller = result['caller']
-                cursor.execute("""
-                    INSERT INTO caller_results 
-                    (id_call, dni, agent_email, agent_name, analysis_date, final_score, valence_score, arousal_score, all_scores, advice, transcript, alerts, alert_count, top_emotions)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (id_call) DO UPDATE SET
-                        final_score = EXCLUDED.final_score,
-                        valence_score = EXCLUDED.valence_score,
-                        arousal_score = EXCLUDED.arousal_score,
-                        all_scores = EXCLUDED.all_scores,
-                        advice = EXCLUDED.advice,
-                        transcript = EXCLUDED.transcript,
-                        alerts = EXCLUDED.alerts,
-                        alert_count = EXCLUDED.alert_count,
-                        agent_name = EXCLUDED.agent_name,
-                        top_emotions = EXCLUDED.top_emotions
-                """, (
-                    call_id,
-                    result.get('dni', ''),
-                    agent_email,
-                    agent_name,
-                    datetime.utcnow(),
-                    float(caller.get('final_score', 0)),
-                    float(caller.get('valence_score', 0)),
-                    float(caller.get('arousal_score', 0)),
-                    json.dumps(self._convert_numpy_types(caller.get('all_scores', {}))),
-                    caller.get('advice', ''),
-                    result.get('transcript', ''),
-                    json.dumps(self._convert_numpy_types(result.get('alerts', {}))),
-                    result.get('alert_count', 0),
-                    json.dumps(self._convert_numpy_types(caller.get('top_emotions', [])))
-                ))
-
-            # Save client analysis
-            if 'client' in result:
-                client = result['client']
-                cursor.execute("""
-                    INSERT INTO client_results 
-                    (id_call, dni, agent_email, agent_name, analysis_date, final_score, valence_score, arousal_score, all_scores, advice, transcript, alerts, alert_count, top_emotions)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (id_call) DO UPDATE SET
-                        final_score = EXCLUDED.final_score,
-                        valence_score = EXCLUDED.valence_score,
-                        arousal_score = EXCLUDED.arousal_score,
-                        all_scores = EXCLUDED.all_scores,
-                        advice = EXCLUDED.advice,
-                        transcript = EXCLUDED.transcript,
-                        alerts = EXCLUDED.alerts,
-                        alert_count = EXCLUDED.alert_count,
-                        agent_name = EXCLUDED.agent_name,
-                        top_emotions = EXCLUDED.top_emotions
-                """, (
-                    call_id,
-                    result.get('dni', ''),
-                    agent_email,
-                    agent_name,
-                    datetime.utcnow(),
-                    float(client.get('final_score', 0)),
-                    float(client.get('valence_score', 0)),
-                    float(client.get('arousal_score', 0)),
-                    json.dumps(self._convert_numpy_types(client.get('all_scores', {}))),
-                    client.get('advice', ''),
-                    result.get('transcript', ''),
-                    json.dumps(self._convert_numpy_types(result.get('alerts', {}))),
-                    result.get('alert_count', 0),
-                    json.dumps(self._convert_numpy_types(client.get('top_emotions', [])))
-                ))
+        return {
+            'final_score': scores[0],
+            'valence_score': scores[1],
+            'arousal_score': scores[2],
+            'stats_delta': {'record_count': stats_delta[0], 'sum_final_score': stats_delta[1]},
+        }
 
+    def _apply_result_counter(self, cursor, channel, count_delta, final_score_delta):
+        """Add a row count and final_score delta to the channel's result_counters row"""
+        cursor.execute("""
+            UPDATE result_counters
+            SET record_count = record_count + %s,
+                sum_final_score = sum_final_score + %s
+            WHERE channel = %s
+        """, (count_delta, final_score_delta, channel))
+
+    def _seed_result_counter(self, cursor, channel, table):
+        """(Re)compute a channel's result_counters row from its result table"""
+        cursor.execute(f"""
+            INSERT INTO result_counters (channel, record_count, sum_final_score)
+            SELECT %s, COUNT(*), COALESCE(SUM(final_score), 0) FROM {table}
+            ON CONFLICT (channel) DO UPDATE SET
+                record_count = EXCLUDED.record_count,
+                sum_final_score = EXCLUDED.sum_final_score
+        """, (channel,))
+
+    def invalidate_caches(self):
+        """Drop cached aggregates after the result tables change"""
+        self._stats_cache.clear()
+
+    def _bump_data_version(self, cursor):
+        """Advance data_version inside the caller's transaction; the row lock orders versions by commit"""
+        cursor.execute("UPDATE data_version SET version = version + 1 RETURNING version")
+        return cursor.fetchone()[0]
+
+    def get_data_version(self):
+        """Current data version; read from the database only on first use or after observe_data_version(None)"""
+        with self._data_version_lock:
+            if self._data_version is not None:
+                return self._data_version
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT version FROM data_version")
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+        version = row[0] if row else 0
+        with self._data_version_lock:
+            self._data_version = max(self._data_version or 0, version)
+            return self._data_version
+
+    def observe_data_version(self, version=None):
+        """Record a newer data version (None: unknown, reload on next use) and drop cached aggregates"""
+        with self._data_version_lock:
+            if version is None:
+                self._data_version = None
+            elif self._data_version is None or version > self._data_version:
+                self._data_version = version
+        self.invalidate_caches()
+
+    def publish_data_change(self):
+        """Bump data_version and notify listeners after bulk changes (backfills, retention)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            version = self._bump_data_version(cursor)
+            cursor.execute("SELECT pg_notify(%s, %s)", (
+                self.notify_channel, dumps_str({'type': 'invalidate', 'data_version': version})
+            ))
             conn.commit()
-            print(f"✓ Result saved: {call_id} (Agent: {agent_name})")
-            return True
-        except Exception as e:
-            print(f"Error saving result: {e}")
+        finally:
+            cursor.close()
+            conn.close()
+        self.observe_data_version(version)
+
+    def _apply_daily_rollup(self, cursor, day, agent_email, channel, count_delta, scores, previous_scores=None):
+        """Add the difference between new and previous scores to a daily_metrics bucket"""
+        previous_scores = previous_scores or (0.0, 0.0, 0.0)
+        deltas = []
+        for new, old in zip(scores, previous_scores):
+            old = float(old or 0.0)
+            deltas.extend([new - old, new * new - old * old])
+
+        cursor.execute("""
+            INSERT INTO daily_metrics
+            (day, agent_email, channel, call_count,
+             sum_final_score, sumsq_final_score,
+             sum_valence_score, sumsq_valence_score,
+             sum_arousal_score, sumsq_arousal_score)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (day, agent_email, channel) DO UPDATE SET
+                call_count = daily_metrics.call_count + EXCLUDED.call_count,
+                sum_final_score = daily_metrics.sum_final_score + EXCLUDED.sum_final_score,
+                sumsq_final_score = daily_metrics.sumsq_final_score + EXCLUDED.sumsq_final_score,
+                sum_valence_score = daily_metrics.sum_valence_score + EXCLUDED.sum_valence_score,
+                sumsq_valence_score = daily_metrics.sumsq_valence_score + EXCLUDED.sumsq_valence_score,
+                sum_arousal_score = daily_metrics.sum_arousal_score + EXCLUDED.sum_arousal_score,
+                sumsq_arousal_score = daily_metrics.sumsq_arousal_score + EXCLUDED.sumsq_arousal_score
+        """, (day, agent_email, channel, count_delta, *deltas))
+
+    def backfill_daily_metrics(self):
+        """Rebuild the daily_metrics rollup from caller_results/client_results"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            # Block rollup writers so saves committed after our snapshot re-apply their deltas
+            cursor.execute("LOCK TABLE daily_metrics IN EXCLUSIVE MODE")
+            cursor.execute("DELETE FROM daily_metrics")
+            for channel, table in RESULT_TABLES:
+                cursor.execute(f"""
+                    INSERT INTO daily_metrics
+                    (day, agent_email, channel, call_count,
+                     sum_final_score, sumsq_final_score,
+                     sum_valence_score, sumsq_valence_score,
+                     sum_arousal_score, sumsq_arousal_score)
+                    SELECT analysis_date::date,
+                           COALESCE(agent_email, 'unknown'),
+                           %s,
+                           COUNT(*),
+                           SUM(COALESCE(final_score, 0)), SUM(COALESCE(final_score, 0) ^ 2),
+                           SUM(COALESCE(valence_score, 0)), SUM(COALESCE(valence_score, 0) ^ 2),
+                           SUM(COALESCE(arousal_score, 0)), SUM(COALESCE(arousal_score, 0) ^ 2)
+                    FROM {table}
+                    WHERE analysis_date IS NOT NULL
+                    GROUP BY 1, 2
+                """, (channel,))
+            cursor.execute("SELECT COUNT(*) FROM daily_metrics")
+            rows = cursor.fetchone()[0]
+            conn.commit()
+        except Exception:
             conn.rollback()
-            return False
+            raise
         finally:
             cursor.close()
             conn.close()
+        self.publish_data_change()
+        return rows
 
-    def get_records(self, limit=100, offset=0, agent_email=None):
+    def backfill_result_counters(self):
+        """Recompute result_counters from caller_results/client_results"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("LOCK TABLE result_counters IN EXCLUSIVE MODE")
+            for channel, table in RESULT_TABLES:
+                self._seed_result_counter(cursor, channel, table)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        self.publish_data_change()
+
+    def backfill_emotion_columns(self, batch_size=5000):
+        """Copy all_scores JSONB into the typed emotion columns, one id range per transaction"""
+        assignments = ",\n".join(
+            f"{column} = CASE WHEN jsonb_typeof(all_scores->'{emotion}') = 'number' "
+            f"THEN (all_scores->>'{emotion}')::real END"
+            for emotion, column in EMOTION_COLUMNS.items()
+        )
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        updated = 0
+        try:
+            for _, table in RESULT_TABLES:
+                cursor.execute(f"SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM {table}")
+                low, high = cursor.fetchone()
+                for start in range(low, high + 1, batch_size):
+                    cursor.execute(f"""
+                        UPDATE {table} SET
+                        {assignments}
+                        WHERE id >= %s AND id < %s AND all_scores IS NOT NULL
+                    """, (start, start + batch_size))
+                    updated += cursor.rowcount
+                    conn.commit()
+                logger.info("✓ %s: emotion columns backfilled", table)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        self.publish_data_change()
+        return updated
+
+    def get_records(self, limit=100, offset=0, agent_email=None, columns=None):
         """Get all records from caller_results table (primary analysis storage)"""
         conn = self.get_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         try:
-            query = "SELECT * FROM caller_results"
+            query = f"SELECT {self._column_list(columns)} FROM caller_results"
             params = []
             
             if agent_email:
@@ -253,79 +811,111 @@ class DatabaseService:
             cursor.close()
             conn.close()
 
-    def get_record_by_id_call(self, id_call):
+    def resolve_columns(self, fields=None):
+        """Validate a column selection (list or comma-separated string) against RECORD_COLUMNS"""
+        if not fields:
+            return list(RECORD_COLUMNS)
+        if isinstance(fields, str):
+            fields = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in RECORD_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return list(dict.fromkeys(fields))
+
+    def _column_list(self, columns=None):
+        """SQL select list for validated columns; every column when none are given"""
+        return ", ".join(self.resolve_columns(columns)) if columns else "*"
+
+    def iter_records(self, channel='caller', columns=None, since=None, until=None, agent_email=None, itersize=2000):
+        """Yield batches of row tuples from a server-side named cursor (constant memory)"""
+        table = dict(RESULT_TABLES)[channel]
+        columns = self.resolve_columns(columns)
+        conditions, params = [], []
+        if since:
+            conditions.append("analysis_date >= %s")
+            params.append(since)
+        if until:
+            conditions.append("analysis_date < %s")
+            params.append(until)
+        if agent_email:
+            conditions.append("agent_email = %s")
+            params.append(agent_email)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        conn = self.get_connection()
+        cursor = conn.cursor(name=f"export_{uuid.uuid4().hex}")
+        cursor.itersize = itersize
+        try:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY analysis_date", params)
+            while True:
+                rows = cursor.fetchmany(itersize)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+            conn.close()
+
+    def get_record_by_id_call(self, id_call, columns=None):
         """Get a specific record by id_call - returns properly structured data"""
+        record = self.get_records_by_id_calls([id_call], columns=columns).get(id_call)
+        if not record or record['caller'] is None:
+            return None
+        if record['client'] is None:
+            record['client'] = dict.fromkeys(self._channel_fields(columns))
+        return record
+
+    def _channel_fields(self, columns=None):
+        """CHANNEL_FIELDS among the selected columns (all of them when none are given)"""
+        selected = set(self.resolve_columns(columns))
+        return [field for field in CHANNEL_FIELDS if field in selected]
+
+    def get_records_by_id_calls(self, id_calls, columns=None):
+        """Get caller and client rows for many calls in one query, keyed by id_call.
+
+        Top-level fields come from the caller row (client row if there is none);
+        each channel's scores are nested under 'caller'/'client' (None when missing).
+        With columns, only those are selected and returned (id_call is always read to key the rows).
+        """
+        id_calls = list(id_calls)
+        if not id_calls:
+            return {}
+        selected = self.resolve_columns(columns)
+        select_list = ", ".join(dict.fromkeys(['id_call', *selected]))
+        channel_fields = self._channel_fields(columns)
         conn = self.get_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         try:
-            cursor.execute("""
-                SELECT cr.*, 
-                       cr.final_score as caller_final_score,
-                       cr.valence_score as caller_valence,
-                       cr.arousal_score as caller_arousal,
-                       cr.all_scores as caller_all_scores,
-                       cr.advice as caller_advice,
-                       cr.transcript as caller_transcript,
-                       cr.alerts as caller_alerts,
-                       cr.top_emotions as caller_top_emotions,
-                       clr.final_score as client_final_score,
-                       clr.valence_score as client_valence,
-                       clr.arousal_score as client_arousal,
-                       clr.all_scores as client_all_scores,
-                       clr.advice as client_advice,
-                       clr.transcript as client_transcript,
-                       clr.alerts as client_alerts,
-                       clr.top_emotions as client_top_emotions
-                FROM caller_results cr
-                LEFT JOIN client_results clr ON cr.id_call = clr.id_call
-                WHERE cr.id_call = %s
-            """, (id_call,))
-            result = cursor.fetchone()
-            if not result:
-                return None
-            
-            record = dict(result)
-            
-            # Ensure id_call and filename are set
-            if not record.get('filename'):
-                record['filename'] = record.get('id_call', 'N/A')
-            
-            # Reconstruct caller object from flat fields
-            caller_data = {
-                'final_score': record.get('caller_final_score', 0),
-                'valence_score': record.get('caller_valence', 0),
-                'arousal_score': record.get('caller_arousal', 0),
-                'all_scores': record.get('caller_all_scores', {}),
-                'advice': record.get('caller_advice', ''),
-                'transcript': record.get('caller_transcript', ''),
-                'top_emotions': record.get('caller_top_emotions', []),
-            }
-            
-            # Reconstruct client object from flat fields
-            client_data = {
-                'final_score': record.get('client_final_score', 0),
-                'valence_score': record.get('client_valence', 0),
-                'arousal_score': record.get('client_arousal', 0),
-                'all_scores': record.get('client_all_scores', {}),
-                'advice': record.get('client_advice', ''),
-                'transcript': record.get('client_transcript', ''),
-                'top_emotions': record.get('client_top_emotions', []),
-            }
-            
-            record['caller'] = caller_data
-            record['client'] = client_data
-            
-            return record
+            cursor.execute(f"""
+                SELECT 'caller' AS channel, {select_list} FROM caller_results WHERE id_call = ANY(%s)
+                UNION ALL
+                SELECT 'client' AS channel, {select_list} FROM client_results WHERE id_call = ANY(%s)
+            """, (id_calls, id_calls))
+            rows = cursor.fetchall()
         finally:
             cursor.close()
             conn.close()
 
-    def get_caller_records(self, limit=100, offset=0, agent_email=None):
+        records = {}
+        for row in rows:
+            row = dict(row)
+            channel = row.pop('channel')
+            id_call = row['id_call'] if 'id_call' in selected else row.pop('id_call')
+            record = records.setdefault(id_call, {'caller': None, 'client': None})
+            if channel == 'caller' or record['caller'] is None:
+                record.update(row)
+            record[channel] = {field: row.get(field) for field in channel_fields}
+        if 'id_call' in selected:
+            for record in records.values():
+                record.setdefault('filename', record['id_call'])
+        return records
+
+    def get_caller_records(self, limit=100, offset=0, agent_email=None, columns=None):
         """Get caller records"""
         conn = self.get_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         try:
-            query = "SELECT * FROM caller_results"
+            query = f"SELECT {self._column_list(columns)} FROM caller_results"
             params = []
             if agent_email:
                 query += " WHERE agent_email = %s"
@@ -340,12 +930,12 @@ class DatabaseService:
             cursor.close()
             conn.close()
 
-    def get_client_records(self, limit=100, offset=0, agent_email=None):
+    def get_client_records(self, limit=100, offset=0, agent_email=None, columns=None):
         """Get client records"""
         conn = self.get_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         try:
-            query = "SELECT * FROM client_results"
+            query = f"SELECT {self._column_list(columns)} FROM client_results"
             params = []
             if agent_email:
                 query += " WHERE agent_email = %s"
@@ -360,24 +950,24 @@ class DatabaseService:
             cursor.close()
             conn.close()
 
-    def get_caller_by_id(self, id_call):
+    def get_caller_by_id(self, id_call, columns=None):
         """Get specific caller record"""
         conn = self.get_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         try:
-            cursor.execute("SELECT * FROM caller_results WHERE id_call = %s", (id_call,))
+            cursor.execute(f"SELECT {self._column_list(columns)} FROM caller_results WHERE id_call = %s", (id_call,))
             result = cursor.fetchone()
             return dict(result) if result else None
         finally:
             cursor.close()
             conn.close()
 
-    def get_client_by_id(self, id_call):
+    def get_client_by_id(self, id_call, columns=None):
         """Get specific client record"""
         conn = self.get_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         try:
-            cursor.execute("SELECT * FROM client_results WHERE id_call = %s", (id_call,))
+            cursor.execute(f"SELECT {self._column_list(columns)} FROM client_results WHERE id_call = %s", (id_call,))
             result = cursor.fetchone()
             return dict(result) if result else None
         finally:
@@ -385,30 +975,150 @@ class DatabaseService:
             conn.close()
 
     def get_statistics(self):
-        """Get statistics"""
+        """Get statistics from result_counters (cached for STATS_CACHE_TTL seconds)"""
+        stats = self._stats_cache.get('statistics')
+        if stats is not None:
+            return dict(stats)
+
         conn = self.get_connection()
         cursor = conn.cursor()
         try:
-            cursor.execute("SELECT COUNT(*) FROM caller_results")
-            total_caller = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM client_results")
-            total_client = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT AVG(final_score) FROM caller_results")
-            avg_caller = cursor.fetchone()[0] or 0.0
-            
-            cursor.execute("SELECT AVG(final_score) FROM client_results")
-            avg_client = cursor.fetchone()[0] or 0.0
-            
-            return {
-                'total_records': total_caller + total_client,
-                'total_caller_records': total_caller,
-                'total_client_records': total_client,
-                'avg_final_score': (avg_caller + avg_client) / 2 if (avg_caller + avg_client) > 0 else 0,
-                'avg_caller_score': avg_caller,
-                'avg_client_score': avg_client
-            }
+            cursor.execute("SELECT channel, record_count, sum_final_score FROM result_counters")
+            counters = {channel: (count, total) for channel, count, total in cursor.fetchall()}
+        finally:
+            cursor.close()
+            conn.close()
+
+        stats = self._format_statistics(counters)
+        self._stats_cache.set('statistics', stats)
+        return dict(stats)
+
+    def get_statistics_snapshot(self, agent_email=None):
+        """Uncached statistics plus the data_version they include, read in one snapshot.
+
+        The /stream feed sends this on connect; result events at or below its data_version
+        are already counted. With agent_email the totals are that agent's, counted from the
+        result tables so they match the agent-filtered stats_delta events.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute("SELECT version FROM data_version")
+            row = cursor.fetchone()
+            if agent_email:
+                counters = {}
+                for channel, table in RESULT_TABLES:
+                    cursor.execute(
+                        f"SELECT COUNT(*), COALESCE(SUM(final_score), 0) FROM {table} WHERE agent_email = %s",
+                        (agent_email,)
+                    )
+                    counters[channel] = cursor.fetchone()
+            else:
+                cursor.execute("SELECT channel, record_count, sum_final_score FROM result_counters")
+                counters = {channel: (count, total) for channel, count, total in cursor.fetchall()}
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+        stats = self._format_statistics(counters)
+        stats['data_version'] = row[0] if row else 0
+        if agent_email:
+            stats['agent_email'] = agent_email
+        return stats
+
+    @staticmethod
+    def _format_statistics(counters):
+        """Statistics response from {channel: (record_count, sum_final_score)}"""
+        total_caller, sum_caller = counters.get('caller', (0, 0.0))
+        total_client, sum_client = counters.get('client', (0, 0.0))
+        sum_caller, sum_client = float(sum_caller), float(sum_client)
+        avg_caller = sum_caller / total_caller if total_caller else 0.0
+        avg_client = sum_client / total_client if total_client else 0.0
+
+        return {
+            'total_records': total_caller + total_client,
+            'total_caller_records': total_caller,
+            'total_client_records': total_client,
+            'avg_final_score': (avg_caller + avg_client) / 2 if (avg_caller + avg_client) > 0 else 0,
+            'avg_caller_score': avg_caller,
+            'avg_client_score': avg_client
+        }
+
+    def get_daily_metrics(self, days=30, agent_email=None, channel='caller'):
+        """Get per-day aggregates for the last N days from the daily_metrics rollup"""
+        conn = self.get_connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            query = """
+                SELECT day,
+                       SUM(call_count) AS total_calls,
+                       SUM(sum_final_score) AS sum_final,
+                       SUM(sumsq_final_score) AS sumsq_final,
+                       SUM(sum_valence_score) AS sum_valence,
+                       SUM(sum_arousal_score) AS sum_arousal
+                FROM daily_metrics
+                WHERE channel = %s
+                  AND day > (now() AT TIME ZONE 'UTC')::date - %s
+            """
+            params = [channel, max(1, int(days))]
+            if agent_email:
+                query += " AND agent_email = %s"
+                params.append(agent_email)
+            query += " GROUP BY day HAVING SUM(call_count) > 0 ORDER BY day DESC"
+
+            cursor.execute(query, params)
+            daily = []
+            for row in cursor.fetchall():
+                count = int(row['total_calls'])
+                mean = row['sum_final'] / count
+                variance = max(row['sumsq_final'] / count - mean * mean, 0.0)
+                daily.append({
+                    'date': row['day'].isoformat(),
+                    'total_calls': count,
+                    'avg_score': round(mean, 2),
+                    'stddev_score': round(variance ** 0.5, 3),
+                    'avg_valence': round(row['sum_valence'] / count, 3),
+                    'avg_arousal': round(row['sum_arousal'] / count, 3),
+                })
+            return daily
+        finally:
+            cursor.close()
+            conn.close()
+
+    def get_emotion_metrics(self, agent_email=None, channel=None):
+        """Get average score and sample count per emotion, aggregated in SQL"""
+        columns = ", ".join(EMOTION_COLUMNS.values())
+        where = " WHERE agent_email = %s" if agent_email else ""
+        selects, params = [], []
+        for name, table in RESULT_TABLES:
+            if channel in (None, name):
+                selects.append(f"SELECT {columns} FROM {table}{where}")
+                if agent_email:
+                    params.append(agent_email)
+        if not selects:
+            return []
+
+        aggregates = ", ".join(
+            f"AVG({column}) AS {column}_avg, COUNT({column}) AS {column}_count"
+            for column in EMOTION_COLUMNS.values()
+        )
+        conn = self.get_connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            cursor.execute(f"SELECT {aggregates} FROM ({' UNION ALL '.join(selects)}) scores", params)
+            row = cursor.fetchone()
+            metrics = []
+            for emotion, column in EMOTION_COLUMNS.items():
+                count = row[f"{column}_count"]
+                if count:
+                    metrics.append({
+                        'emotion': emotion,
+                        'avg_score': round(float(row[f"{column}_avg"]), 2),
+                        'count': count,
+                    })
+            return metrics
         finally:
             cursor.close()
             conn.close()
@@ -0,0 +1,6 @@
+"""Emotion vocabulary shared by the analyzer and the database layer"""
+
+MAIN_EMOTIONS = ["Valence", "Arousal", "Anger", "Sadness", "Joy", "Fear", "Disgust", "Awe", "Contentment", "Interest"]
+
+# Typed REAL column holding each emotion score in caller_results/client_results
+EMOTION_COLUMNS = {emotion: f"emo_{emotion.lower()}" for emotion in MAIN_EMOTIONS}
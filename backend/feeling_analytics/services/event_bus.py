@@ -0,0 +1,134 @@
+"""
+Fan-out of saved analysis results to Server-Sent Events clients.
+
+save_result publishes a small JSON payload with pg_notify inside its transaction,
+so every API worker receives it on commit through LISTEN, whichever worker
+handled the upload. A background thread holds the LISTEN connection and hands
+events to the event loop, which copies them into one bounded queue per client.
+"""
+
+import asyncio
+import json
+import select
+import threading
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from .logs import get_logger
+from .serialization import dumps_str
+
+logger = get_logger(__name__)
+
+
+def format_sse(event, data, event_id=None):
+    """Encode one Server-Sent Events frame"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {dumps_str(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class ResultBroadcaster:
+    """LISTEN on a Postgres channel and broadcast each notification to subscriber queues"""
+
+    def __init__(self, connect, channel, queue_size=100, on_event=None):
+        self._connect = connect
+        self.channel = channel
+        self.queue_size = queue_size
+        self._on_event = on_event
+        self._subscribers = set()
+        self._loop = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._sequence = 0
+
+    def start(self, loop):
+        """Start the listener thread, delivering events on the given event loop"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._loop = loop
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="result-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def _listen(self):
+        backoff = 1
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                logger.info("✓ Listening for results on '%s'", self.channel)
+                backoff = 1
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._dispatch(conn.notifies.pop(0).payload)
+            except psycopg2.Error as e:
+                logger.warning("Result listener error: %s (retrying in %ss)", e, backoff)
+                # Anything sent while disconnected is lost; tell the hook and clients to refetch
+                self._handle({'type': 'resync'})
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _dispatch(self, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed result notification: %s", payload[:100])
+            return
+        self._handle(event)
+
+    def _handle(self, event):
+        if self._on_event:
+            try:
+                self._on_event(event)
+            except Exception as e:
+                logger.exception("Result event hook failed: %s", e)
+        self._deliver(event)
+
+    def _deliver(self, event):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._publish, event)
+
+    def _publish(self, event):
+        """Runs on the event loop: copy the event into every subscriber queue"""
+        self._sequence += 1
+        item = (self._sequence, event)
+        for queue in list(self._subscribers):
+            if queue.full():
+                # Slow client: drop its backlog and ask it to refetch instead of blocking everyone
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait((self._sequence, {'type': 'resync'}))
+                continue
+            queue.put_nowait(item)
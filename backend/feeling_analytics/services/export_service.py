@@ -0,0 +1,160 @@
+"""Streaming serializers for bulk exports of analysis records (NDJSON, CSV, Parquet).
+
+Each serializer consumes batches of row tuples (see DatabaseService.iter_records)
+and yields encoded byte chunks, so memory stays bounded by one batch.
+"""
+import csv
+import io
+from datetime import date, datetime
+
+from .serialization import dumps, dumps_str
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Result columns stored as JSONB; flattened to JSON text in CSV/Parquet
+JSON_COLUMNS = {'all_scores', 'alerts', 'top_emotions'}
+
+
+def iter_ndjson(columns, batches):
+    for rows in batches:
+        yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def _csv_cell(value):
+    if isinstance(value, (dict, list)):
+        return dumps_str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows([_csv_cell(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only sink that hands out what was written so far while keeping tell() absolute"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_schema(pa, columns):
+    types = {
+        'id': pa.int64(),
+        'alert_count': pa.int64(),
+        'analysis_date': pa.timestamp('us'),
+        'created_at': pa.timestamp('us'),
+        'final_score': pa.float64(),
+        'valence_score': pa.float64(),
+        'arousal_score': pa.float64(),
+        'duration_seconds': pa.float64(),
+    }
+    return pa.schema([
+        (column, types.get(column, pa.float32() if column.startswith('emo_') else pa.string()))
+        for column in columns
+    ])
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+    return pa, pq
+
+
+def _parquet_table(pa, schema, rows):
+    arrays = []
+    for index, field in enumerate(schema):
+        values = [row[index] for row in rows]
+        if field.name in JSON_COLUMNS:
+            values = [None if v is None else dumps_str(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def iter_parquet(columns, batches):
+    """One Parquet row group per batch; the footer is emitted when the batches run out"""
+    pa, pq = _import_pyarrow()
+    schema = _parquet_schema(pa, columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for rows in batches:
+            writer.write_table(_parquet_table(pa, schema, rows))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+class ParquetFileWriter:
+    """Append batches of row tuples to a Parquet file, one row group per batch"""
+
+    def __init__(self, path, columns):
+        self._pa, pq = _import_pyarrow()
+        self.path = path
+        self._schema = _parquet_schema(self._pa, columns)
+        self._writer = pq.ParquetWriter(str(path), self._schema, compression='zstd')
+        self.rows = 0
+
+    def write(self, rows):
+        self._writer.write_table(_parquet_table(self._pa, self._schema, rows))
+        self.rows += len(rows)
+
+    def close(self):
+        self._writer.close()
+
+
+def iter_export(fmt, columns, batches):
+    if fmt == 'ndjson':
+        return iter_ndjson(columns, batches)
+    if fmt == 'csv':
+        return iter_csv(columns, batches)
+    if fmt == 'parquet':
+        return iter_parquet(columns, batches)
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def write_export(path, fmt, columns, batches):
+    """Write an export to `path` chunk by chunk; returns bytes written"""
+    written = 0
+    with open(path, 'wb') as f:
+        for chunk in iter_export(fmt, columns, batches):
+            f.write(chunk)
+            written += len(chunk)
+    return written
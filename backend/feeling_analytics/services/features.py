@@ -0,0 +1,90 @@
+"""
+Whisper log-mel frontend in torch.
+
+Computes the same 80-bin (128 for large-v3) log-mel spectrograms as
+WhisperFeatureExtractor, but for a whole batch at once with torch.stft on the
+model's device, with the Hann window and mel filterbank built once and cached
+per device. Waveforms are padded/truncated to the 30 s Whisper window directly
+into one tensor, so there is no per-waveform NumPy pass or extra copy.
+"""
+
+import librosa
+import numpy as np
+import torch
+
+from .audio_io import SAMPLING_RATE
+
+# Max |difference| against WhisperFeatureExtractor accepted by max_feature_error callers;
+# features are in the extractor's (log10 + 4) / 4 units, roughly [-1.5, 1.5]
+FEATURE_TOLERANCE = 1e-3
+
+
+class LogMelFrontend:
+    def __init__(self, n_mels=80, sampling_rate=SAMPLING_RATE, n_fft=400, hop_length=160,
+                 chunk_length=30, mel_filters=None):
+        self.n_mels = n_mels
+        self.sampling_rate = sampling_rate
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_samples = chunk_length * sampling_rate
+        self.n_frames = self.n_samples // hop_length
+        if mel_filters is None:
+            # Slaney-style filterbank, as Whisper's (n_freq, n_mels)
+            mel_filters = librosa.filters.mel(
+                sr=sampling_rate, n_fft=n_fft, n_mels=n_mels, fmin=0.0, fmax=sampling_rate / 2
+            ).T
+        self._mel_filters = np.asarray(mel_filters, dtype=np.float32)
+        self._cache = {}
+
+    @classmethod
+    def from_feature_extractor(cls, feature_extractor):
+        """Frontend with the parameters and filterbank of a WhisperFeatureExtractor"""
+        return cls(
+            n_mels=feature_extractor.feature_size,
+            sampling_rate=feature_extractor.sampling_rate,
+            n_fft=feature_extractor.n_fft,
+            hop_length=feature_extractor.hop_length,
+            chunk_length=feature_extractor.chunk_length,
+            mel_filters=feature_extractor.mel_filters,
+        )
+
+    def _constants(self, device):
+        """(window, mel filterbank transposed to (n_mels, n_freq)) on device"""
+        constants = self._cache.get(device)
+        if constants is None:
+            window = torch.hann_window(self.n_fft, device=device)
+            filters = torch.from_numpy(self._mel_filters.T.copy()).to(device)
+            constants = self._cache[device] = (window, filters)
+        return constants
+
+    def pad(self, waveforms, device):
+        """(batch, n_samples) float32 tensor: each waveform zero-padded or truncated to 30 s"""
+        batch = torch.zeros((len(waveforms), self.n_samples), dtype=torch.float32, device=device)
+        for row, waveform in zip(batch, waveforms):
+            waveform = torch.as_tensor(np.asarray(waveform, dtype=np.float32)[:self.n_samples]).reshape(-1)
+            row[:waveform.shape[0]].copy_(waveform)
+        return batch
+
+    @torch.no_grad()
+    def __call__(self, waveforms, device='cpu'):
+        """Log-mel features (batch, n_mels, 3000) for mono waveforms at sampling_rate"""
+        device = torch.device(device)
+        window, filters = self._constants(device)
+        audio = self.pad(waveforms, device)
+        stft = torch.stft(audio, self.n_fft, self.hop_length, window=window, return_complex=True)
+        # Whisper drops the last frame; contiguous keeps the matmul off the strided path
+        power = (stft[..., :-1].abs() ** 2).contiguous()
+        log_spec = torch.clamp(filters @ power, min=1e-10).log10()
+        # Dynamic range is clamped to 8 (80 dB) below each example's own peak
+        peak = log_spec.amax(dim=(1, 2), keepdim=True)
+        log_spec = torch.maximum(log_spec, peak - 8.0)
+        return (log_spec + 4.0) / 4.0
+
+
+def max_feature_error(frontend, feature_extractor, waveforms):
+    """Largest |frontend - WhisperFeatureExtractor| over the batch, for validating the frontend"""
+    expected = feature_extractor(
+        list(waveforms), sampling_rate=frontend.sampling_rate, return_tensors='np'
+    ).input_features
+    actual = frontend(waveforms).cpu().numpy()
+    return float(np.max(np.abs(actual - expected)))
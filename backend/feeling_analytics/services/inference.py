@@ -0,0 +1,154 @@
+"""
+Inference backends for the emotion scorer: Whisper encoder + projection + emotion heads.
+
+EmotionScorer joins the three into one module that takes log-mel features and
+returns (batch, n_emotions) sigmoid scores, so a whole batch goes through the
+encoder and every head in one call. It shares the heads' modules (~300 MB of
+weights each) rather than copying them.
+
+`python -m feeling_analytics.export_models` writes to EXPORT_DIR:
+    scorer.onnx (+ scorer.onnx.data)   for onnxruntime
+    scorer.ts                          TorchScript
+    embedding_projection.pt            the 512->768 projection, loaded by every backend
+    manifest.json                      emotions, input shape, versions
+
+INFERENCE_BACKEND picks the runtime when the analyzer loads:
+    torch        eager PyTorch, one call per head (default)
+    compile      EmotionScorer under torch.compile (built from the eager models)
+    torchscript  scorer.ts
+    onnx         scorer.onnx with onnxruntime; INFERENCE_THREADS sets intra-op threads
+"""
+
+import inspect
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+
+INFERENCE_BACKENDS = ('torch', 'compile', 'torchscript', 'onnx')
+# Backends that load a scorer from EXPORT_DIR instead of the eager heads
+EXPORTED_BACKENDS = ('torchscript', 'onnx')
+EXPORT_FORMATS = {'onnx': 'scorer.onnx', 'torchscript': 'scorer.ts'}
+PROJECTION_FILE = 'embedding_projection.pt'
+MANIFEST_FILE = 'manifest.json'
+
+# Max |difference| from the eager heads expected of a backend's sigmoid scores
+SCORE_TOLERANCE = 1e-4
+
+INFERENCE_THREADS = int(os.getenv('INFERENCE_THREADS', '0'))
+
+
+class EmotionScorer(nn.Module):
+    """Input features (batch, n_mels, 3000) -> emotion scores (batch, n_emotions) in [0, 1]"""
+
+    def __init__(self, encoder, projection, heads, seq_len=1500):
+        super().__init__()
+        self.encoder = encoder
+        self.projection = projection
+        self.seq_len = seq_len
+        self.emotions = list(heads)
+        self.heads = nn.ModuleList(heads.values())
+
+    def forward(self, input_features):
+        hidden = self.encoder(input_features=input_features, return_dict=False)[0]
+        flat = self.projection(hidden)[:, :self.seq_len].flatten(1)
+        logits = torch.cat([head.mlp(head.proj(flat)) for head in self.heads], dim=1)
+        return torch.sigmoid(logits)
+
+
+class ModuleBackend:
+    """compile / torchscript: a torch module with EmotionScorer's signature"""
+
+    def __init__(self, name, module, emotions, device):
+        self.name = name
+        self.module = module
+        self.emotions = emotions
+        self.device = device
+
+    @torch.no_grad()
+    def __call__(self, input_features):
+        return self.module(input_features.to(self.device)).float().cpu().numpy()
+
+
+class OnnxBackend:
+    name = 'onnx'
+
+    def __init__(self, path, emotions, threads=INFERENCE_THREADS):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        available = ort.get_available_providers()
+        providers = [p for p in ('CUDAExecutionProvider', 'CPUExecutionProvider') if p in available]
+        self.session = ort.InferenceSession(str(path), options, providers=providers)
+        self.emotions = emotions
+
+    def __call__(self, input_features):
+        features = input_features.detach().cpu().numpy()
+        return self.session.run(['scores'], {'input_features': features})[0]
+
+
+def compiled_backend(scorer, device):
+    return ModuleBackend('compile', torch.compile(scorer.to(device).eval()), scorer.emotions, device)
+
+
+def read_manifest(directory):
+    return json.loads((Path(directory) / MANIFEST_FILE).read_text())
+
+
+def load_exported_backend(name, directory, device):
+    """Backend for an exported scorer in directory (see export_scorer)"""
+    directory = Path(directory)
+    if name not in EXPORTED_BACKENDS:
+        raise ValueError(f"Not an exported backend: {name}")
+    manifest = read_manifest(directory)
+    path = directory / EXPORT_FORMATS[name]
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found; run python -m feeling_analytics.export_models")
+    if name == 'onnx':
+        return OnnxBackend(path, manifest['emotions'])
+    module = torch.jit.load(str(path), map_location=device).eval()
+    return ModuleBackend(name, module, manifest['emotions'], device)
+
+
+def export_scorer(scorer, directory, formats=tuple(EXPORT_FORMATS), n_mels=80, metadata=None):
+    """Write the scorer in each format plus the projection weights and manifest; returns written paths"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    # Traced where the models already are: the scorer shares them with the analyzer
+    scorer = scorer.eval()
+    example = torch.zeros(1, n_mels, 3000, device=next(scorer.parameters()).device)
+    written = []
+    with torch.no_grad():
+        if 'torchscript' in formats:
+            path = directory / EXPORT_FORMATS['torchscript']
+            torch.jit.trace(scorer, example, check_trace=False).save(str(path))
+            written.append(path)
+        if 'onnx' in formats:
+            path = directory / EXPORT_FORMATS['onnx']
+            # The TorchScript-based exporter: torch >= 2.9 defaults to the dynamo one, and
+            # torch < 2.5 has no dynamo argument at all
+            legacy = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+            torch.onnx.export(
+                scorer, (example,), str(path),
+                input_names=['input_features'], output_names=['scores'],
+                dynamic_axes={'input_features': {0: 'batch'}, 'scores': {0: 'batch'}},
+                opset_version=17, **legacy,
+            )
+            written.append(path)
+    torch.save(scorer.projection.state_dict(), directory / PROJECTION_FILE)
+    manifest = {
+        'emotions': scorer.emotions,
+        'n_mels': n_mels,
+        'formats': [fmt for fmt in EXPORT_FORMATS if fmt in formats],
+        'torch': torch.__version__,
+        'created_at': datetime.utcnow().isoformat(),
+        **(metadata or {}),
+    }
+    (directory / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    return written + [directory / PROJECTION_FILE, directory / MANIFEST_FILE]
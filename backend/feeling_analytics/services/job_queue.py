@@ -0,0 +1,272 @@
+"""
+Durable analysis job queue stored in Postgres.
+
+The API enqueues an uploaded file and returns immediately; any number of worker
+processes (python -m feeling_analytics.worker, on any node that can reach the
+database and JOB_STORAGE_DIR) claim jobs with FOR UPDATE SKIP LOCKED, so no two
+workers ever run the same job and none block each other.
+
+A claimed job is leased until locked_until. Workers extend the lease while they
+run; a job whose worker died is picked up again once the lease expires. Failed
+attempts are retried with exponential backoff until max_attempts. A job's audio
+file is removed once it succeeds or fails for good, including when its last
+lease expires. Finished jobs (and their result JSON) are deleted
+JOB_RETENTION_DAYS after they finish, together with any audio still on disk.
+"""
+
+import os
+import uuid
+from pathlib import Path
+
+from psycopg2.extras import RealDictCursor
+
+from .logs import get_logger
+from .serialization import dumps_str
+
+logger = get_logger(__name__)
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+# Statuses covered by idx_analysis_jobs_claim, cheap enough to count on every scrape
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class JobQueue:
+    """analysis_jobs table: enqueue, claim, heartbeat, complete and fail jobs"""
+
+    def __init__(self, db_service):
+        self.db = db_service
+        self.storage_dir = Path(os.getenv('JOB_STORAGE_DIR', str(Path(__file__).parent.parent.parent / 'job_storage')))
+        self.max_attempts = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+        self.visibility_timeout = int(os.getenv('JOB_VISIBILITY_TIMEOUT', '300'))
+        self.retry_backoff = int(os.getenv('JOB_RETRY_BACKOFF', '30'))
+        self.retention_days = float(os.getenv('JOB_RETENTION_DAYS', '7'))
+
+    def create_table(self):
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_jobs (
+                    id UUID PRIMARY KEY,
+                    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    audio_path TEXT NOT NULL,
+                    filename VARCHAR(255) NOT NULL,
+                    params JSONB NOT NULL DEFAULT '{}',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 3,
+                    run_after TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'UTC'),
+                    locked_by VARCHAR(255),
+                    locked_until TIMESTAMP,
+                    result JSONB,
+                    error TEXT,
+                    created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'UTC'),
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP
+                )
+            """)
+            # Claim order for runnable jobs; expired leases are found through the same index
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_analysis_jobs_claim
+                ON analysis_jobs (priority DESC, created_at)
+                WHERE status IN ('queued', 'running')
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_analysis_jobs_finished
+                ON analysis_jobs (finished_at)
+                WHERE status IN ('succeeded', 'failed')
+            """)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def storage_path(self, job_id, extension):
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        return self.storage_dir / f"{job_id}{extension}"
+
+    def enqueue(self, audio_path, filename, params=None, priority=0, job_id=None, max_attempts=None):
+        """Insert a queued job for a file already placed under storage_dir; returns the job id"""
+        job_id = job_id or str(uuid.uuid4())
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO analysis_jobs (id, priority, audio_path, filename, params, max_attempts)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, (job_id, priority, str(audio_path), filename, dumps_str(params or {}),
+                  max_attempts or self.max_attempts))
+            conn.commit()
+            return job_id
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def claim(self, worker_id, visibility_timeout=None):
+        """Lease the highest-priority runnable job (queued, or running with an expired lease)"""
+        timeout = visibility_timeout or self.visibility_timeout
+        conn = self.db.get_connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            # Expired leases that already used every attempt are not retried
+            cursor.execute("""
+                UPDATE analysis_jobs
+                SET status = 'failed', locked_by = NULL, locked_until = NULL,
+                    error = COALESCE(error, 'Worker lease expired'),
+                    finished_at = now() AT TIME ZONE 'UTC'
+                WHERE status = 'running'
+                  AND locked_until < now() AT TIME ZONE 'UTC'
+                  AND attempts >= max_attempts
+                RETURNING audio_path
+            """)
+            expired = [row['audio_path'] for row in cursor.fetchall()]
+            cursor.execute("""
+                UPDATE analysis_jobs
+                SET status = 'running',
+                    attempts = attempts + 1,
+                    locked_by = %s,
+                    locked_until = (now() AT TIME ZONE 'UTC') + make_interval(secs => %s),
+                    started_at = now() AT TIME ZONE 'UTC'
+                WHERE id = (
+                    SELECT id FROM analysis_jobs
+                    WHERE (status = 'queued' AND run_after <= now() AT TIME ZONE 'UTC')
+                       OR (status = 'running' AND locked_until < now() AT TIME ZONE 'UTC')
+                    ORDER BY priority DESC, created_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, priority, audio_path, filename, params, attempts, max_attempts
+            """, (worker_id, timeout))
+            job = cursor.fetchone()
+            conn.commit()
+            self.remove_audio(*expired)
+            if job:
+                job = dict(job)
+                job['id'] = str(job['id'])
+            return job
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def heartbeat(self, job_id, worker_id, visibility_timeout=None):
+        """Extend the lease; False means the job is no longer ours (lease expired and re-claimed)"""
+        timeout = visibility_timeout or self.visibility_timeout
+        return self._update_owned(job_id, worker_id, """
+            locked_until = (now() AT TIME ZONE 'UTC') + make_interval(secs => %s)
+        """, (timeout,))
+
+    def complete(self, job_id, worker_id, result):
+        return self._update_owned(job_id, worker_id, """
+            status = 'succeeded', result = %s, error = NULL,
+            locked_by = NULL, locked_until = NULL,
+            finished_at = now() AT TIME ZONE 'UTC'
+        """, (dumps_str(result),))
+
+    def fail(self, job_id, worker_id, error):
+        """Requeue with exponential backoff, or mark failed once attempts are exhausted"""
+        return self._update_owned(job_id, worker_id, """
+            status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+            run_after = (now() AT TIME ZONE 'UTC') + make_interval(secs => %s * power(2, attempts - 1)),
+            finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE now() AT TIME ZONE 'UTC' END,
+            error = %s, locked_by = NULL, locked_until = NULL
+        """, (self.retry_backoff, str(error)[:4000]))
+
+    def _update_owned(self, job_id, worker_id, assignments, params):
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"""
+                UPDATE analysis_jobs SET {assignments}
+                WHERE id = %s AND locked_by = %s AND status = 'running'
+            """, (*params, job_id, worker_id))
+            updated = cursor.rowcount == 1
+            conn.commit()
+            return updated
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def get(self, job_id):
+        """Job status (and result once succeeded); None if unknown"""
+        try:
+            uuid.UUID(str(job_id))
+        except ValueError:
+            return None
+        conn = self.db.get_connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            cursor.execute("""
+                SELECT id, status, priority, filename, params, attempts, max_attempts,
+                       run_after, result, error, created_at, started_at, finished_at
+                FROM analysis_jobs WHERE id = %s
+            """, (job_id,))
+            job = cursor.fetchone()
+            if job:
+                job = dict(job)
+                job['id'] = str(job['id'])
+            return job
+        finally:
+            cursor.close()
+            conn.close()
+
+    def status_counts(self):
+        """Queued and running jobs; finished ones are left out so the count stays an index scan"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT status, COUNT(*) FROM analysis_jobs WHERE status IN %s GROUP BY status",
+                (ACTIVE_STATUSES,),
+            )
+            counts = dict.fromkeys(ACTIVE_STATUSES, 0)
+            counts.update(dict(cursor.fetchall()))
+            return counts
+        finally:
+            cursor.close()
+            conn.close()
+
+    def purge_finished(self, keep_days=None):
+        """Delete succeeded/failed jobs that finished more than keep_days (JOB_RETENTION_DAYS) ago,
+        and any of their audio files left behind; returns how many jobs"""
+        keep_days = self.retention_days if keep_days is None else keep_days
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                DELETE FROM analysis_jobs
+                WHERE status IN ('succeeded', 'failed')
+                  AND finished_at < (now() AT TIME ZONE 'UTC') - make_interval(secs => %s)
+                RETURNING audio_path
+            """, (keep_days * 86400,))
+            paths = [row[0] for row in cursor.fetchall()]
+            conn.commit()
+            self.remove_audio(*paths)
+            return len(paths)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def remove_audio(self, *paths):
+        """Delete job audio files; missing ones are already gone"""
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning("⚠️ Could not remove job audio %s: %s", path, e)
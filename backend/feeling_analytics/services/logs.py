@@ -0,0 +1,158 @@
+"""
+Structured, non-blocking logging for the API, the analyzer and the worker.
+
+configure_logging() routes every `feeling_analytics.*` logger through a QueueHandler,
+so request threads only enqueue records; a QueueListener thread formats and writes
+them. Records carry the request id of the HTTP request (or job) they belong to.
+
+Environment:
+    LOG_LEVEL          DEBUG, INFO (default), WARNING, ...
+    LOG_FORMAT         json (default, one object per line) or text
+    LOG_FILE           optional file to write to instead of stdout
+    LOG_SAMPLE_RATES   per-route sampling of DEBUG/INFO records, e.g.
+                       "/api/feeling-analytics/live/analyze-chunk=0.05"; the decision
+                       is taken once per request, so a request logs fully or not at all.
+                       Warnings and errors are never dropped.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from .serialization import dumps_str
+
+LOGGER_NAME = 'feeling_analytics'
+
+_request_id = ContextVar('request_id', default=None)
+_sampled = ContextVar('log_sampled', default=True)
+
+# Attributes every LogRecord has; anything else came from `extra=` and is emitted as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+_listener = None
+
+
+def get_logger(name):
+    """Logger under the feeling_analytics hierarchy (pass __name__)"""
+    if not name.startswith(LOGGER_NAME):
+        name = f"{LOGGER_NAME}.{name}"
+    return logging.getLogger(name)
+
+
+def new_request_id():
+    return uuid.uuid4().hex[:16]
+
+
+def parse_sample_rates(value):
+    """"route=rate,route=rate" -> {route: rate}"""
+    rates = {}
+    for item in (value or '').split(','):
+        route, _, rate = item.strip().rpartition('=')
+        if route:
+            rates[route] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+SAMPLE_RATES = parse_sample_rates(os.getenv('LOG_SAMPLE_RATES', ''))
+
+
+@contextmanager
+def log_context(request_id=None, route=None):
+    """Tag records logged in this context with request_id and apply the route's sampling rate"""
+    rate = SAMPLE_RATES.get(route, 1.0)
+    id_token = _request_id.set(request_id or new_request_id())
+    sample_token = _sampled.set(rate >= 1.0 or random.random() < rate)
+    try:
+        yield _request_id.get()
+    finally:
+        _request_id.reset(id_token)
+        _sampled.reset(sample_token)
+
+
+class ContextFilter(logging.Filter):
+    """Attach the request id and drop DEBUG/INFO records of unsampled requests"""
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING and not _sampled.get():
+            return False
+        record.request_id = _request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return dumps_str(entry)
+
+
+class _Handoff(QueueHandler):
+    """QueueHandler that merges args on the calling thread but leaves formatting to the listener"""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level=None, fmt=None, stream=None):
+    """Install the queue handler on the feeling_analytics logger; idempotent"""
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel((level or os.getenv('LOG_LEVEL', 'INFO')).upper())
+    if _listener is not None:
+        return logger
+
+    log_file = os.getenv('LOG_FILE')
+    if log_file:
+        output = logging.FileHandler(log_file, encoding='utf-8')
+    else:
+        output = logging.StreamHandler(stream or sys.stdout)
+    if (fmt or os.getenv('LOG_FORMAT', 'json')).lower() == 'text':
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'))
+    else:
+        output.setFormatter(JsonFormatter())
+
+    records = queue.SimpleQueue()
+    handoff = _Handoff(records)
+    handoff.addFilter(ContextFilter())
+    logger.addHandler(handoff)
+    logger.propagate = False
+
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return logger
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
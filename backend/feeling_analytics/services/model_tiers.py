@@ -0,0 +1,105 @@
+"""
+Model tiers: several analyzers of different cost behind one router.
+
+MODEL_TIERS names the tiers and their Whisper sizes, e.g. live=tiny,final=base.
+Each tier is a SentimentAnalyzer with its own encoder, projection, exported
+scorer and backend (see ModelTier for the per-tier settings). Tiers that use
+the same emotion heads share one loaded copy instead of each loading ~3 GB.
+
+Endpoints ask for a quality: live chunks default to LIVE_QUALITY, analyses
+that are stored default to FINAL_QUALITY, and a request may pass any
+configured tier name instead. live and final fall back to the default tier
+when MODEL_TIERS does not define them, so a single-tier deployment (the
+default, final=WHISPER_MODEL) serves everything from one analyzer.
+Tiers load on first use; the API loads all of them at startup. A tier that
+fails to load is logged and not retried: its requests are served by the
+default tier, and only a failed default tier raises TierUnavailable.
+"""
+
+import os
+import threading
+
+from .logs import get_logger
+from .sentiment_analyzer import DEFAULT_TIER, MODEL_TIERS, SentimentAnalyzer, load_model_tiers
+
+logger = get_logger(__name__)
+
+LIVE_QUALITY = os.getenv('LIVE_QUALITY', 'live').lower()
+FINAL_QUALITY = os.getenv('FINAL_QUALITY', DEFAULT_TIER).lower()
+
+
+class UnknownQuality(ValueError):
+    pass
+
+
+class TierUnavailable(RuntimeError):
+    pass
+
+
+class ModelRouter:
+    def __init__(self, tiers=None):
+        self.tiers = tiers if tiers is not None else load_model_tiers(MODEL_TIERS)
+        self.default = DEFAULT_TIER if DEFAULT_TIER in self.tiers else next(iter(self.tiers))
+        self.analyzers = {}
+        self.failed = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_analyzers(cls, analyzers):
+        """Router over already built analyzers, {tier name: analyzer} (benchmarks, stub models)"""
+        router = cls(tiers={name: analyzer.tier for name, analyzer in analyzers.items()})
+        router.analyzers.update(analyzers)
+        return router
+
+    def resolve(self, quality=None):
+        """Tier name serving quality; raises UnknownQuality for names that are neither a tier nor live/final"""
+        quality = (quality or FINAL_QUALITY).strip().lower()
+        if quality in self.tiers:
+            return quality
+        if quality in (LIVE_QUALITY, FINAL_QUALITY):
+            return self.default
+        raise UnknownQuality(f"Unknown quality {quality!r} (expected one of {', '.join(self.qualities())})")
+
+    def qualities(self):
+        return sorted(set(self.tiers) | {LIVE_QUALITY, FINAL_QUALITY})
+
+    def get(self, quality=None):
+        """Analyzer for quality, loading its tier on first use; the default tier's if that tier failed to load"""
+        name = self.resolve(quality)
+        analyzer = self.analyzers.get(name)
+        if analyzer is None:
+            with self._lock:
+                analyzer = self.analyzers.get(name)
+                if analyzer is None and name not in self.failed:
+                    try:
+                        analyzer = self.analyzers[name] = self._load(name)
+                    except Exception as e:
+                        logger.exception("❌ Model tier %s failed to load%s", name,
+                                         "" if name == self.default else f", serving it from tier {self.default}")
+                        self.failed[name] = e
+        if analyzer is not None:
+            return analyzer
+        if name == self.default:
+            raise TierUnavailable(f"Model tier {name!r} is unavailable: {self.failed[name]}")
+        return self.get(self.default)
+
+    def _load(self, name):
+        tier = self.tiers[name]
+        # Heads already loaded by another tier from the same place are reused, not reloaded
+        heads = next(
+            (analyzer.mlp_models for analyzer in self.analyzers.values()
+             if analyzer.tier.heads_key == tier.heads_key and analyzer.mlp_models),
+            None,
+        )
+        logger.info("🧩 Loading model tier %s (whisper-%s, %s)%s", name, tier.whisper_model, tier.backend,
+                    " with shared heads" if heads else "")
+        return SentimentAnalyzer(tier=tier, heads=heads)
+
+    def load_all(self):
+        """Load every tier; failures are logged and leave the other tiers loaded"""
+        for name in self.tiers:
+            try:
+                self.get(name)
+            except TierUnavailable:
+                pass
+        return self
@@ -0,0 +1,52 @@
+"""Monthly range-partitioning helpers for caller_results/client_results"""
+import re
+from datetime import date
+
+
+def month_start(value):
+    """First day of the month containing `value` (date or datetime)"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def create_month_partitions(cursor, parent, first_month, last_month, name_base=None):
+    """Create one partition per month in [first_month, last_month] (idempotent)"""
+    name_base = name_base or parent
+    month = month_start(first_month)
+    while month <= last_month:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {partition_name(name_base, month)}
+            PARTITION OF {parent}
+            FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')
+        """)
+        month = add_months(month, 1)
+
+
+def list_month_tables(cursor, table):
+    """Return (name, month, attached) for every monthly table of `table`, including detached leftovers"""
+    cursor.execute("""
+        SELECT relname, relispartition FROM pg_class
+        WHERE relkind = 'r' AND relname LIKE %s
+        ORDER BY relname
+    """, (table.replace('_', '\\_') + '\\_p%',))
+    pattern = re.compile(rf"^{re.escape(table)}_p(\d{{4}})(\d{{2}})$")
+    tables = []
+    for name, attached in cursor.fetchall():
+        match = pattern.match(name)
+        if match:
+            tables.append((name, date(int(match.group(1)), int(match.group(2)), 1), attached))
+    return tables
@@ -0,0 +1,120 @@
+"""
+On-demand profiling of single API requests.
+
+A request carrying `X-Profile: cprofile|torch` and `X-Profile-Token: <PROFILE_ADMIN_TOKEN>`
+runs under cProfile or torch.profiler; the trace is written to PROFILE_DIR and its id
+is returned in the `X-Profile-Id` response header. With PROFILE_SAMPLE_EVERY=N every
+Nth analyze-chunk request is profiled the same way (PROFILE_SAMPLE_MODE).
+
+cProfile traces (.prof) open with snakeviz or `python -m pstats`; torch traces
+(.json) open in chrome://tracing or Perfetto, where stage() spans (features, encoder,
+heads, db_save, ...) appear as labelled ranges.
+
+Only one profile runs at a time per process; cProfile sees the event-loop thread,
+so concurrent async requests handled meanwhile show up in the same trace.
+"""
+
+import cProfile
+import hmac
+import itertools
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from .logs import get_logger
+from .telemetry import trace_stages
+
+logger = get_logger(__name__)
+
+PROFILE_MODES = ('cprofile', 'torch')
+PROFILE_EXTENSIONS = {'cprofile': '.prof', 'torch': '.json'}
+
+
+class ProfileManager:
+    def __init__(self):
+        self.admin_token = os.getenv('PROFILE_ADMIN_TOKEN', '')
+        self.directory = Path(os.getenv('PROFILE_DIR', Path(__file__).resolve().parents[2] / 'profiles'))
+        self.sample_every = int(os.getenv('PROFILE_SAMPLE_EVERY', '0'))
+        self.sample_mode = os.getenv('PROFILE_SAMPLE_MODE', 'cprofile')
+        self.keep = int(os.getenv('PROFILE_KEEP', '50'))
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.admin_token)
+
+    def is_admin(self, token):
+        return self.enabled and bool(token) and hmac.compare_digest(token, self.admin_token)
+
+    def should_sample(self):
+        return self.sample_every > 0 and next(self._counter) % self.sample_every == 0
+
+    @contextmanager
+    def profile(self, mode, label):
+        """Profile the enclosed block; yields the profile id, or None if another profile is running"""
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        if not self._lock.acquire(blocking=False):
+            yield None
+            return
+        try:
+            profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{label}-{uuid.uuid4().hex[:8]}"
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"{profile_id}{PROFILE_EXTENSIONS[mode]}"
+            if mode == 'torch':
+                with self._torch_profile(path):
+                    yield profile_id
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    yield profile_id
+                finally:
+                    profiler.disable()
+                    profiler.dump_stats(path)
+            logger.info("🔬 Profile written: %s", path)
+            self._prune()
+        finally:
+            self._lock.release()
+
+    @contextmanager
+    def _torch_profile(self, path):
+        import torch
+        from torch.profiler import ProfilerActivity, profile
+
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+        with profile(activities=activities, record_shapes=True) as prof, trace_stages():
+            yield
+        prof.export_chrome_trace(str(path))
+
+    def list(self):
+        if not self.directory.exists():
+            return []
+        files = sorted(
+            (p for p in self.directory.iterdir() if p.suffix in PROFILE_EXTENSIONS.values()),
+            key=lambda p: p.stat().st_mtime, reverse=True
+        )
+        return [{'id': p.stem, 'file': p.name, 'bytes': p.stat().st_size} for p in files]
+
+    def path(self, profile_id):
+        """File for a profile id, or None (ids never contain path separators)"""
+        if not profile_id or '/' in profile_id or '\\' in profile_id or profile_id.startswith('.'):
+            return None
+        for extension in PROFILE_EXTENSIONS.values():
+            candidate = self.directory / f"{profile_id}{extension}"
+            if candidate.is_file():
+                return candidate
+        return None
+
+    def _prune(self):
+        for entry in self.list()[self.keep:]:
+            try:
+                (self.directory / entry['file']).unlink()
+            except OSError:
+                pass
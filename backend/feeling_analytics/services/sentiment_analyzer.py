@@ -1,5 +1,4 @@
 import os
-import librosa
 import numpy as np
 import torch
 import torch.nn as nn
@@ -8,21 +7,42 @@ from dotenv import load_dotenv
 from datetime import datetime
 import tempfile
 import subprocess
-import traceback
 from pathlib import Path
-from typing import Tuple, Dict
+from typing import Tuple, Dict, List
 from scipy.special import softmax
+import time
+from .emotions import MAIN_EMOTIONS
+from .audio_io import (
+    SAMPLING_RATE, ChannelStats, MemoryBudget, MemoryBudgetExceeded, estimate_decoded_bytes, ffmpeg_to_wav,
+    is_native, load_channels, probe, resample, stream_channels,
+)
+from .features import LogMelFrontend
+from .inference import (
+    EXPORTED_BACKENDS, INFERENCE_BACKENDS, PROJECTION_FILE, EmotionScorer, compiled_backend, load_exported_backend,
+)
+from .logs import get_logger
+from .telemetry import (
+    ANALYSES_TOTAL, ANALYSIS_AUDIO_MEMORY, BATCH_SIZE, INFERENCE_IN_PROGRESS, MODEL_LOAD_SECONDS, collect_stages,
+    stage, stage_scope,
+)
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
 # ===== CONFIGURATION FROM .ENV =====
 USE_LOCAL_MODELS = os.getenv('USE_LOCAL_MODELS', 'true').lower() == 'true'
 WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base')
 DEVICE = os.getenv('DEVICE', 'cpu')
+# 'torch' (batched log-mel on the model device) or 'processor' (WhisperFeatureExtractor)
+FEATURE_FRONTEND = os.getenv('FEATURE_FRONTEND', 'torch').lower()
 LOCAL_MODELS_PATH = os.getenv('LOCAL_MODELS_PATH', '')
+# torch (eager, default), compile, torchscript or onnx; see services/inference.py
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'torch').lower()
 
-SAMPLING_RATE = 16000
 BACKEND_DIR = Path(__file__).parent.parent.parent
+# Exported scorers and the shared embedding projection (python -m feeling_analytics.export_models)
+EXPORT_DIR = Path(os.getenv('EXPORT_DIR', str(BACKEND_DIR / "models" / "exported")))
 
 # Remote models IDs
 WHISPER_REMOTE_ID = f"openai/whisper-{WHISPER_MODEL}"
@@ -37,8 +57,6 @@ else:
 LOCAL_WHISPER_DIR = LOCAL_MODELS_DIR / "whisper_model"
 LOCAL_EMPATHIC_DIR = LOCAL_MODELS_DIR / "empathic_insight"
 
-MAIN_EMOTIONS = ["Valence", "Arousal", "Anger", "Sadness", "Joy", "Fear", "Disgust", "Awe", "Contentment", "Interest"]
-
 # ===== FILE MAPPING FOR LOCAL EMPATHIC MODELS (TOP 10 EMOTIONS - VERIFIED IN HUGGINGFACE) =====
 FILENAME_PART_TO_TARGET_KEY_MAP: Dict[str, str] = {
     "Valence": "Valence",
@@ -53,7 +71,62 @@ FILENAME_PART_TO_TARGET_KEY_MAP: Dict[str, str] = {
     "Interest": "Interest"
 }
 
-print(f"🔧 Config: MODEL_MODE={'LOCAL' if USE_LOCAL_MODELS else 'REMOTE'} | Device: {DEVICE.upper()}")
+logger.info("🔧 Config: MODEL_MODE=%s | Device: %s", 'LOCAL' if USE_LOCAL_MODELS else 'REMOTE', DEVICE.upper())
+
+# ===== MODEL TIERS =====
+# "name=whisper size" pairs, e.g. live=tiny,final=base; see services/model_tiers.py for routing
+DEFAULT_TIER = 'final'
+MODEL_TIERS = os.getenv('MODEL_TIERS', f"{DEFAULT_TIER}={WHISPER_MODEL}")
+
+
+class ModelTier:
+    """Models one analyzer loads: Whisper size, emotion heads, exported projection/scorer and inference backend.
+
+    The final tier running WHISPER_MODEL keeps the global paths (LOCAL_WHISPER_DIR, EXPORT_DIR). Other tiers
+    read TIER_<NAME>_WHISPER_DIR, _EMPATHIC_DIR, _EXPORT_DIR and _BACKEND, defaulting to
+    <LOCAL_MODELS_DIR>/whisper_model_<size>, the shared heads and <EXPORT_DIR>/<name>.
+    """
+
+    def __init__(self, name=DEFAULT_TIER, whisper_model=WHISPER_MODEL, whisper_dir=None, empathic_dir=None,
+                 export_dir=None, backend=None):
+        default = name == DEFAULT_TIER and whisper_model == WHISPER_MODEL
+        self.name = name
+        self.whisper_model = whisper_model
+        self.whisper_remote_id = f"openai/whisper-{whisper_model}"
+        self.whisper_dir = Path(whisper_dir or (LOCAL_WHISPER_DIR if default else LOCAL_MODELS_DIR / f"whisper_model_{whisper_model}"))
+        self.empathic_dir = Path(empathic_dir or LOCAL_EMPATHIC_DIR)
+        self.export_dir = Path(export_dir or (EXPORT_DIR if default else EXPORT_DIR / name))
+        self.backend = (backend or INFERENCE_BACKEND).lower()
+
+    @classmethod
+    def from_env(cls, name, whisper_model):
+        prefix = f"TIER_{name.upper()}_"
+        return cls(
+            name, whisper_model,
+            whisper_dir=os.getenv(prefix + 'WHISPER_DIR'),
+            empathic_dir=os.getenv(prefix + 'EMPATHIC_DIR'),
+            export_dir=os.getenv(prefix + 'EXPORT_DIR'),
+            backend=os.getenv(prefix + 'BACKEND'),
+        )
+
+    @property
+    def heads_key(self):
+        """Tiers with the same key load the same emotion heads, so they share one copy"""
+        return str(self.empathic_dir) if USE_LOCAL_MODELS else EMPATHIC_REMOTE_ID
+
+
+def load_model_tiers(spec=MODEL_TIERS):
+    """{name: ModelTier} from a MODEL_TIERS string, in the order given"""
+    tiers = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        name, _, whisper_model = item.partition('=')
+        name = name.strip().lower()
+        tiers[name] = ModelTier.from_env(name, whisper_model.strip() or WHISPER_MODEL)
+    if not tiers:
+        raise ValueError(f"No model tiers in MODEL_TIERS={spec!r}")
+    return tiers
 
 
 class FullEmbeddingMLP(nn.Module):
@@ -83,85 +156,178 @@ class FullEmbeddingMLP(nn.Module):
 
 
 class SentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, load_models=True, tier: ModelTier = None, heads: dict = None):
+        """heads: emotion heads already loaded by another tier with the same heads_key"""
+        self.tier = tier or ModelTier()
         self.device = torch.device(DEVICE if torch.cuda.is_available() else "cpu")
         self.initialized = False
         self.use_fallback = False
         self.whisper_model = None
         self.whisper_processor = None
-        self.mlp_models = {}
-        # Projection layer to convert Whisper embeddings (512) to MLP expected (768)
+        self.mlp_models = dict(heads or {})
+        self.feature_frontend = None
+        # Scorer from services/inference.py; None scores with the eager heads
+        self.backend = None
+        # Projection layer to convert Whisper embeddings (512, resized to the loaded model's d_model) to MLP expected (768)
         self.embedding_projection = nn.Linear(512, 768).to(self.device)
-        self._initialize_models()
+        if load_models:
+            self._initialize_models()
+
+    @classmethod
+    def from_components(cls, whisper_processor, whisper_model, mlp_models, embedding_projection=None, tier=None):
+        """Build an analyzer around already constructed models (benchmarks, stub models)"""
+        analyzer = cls(load_models=False, tier=tier)
+        analyzer.whisper_processor = whisper_processor
+        analyzer.whisper_model = whisper_model.to(analyzer.device).eval()
+        analyzer._init_feature_frontend()
+        analyzer.mlp_models = {emotion: model.to(analyzer.device).eval() for emotion, model in mlp_models.items()}
+        if embedding_projection is not None:
+            analyzer.embedding_projection = embedding_projection.to(analyzer.device)
+        analyzer.initialized = True
+        return analyzer
 
     def _initialize_models(self):
         """Initialize Whisper + Empathic models (LOCAL or REMOTE)"""
         if self.initialized:
             return
         
-        print("=" * 70)
-        print(f"🚀 INITIALIZING MODELS - MODE: {'LOCAL' if USE_LOCAL_MODELS else 'REMOTE'}")
-        print("=" * 70)
+        logger.info("🚀 Initializing models - tier: %s, whisper-%s, mode: %s",
+                    self.tier.name, self.tier.whisper_model, 'LOCAL' if USE_LOCAL_MODELS else 'REMOTE')
+        backend = self.tier.backend
         
         # ===== LOAD WHISPER =====
+        start = time.perf_counter()
         self._load_whisper()
+        self._init_feature_frontend()
+        self._load_embedding_projection()
+        MODEL_LOAD_SECONDS.labels('whisper').set(time.perf_counter() - start)
         
-        # ===== LOAD EMPATHIC MODELS =====
-        self._load_empathic_models()
+        # ===== EXPORTED SCORER (skips the eager heads) =====
+        if backend in EXPORTED_BACKENDS:
+            start = time.perf_counter()
+            try:
+                self.use_backend(backend)
+                MODEL_LOAD_SECONDS.labels('scorer').set(time.perf_counter() - start)
+                logger.info("✅ Models ready! %s scorer with %d emotions", backend, len(self.backend.emotions))
+                self.initialized = True
+                return
+            except Exception as e:
+                logger.error("❌ Could not load %s scorer, using eager models: %s", backend, e)
         
-        print("=" * 70)
-        print(f"✅ Models ready! Loaded {len(self.mlp_models)} emotion models")
-        print("=" * 70)
+        # ===== LOAD EMPATHIC MODELS (unless shared by another tier) =====
+        if not self.mlp_models:
+            start = time.perf_counter()
+            self._load_empathic_models()
+            MODEL_LOAD_SECONDS.labels('emotion_heads').set(time.perf_counter() - start)
+        
+        if backend == 'compile':
+            try:
+                self.use_backend('compile')
+            except Exception as e:
+                logger.error("❌ torch.compile failed, using eager models: %s", e)
+        elif backend not in INFERENCE_BACKENDS:
+            logger.warning("⚠️ Unknown inference backend %s, using torch", backend)
+        
+        logger.info("✅ Models ready! Loaded %d emotion models", len(self.mlp_models))
+        self.initialized = True
+
+    def load_eager_models(self):
+        """Whisper, projection and emotion heads in eager PyTorch, whatever INFERENCE_BACKEND says (export, parity)"""
+        self._load_whisper()
+        self._init_feature_frontend()
+        self._load_embedding_projection()
+        if not self.mlp_models:
+            self._load_empathic_models()
         self.initialized = True
+        return self
+
+    def _load_embedding_projection(self):
+        """Use the exported 512->768 projection when there is one, so every backend and worker scores alike"""
+        path = self.tier.export_dir / PROJECTION_FILE
+        if path.exists():
+            self.embedding_projection.load_state_dict(torch.load(path, map_location=self.device))
+            logger.info("📁 Embedding projection: %s", path)
+
+    def build_scorer(self) -> EmotionScorer:
+        """The loaded encoder, projection and heads as one module (input features -> emotion scores)"""
+        return EmotionScorer(self.whisper_model.get_encoder(), self.embedding_projection, self.mlp_models).eval()
+
+    def use_backend(self, name: str, directory=None):
+        """Switch scoring to an inference backend: torch, compile, or an exported scorer in directory (the tier's export_dir)"""
+        if name == 'torch':
+            self.backend = None
+        elif name == 'compile':
+            self.backend = compiled_backend(self.build_scorer(), self.device)
+        else:
+            self.backend = load_exported_backend(name, directory or self.tier.export_dir, self.device)
+        logger.info("⚙️ Inference backend: %s", name)
+        return self.backend
+
+    def _init_feature_frontend(self):
+        if FEATURE_FRONTEND == 'torch' and self.whisper_processor is not None:
+            # WhisperProcessor wraps the extractor; stub models pass the extractor itself
+            extractor = getattr(self.whisper_processor, 'feature_extractor', self.whisper_processor)
+            self.feature_frontend = LogMelFrontend.from_feature_extractor(extractor)
+
+    def extract_features(self, waveforms: List[np.ndarray]) -> torch.Tensor:
+        """Whisper log-mel input features (batch, n_mels, 3000) on self.device for 16 kHz mono waveforms"""
+        with stage('features'):
+            if self.feature_frontend is not None:
+                return self.feature_frontend(waveforms, self.device)
+            return self.whisper_processor(
+                waveforms,
+                sampling_rate=SAMPLING_RATE,
+                return_tensors="pt"
+            ).input_features.to(self.device)
 
     def _load_whisper(self):
         """Load Whisper model (LOCAL or REMOTE)"""
         try:
             if USE_LOCAL_MODELS:
-                print(f"\n📁 WHISPER (LOCAL):")
-                if not LOCAL_WHISPER_DIR.exists():
-                    raise FileNotFoundError(f"Local Whisper not found: {LOCAL_WHISPER_DIR}")
-                print(f"   Path: {LOCAL_WHISPER_DIR}")
-                self.whisper_processor = AutoProcessor.from_pretrained(str(LOCAL_WHISPER_DIR))
+                whisper_dir = self.tier.whisper_dir
+                if not whisper_dir.exists():
+                    raise FileNotFoundError(f"Local Whisper not found: {whisper_dir}")
+                logger.info("📁 Whisper (LOCAL): %s", whisper_dir)
+                self.whisper_processor = AutoProcessor.from_pretrained(str(whisper_dir))
                 self.whisper_model = AutoModelForSpeechSeq2Seq.from_pretrained(
-                    str(LOCAL_WHISPER_DIR)
+                    str(whisper_dir)
                 ).to(self.device).eval()
-                print(f"   ✅ Whisper loaded from LOCAL")
+                logger.info("✅ Whisper loaded from LOCAL")
             else:
-                print(f"\n☁️ WHISPER (REMOTE):")
-                print(f"   Model: {WHISPER_REMOTE_ID}")
-                self.whisper_processor = AutoProcessor.from_pretrained(WHISPER_REMOTE_ID)
+                logger.info("☁️ Whisper (REMOTE): %s", self.tier.whisper_remote_id)
+                self.whisper_processor = AutoProcessor.from_pretrained(self.tier.whisper_remote_id)
                 self.whisper_model = AutoModelForSpeechSeq2Seq.from_pretrained(
-                    WHISPER_REMOTE_ID
+                    self.tier.whisper_remote_id
                 ).to(self.device).eval()
-                print(f"   ✅ Whisper loaded from HUGGING FACE")
+                logger.info("✅ Whisper loaded from HUGGING FACE")
+            d_model = self.whisper_model.config.d_model
+            if self.embedding_projection.in_features != d_model:
+                self.embedding_projection = nn.Linear(d_model, 768).to(self.device)
         except Exception as e:
-            print(f"❌ ERROR loading Whisper: {e}")
+            logger.error("❌ Error loading Whisper: %s", e)
             raise
 
     def _load_empathic_models(self):
         """Load Empathic Insight emotion models (LOCAL or REMOTE)"""
         try:
             if USE_LOCAL_MODELS:
-                print(f"\n😊 EMPATHIC MODELS (LOCAL):")
-                if not LOCAL_EMPATHIC_DIR.exists():
-                    raise FileNotFoundError(f"Local Empathic models not found: {LOCAL_EMPATHIC_DIR}")
-                print(f"   Path: {LOCAL_EMPATHIC_DIR}")
+                if not self.tier.empathic_dir.exists():
+                    raise FileNotFoundError(f"Local Empathic models not found: {self.tier.empathic_dir}")
+                logger.info("😊 Empathic models (LOCAL): %s", self.tier.empathic_dir)
                 self._load_empathic_local()
             else:
-                print(f"\n☁️ EMPATHIC MODELS (REMOTE):")
-                print(f"   Repo: {EMPATHIC_REMOTE_ID}")
+                logger.info("☁️ Empathic models (REMOTE): %s", EMPATHIC_REMOTE_ID)
                 self._load_empathic_remote()
         except Exception as e:
-            print(f"❌ ERROR loading Empathic models: {e}")
+            logger.error("❌ Error loading Empathic models: %s", e)
             raise
 
     def _load_empathic_local(self):
         """Load emotion models from LOCAL directory"""
-        print(f"   Scanning for .pth files...")
+        logger.debug("Scanning for .pth files...")
         count = 0
         
-        for pth_file in LOCAL_EMPATHIC_DIR.glob("model_*_best.pth"):
+        for pth_file in self.tier.empathic_dir.glob("model_*_best.pth"):
             try:
                 filename_part = pth_file.name.split("model_")[1].split("_best.pth")[0]
                 if filename_part in FILENAME_PART_TO_TARGET_KEY_MAP:
@@ -175,12 +341,12 @@ class SentimentAnalyzer:
                     model = model.to(self.device).eval()
                     self.mlp_models[emotion_key] = model
                     count += 1
-                    print(f"   ✅ {emotion_key}")
+                    logger.debug("✅ %s", emotion_key)
             except Exception as e:
-                print(f"   ⚠️ Skipped {pth_file.name}: {e}")
+                logger.warning("⚠️ Skipped %s: %s", pth_file.name, e)
                 continue
         
-        print(f"   ✅ Loaded {count} models from LOCAL")
+        logger.info("✅ Loaded %d models from LOCAL", count)
 
     def _load_empathic_remote(self):
         """Load emotion models from HUGGING FACE Hub"""
@@ -190,7 +356,7 @@ class SentimentAnalyzer:
         for filename_part, emotion_key in FILENAME_PART_TO_TARGET_KEY_MAP.items():
             try:
                 model_filename = f"model_{filename_part}_best.pth"
-                print(f"   ⬇️ {emotion_key}...", end=" ")
+                logger.debug("⬇️ %s...", emotion_key)
                 
                 model_path = hf_hub_download(
                     repo_id=EMPATHIC_REMOTE_ID,
@@ -206,20 +372,20 @@ class SentimentAnalyzer:
                 model = model.to(self.device).eval()
                 self.mlp_models[emotion_key] = model
                 count += 1
-                print(f"✅")
             except Exception as e:
-                print(f"⚠️ {e}")
+                logger.warning("⚠️ Could not load %s: %s", emotion_key, e)
                 continue
         
-        print(f"   ✅ Loaded {count} models from REMOTE")
+        logger.info("✅ Loaded %d models from REMOTE", count)
 
     def _convert_to_wav(self, audio_file_path: str) -> str:
         """Convert audio to WAV format"""
-        if audio_file_path.lower().endswith('.wav'):
+        # wav (including G.711), flac and ogg are decoded directly by audio_io
+        if is_native(audio_file_path):
             return audio_file_path
         
         try:
-            print(f"🎬 Converting to WAV...")
+            logger.debug("🎬 Converting to WAV...")
             from moviepy.editor import AudioFileClip
             clip = AudioFileClip(audio_file_path)
             wav_path = tempfile.NamedTemporaryFile(suffix='.wav', delete=False).name
@@ -227,20 +393,20 @@ class SentimentAnalyzer:
             clip.close()
             return wav_path
         except Exception as e:
-            print(f"⚠️ Moviepy failed: {e}")
+            logger.warning("⚠️ Moviepy failed: %s", e)
         
         try:
             from pydub import AudioSegment
-            print("  Trying pydub...")
+            logger.debug("Trying pydub...")
             audio = AudioSegment.from_file(audio_file_path)
             wav_path = tempfile.NamedTemporaryFile(suffix='.wav', delete=False).name
             audio.export(wav_path, format="wav")
             return wav_path
         except Exception as e:
-            print(f"⚠️ Pydub failed: {e}")
+            logger.warning("⚠️ Pydub failed: %s", e)
         
         try:
-            print("  Trying ffmpeg...")
+            logger.debug("Trying ffmpeg...")
             wav_path = tempfile.NamedTemporaryFile(suffix='.wav', delete=False).name
             subprocess.run(
                 ['ffmpeg', '-i', audio_file_path, '-acodec', 'pcm_s16le', '-ar', '16000', wav_path, '-y'],
@@ -248,31 +414,25 @@ class SentimentAnalyzer:
             )
             return wav_path
         except Exception as e:
-            print(f"⚠️ FFmpeg failed: {e}")
+            logger.warning("⚠️ FFmpeg failed: %s", e)
         
-        print(f"❌ Could not convert, using original")
+        logger.error("❌ Could not convert, using original")
         return audio_file_path
 
     def _load_stereo_audio(self, audio_path: str, sr: int = 16000) -> Tuple[np.ndarray, np.ndarray, int]:
         """Load audio and return stereo channels"""
         try:
-            waveform, samplerate = librosa.load(audio_path, sr=sr, mono=False)
-            
-            if waveform.ndim == 1:
-                return waveform, waveform, samplerate
-            else:
-                caller = waveform[0] if waveform.shape[0] > 0 else np.zeros(sr)
-                client = waveform[1] if waveform.shape[0] > 1 else waveform[0]
-                return caller, client, samplerate
+            caller, client = load_channels(audio_path, sr)
+            return caller, client, sr
         except Exception as e:
-            print(f"❌ Audio loading failed: {e}")
+            logger.error("❌ Audio loading failed: %s", e)
             silent = np.zeros(sr)
             return silent, silent, sr
 
     def analyze_audio(self, audio_file_path: str, filename: str, analyze_channels: str = "both") -> dict:
         """Main analysis function"""
         try:
-            print(f"\n📊 Analyzing: {filename}")
+            logger.info("📊 Analyzing: %s", filename)
             
             wav_path = self._convert_to_wav(audio_file_path)
             caller_audio, client_audio, sr = self._load_stereo_audio(wav_path)
@@ -289,7 +449,7 @@ class SentimentAnalyzer:
             combined_scores = {}
             
             if analyze_channels in ['both', 'caller']:
-                print("🎤 Analyzing caller channel...")
+                logger.debug("🎤 Analyzing caller channel...")
                 caller_scores = self._analyze_channel(caller_audio, sr, "caller")
                 result['caller'] = caller_scores
                 result['channels_analyzed'].append('caller')
@@ -298,7 +458,7 @@ class SentimentAnalyzer:
                     combined_scores[emotion] = combined_scores.get(emotion, 0) + score
             
             if analyze_channels in ['both', 'client']:
-                print("👥 Analyzing client channel...")
+                logger.debug("👥 Analyzing client channel...")
                 client_scores = self._analyze_channel(client_audio, sr, "client")
                 result['client'] = client_scores
                 result['channels_analyzed'].append('client')
@@ -334,10 +494,10 @@ class SentimentAnalyzer:
             result['keywords'] = []
             result['processing_time'] = 0.0
             
-            print("✓ Analysis complete\n")
+            logger.info("✓ Analysis complete")
             return result
         except Exception as e:
-            print(f"❌ Error: {e}")
+            logger.exception("❌ Error analyzing %s: %s", filename, e)
             raise
 
     def _analyze_channel(self, audio: np.ndarray, sr: int, channel_name: str = "unknown") -> dict:
@@ -354,7 +514,7 @@ class SentimentAnalyzer:
                     score = self._predict_with_mlp(embedding, mlp_model)
                     all_scores[target_key] = score
                 except Exception as e:
-                    print(f"    ⚠️ {target_key} prediction error: {e}")
+                    logger.warning("⚠️ %s prediction error: %s", target_key, e)
                     all_scores[target_key] = 0.0
             
             # Step 3: Ensure main emotions are always present
@@ -390,7 +550,7 @@ class SentimentAnalyzer:
                 'transcript': ''  # Empty transcript since we don't have actual transcription
             }
         except Exception as e:
-            print(f"❌ Channel analysis error: {e}")
+            logger.exception("❌ Channel analysis error: %s", e)
             empty_scores = {e: 0.0 for e in MAIN_EMOTIONS}
             return {
                 'final_score': 0.0,
@@ -455,10 +615,10 @@ class SentimentAnalyzer:
         try:
             if self.use_fallback or self.whisper_model is None or self.whisper_processor is None:
                 # Return dummy embedding for fallback mode
-                print(f"      Using fallback embedding (shape: (1, 1500, 768))")
+                logger.debug("Using fallback embedding (shape: (1, 1500, 768))")
                 return torch.randn(1, 1500, 768).to(self.device)
             
-            print(f"      Extracting embedding from waveform shape: {waveform.shape}")
+            logger.debug("Extracting embedding from waveform shape: %s", waveform.shape)
             
             # Ensure mono audio
             if waveform.ndim > 1:
@@ -470,34 +630,31 @@ class SentimentAnalyzer:
             
             # Resample if needed
             if sr != SAMPLING_RATE:
-                print(f"      Resampling from {sr} to {SAMPLING_RATE}")
-                waveform = librosa.resample(waveform, orig_sr=sr, target_sr=SAMPLING_RATE)
+                logger.debug("Resampling from %s to %s", sr, SAMPLING_RATE)
+                with stage('resample'):
+                    waveform = resample(waveform, sr)
             
-            print(f"      Waveform after prep: shape={waveform.shape}, dtype={waveform.dtype}")
+            logger.debug("Waveform after prep: shape=%s, dtype=%s", waveform.shape, waveform.dtype)
             
-            # Process through Whisper processor
+            # Log-mel features
             with torch.no_grad():
-                input_features = self.whisper_processor(
-                    waveform,
-                    sampling_rate=SAMPLING_RATE,
-                    return_tensors="pt"
-                ).input_features.to(self.device)
+                input_features = self.extract_features([waveform])
                 
-                print(f"      Input features shape: {input_features.shape}")
+                logger.debug("Input features shape: %s", input_features.shape)
                 
                 # Get encoder output (this gives us the embeddings)
-                encoder_outputs = self.whisper_model.get_encoder()(input_features=input_features)
-                embedding = encoder_outputs.last_hidden_state  # Shape: (batch_size, seq_len, 512) for whisper-base
-                
-                print(f"      Embedding shape from encoder: {embedding.shape}")
-                
-                # Whisper outputs 512-dim embeddings, need to project to 768 for MLP models
-                embedding = self.embedding_projection(embedding)  # Now (batch, seq_len, 768)
-                print(f"      Embedding after projection: {embedding.shape}")
+                with stage('encoder'):
+                    encoder_outputs = self.whisper_model.get_encoder()(input_features=input_features)
+                    embedding = encoder_outputs.last_hidden_state  # Shape: (batch_size, seq_len, 512) for whisper-base
+                    
+                    logger.debug("Embedding shape from encoder: %s", embedding.shape)
+                    
+                    # Whisper outputs 512-dim embeddings, need to project to 768 for MLP models
+                    embedding = self.embedding_projection(embedding)  # Now (batch, seq_len, 768)
+                logger.debug("Embedding after projection: %s", embedding.shape)
                 
                 # Ensure shape is (1, seq_len, 768)
                 if embedding.ndim != 3:
-                    print(f"      ERROR: embedding has wrong dims: {embedding.ndim}")
                     raise ValueError(f"Embedding has shape {embedding.shape}, expected (1, seq_len, 768)")
                 
                 # Pad/truncate to fixed size (1, 1500, 768)
@@ -505,7 +662,7 @@ class SentimentAnalyzer:
                 target_seq_len = 1500
                 
                 if current_seq_len < target_seq_len:
-                    print(f"      Padding from {current_seq_len} to {target_seq_len}")
+                    logger.debug("Padding from %d to %d", current_seq_len, target_seq_len)
                     padding = torch.zeros(
                         (1, target_seq_len - current_seq_len, 768),
                         device=self.device,
@@ -513,14 +670,13 @@ class SentimentAnalyzer:
                     )
                     embedding = torch.cat((embedding, padding), dim=1)
                 elif current_seq_len > target_seq_len:
-                    print(f"      Truncating from {current_seq_len} to {target_seq_len}")
+                    logger.debug("Truncating from %d to %d", current_seq_len, target_seq_len)
                     embedding = embedding[:, :target_seq_len, :]
                 
-                print(f"      Final embedding shape: {embedding.shape}")
+                logger.debug("Final embedding shape: %s", embedding.shape)
                 return embedding
         except Exception as e:
-            print(f"    ❌ Error extracting embedding: {e}")
-            traceback.print_exc()
+            logger.exception("❌ Error extracting embedding: %s", e)
             # Return dummy embedding on error
             return torch.zeros((1, 1500, 768), device=self.device, dtype=torch.float32)
 
@@ -536,7 +692,7 @@ class SentimentAnalyzer:
             normalized_value = expit(raw_value)
             return float(max(0.0, min(1.0, normalized_value)))
         except Exception as e:
-            print(f"    Error in MLP prediction: {e}")
+            logger.warning("Error in MLP prediction: %s", e)
             return 0.0
 
     def _generate_advice(self, valence: float, arousal: float, anger: float) -> str:
@@ -553,120 +709,146 @@ class SentimentAnalyzer:
             return "✅ Tono equilibrado."
 
 
-    def _convert_to_wav(self, audio_file_path: str) -> str:
-        """Convert audio to WAV format"""
-        if audio_file_path.lower().endswith('.wav'):
+    def _convert_to_wav(self, audio_file_path: str, budget: MemoryBudget = None) -> str:
+        """WAV to stream from: the file itself if libsndfile reads it, else an ffmpeg conversion on disk"""
+        # wav (including G.711), flac, ogg and, with libsndfile >= 1.1, mp3 are decoded directly by audio_io
+        if is_native(audio_file_path) or probe(audio_file_path)[0] is not None:
             return audio_file_path
         
         try:
-            print(f"🎬 Converting to WAV...")
-            from moviepy.editor import AudioFileClip
-            
-            clip = AudioFileClip(audio_file_path)
-            wav_path = tempfile.NamedTemporaryFile(suffix='.wav', delete=False).name
-            clip.write_audiofile(wav_path, verbose=False, logger=None)
-            clip.close()
-            return wav_path
+            logger.debug("🎬 Converting to WAV with ffmpeg...")
+            return ffmpeg_to_wav(audio_file_path, SAMPLING_RATE)
         except Exception as e:
-            print(f"⚠️ Moviepy failed: {e}")
+            logger.warning("⚠️ FFmpeg failed: %s", e)
         
-        try:
-            from pydub import AudioSegment
-            print("Trying pydub...")
-            audio = AudioSegment.from_file(audio_file_path)
-            wav_path = tempfile.NamedTemporaryFile(suffix='.wav', delete=False).name
-            audio.export(wav_path, format="wav")
-            return wav_path
-        except Exception as e:
-            print(f"⚠️ Pydub failed: {e}")
-        
-        try:
-            print("Trying ffmpeg...")
-            wav_path = tempfile.NamedTemporaryFile(suffix='.wav', delete=False).name
-            subprocess.run(
-                ['ffmpeg', '-i', audio_file_path, '-acodec', 'pcm_s16le', '-ar', '16000', wav_path, '-y'],
-                check=True, capture_output=True
-            )
-            return wav_path
-        except Exception as e:
-            print(f"⚠️ FFmpeg failed: {e}")
+        # pydub decodes the whole file in memory: only when its decoded size fits the budget
+        estimate = estimate_decoded_bytes(audio_file_path)
+        if estimate is not None:
+            try:
+                with (budget or MemoryBudget()).hold(estimate):
+                    from pydub import AudioSegment
+                    logger.debug("Trying pydub...")
+                    audio = AudioSegment.from_file(audio_file_path)
+                    wav_path = tempfile.NamedTemporaryFile(suffix='.wav', delete=False).name
+                    audio.export(wav_path, format="wav")
+                return wav_path
+            except MemoryBudgetExceeded:
+                raise
+            except Exception as e:
+                logger.warning("⚠️ Pydub failed: %s", e)
         
-        print(f"❌ Could not convert, using original")
+        logger.error("❌ Could not convert, using original")
         return audio_file_path
 
     def _load_stereo_audio(self, audio_path: str, sr: int = 16000) -> Tuple[np.ndarray, np.ndarray, int]:
         """Load audio and return stereo channels"""
         try:
-            waveform, samplerate = librosa.load(audio_path, sr=sr, mono=False)
-            
-            if waveform.ndim == 1:
-                # Mono - use same for both
-                return waveform, waveform, samplerate
-            else:
-                # Stereo
-                caller = waveform[0] if waveform.shape[0] > 0 else np.zeros(sr)
-                client = waveform[1] if waveform.shape[0] > 1 else waveform[0]
-                return caller, client, samplerate
+            caller, client = load_channels(audio_path, sr)
+            return caller, client, sr
         except Exception as e:
-            print(f"❌ Audio loading failed: {e}")
+            logger.error("❌ Audio loading failed: %s", e)
             silent = np.zeros(sr)
             return silent, silent, sr
 
+    def _stream_stereo_audio(self, audio_path: str, budget: MemoryBudget) -> Tuple[ChannelStats, ChannelStats]:
+        """Decode block by block: per-channel model window and whole-call statistics, within budget"""
+        try:
+            caller, client, _ = stream_channels(audio_path, SAMPLING_RATE, budget=budget)
+            return caller, client
+        except MemoryBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.error("❌ Audio loading failed: %s", e)
+            silent = ChannelStats(SAMPLING_RATE)
+            silent.update(np.zeros(SAMPLING_RATE, dtype=np.float32))
+            return silent, silent
+
     def analyze_audio(self, audio_file_path: str, filename: str, analyze_channels: str = "both") -> dict:
         """Main analysis function"""
+        start = time.perf_counter()
         try:
-            print(f"📊 Analyzing: {filename}")
+            logger.info("📊 Analyzing: %s", filename)
             
-            # Convert to WAV
-            wav_path = self._convert_to_wav(audio_file_path)
-            
-            # Load audio
-            caller_audio, client_audio, sr = self._load_stereo_audio(wav_path)
-            
-            result = {
-                'id_call': filename,
-                'filename': filename,
-                'analysis_date': datetime.utcnow().isoformat(),
-                'sample_rate': sr
+            budget = MemoryBudget()
+            with collect_stages() as timings, INFERENCE_IN_PROGRESS.track_inprogress():
+                # Convert to WAV and stream it: only the model window and running stats are kept
+                with stage('convert'):
+                    wav_path = self._convert_to_wav(audio_file_path, budget)
+                try:
+                    with stage('decode'):
+                        caller, client = self._stream_stereo_audio(wav_path, budget)
+                finally:
+                    if wav_path != audio_file_path:
+                        os.unlink(wav_path)
+                sr = SAMPLING_RATE
+                
+                result = {
+                    'id_call': filename,
+                    'filename': filename,
+                    'analysis_date': datetime.utcnow().isoformat(),
+                    'sample_rate': sr
+                }
+                
+                if analyze_channels in ['both', 'caller']:
+                    logger.debug("🎤 Analyzing caller...")
+                    with stage_scope('caller'):
+                        caller_scores = self._analyze_channel(caller.waveform, sr, rms=caller.rms)
+                    result['caller'] = caller_scores
+                
+                if analyze_channels in ['both', 'client']:
+                    logger.debug("👥 Analyzing client...")
+                    with stage_scope('client'):
+                        client_scores = self._analyze_channel(client.waveform, sr, rms=client.rms)
+                    result['client'] = client_scores
+            
+            result['processing_time'] = time.perf_counter() - start
+            native_rate, channel_count = probe(audio_file_path)
+            result['perf'] = {
+                # Same dict as the collector: transcription and db_save timings of the
+                # enclosing request/job keep landing here until save_result stores it
+                'stages': timings.stages,
+                'audio_format': os.path.splitext(audio_file_path)[1].lower().lstrip('.') or None,
+                'duration_seconds': caller.samples / sr,
+                'sample_rate': native_rate,
+                'channels': channel_count,
+                'peak_memory_bytes': budget.peak,
+                'model_tier': self.tier.name,
             }
-            
-            if analyze_channels in ['both', 'caller']:
-                print("🎤 Analyzing caller...")
-                caller_scores = self._analyze_channel(caller_audio, sr)
-                result['caller'] = caller_scores
-            
-            if analyze_channels in ['both', 'client']:
-                print("👥 Analyzing client...")
-                client_scores = self._analyze_channel(client_audio, sr)
-                result['client'] = client_scores
-            
-            print("✓ Analysis complete")
+            ANALYSIS_AUDIO_MEMORY.observe(budget.peak)
+            ANALYSES_TOTAL.labels('ok').inc()
+            logger.info("✓ Analysis complete (%.2fs)", result['processing_time'])
             return result
         except Exception as e:
-            print(f"❌ Error: {e}")
+            ANALYSES_TOTAL.labels('error').inc()
+            logger.exception("❌ Error analyzing %s: %s", filename, e)
             raise
 
-    def _analyze_channel(self, audio: np.ndarray, sr: int) -> dict:
-        """Analyze single audio channel with emotion models"""
+    def _analyze_channel(self, audio: np.ndarray, sr: int, rms: float = None) -> dict:
+        """Analyze single audio channel with emotion models; rms of the whole channel feeds the heuristics"""
         try:
             all_scores = {}
             
             # Try to use emotion models if available
-            if len(self.mlp_models) > 0 and self.whisper_processor is not None:
-                print(f"    Using emotion models for inference...")
+            if (self.backend is not None or len(self.mlp_models) > 0) and self.whisper_processor is not None:
+                logger.debug("Using emotion models for inference...")
                 try:
                     # Resample to 16kHz if needed
                     if sr != SAMPLING_RATE:
-                        audio = librosa.resample(audio, orig_sr=sr, target_sr=SAMPLING_RATE)
+                        with stage('resample'):
+                            audio = resample(audio, sr)
+                    
+                    if self.backend is not None:
+                        return self._channel_result(self._score_with_backend([audio])[0])
                     
                     # Extract Whisper embedding ONCE
                     embedding = self._get_whisper_embedding(audio, SAMPLING_RATE)
                     
                     # Inference through each emotion MLP model
-                    for emotion, model in self.mlp_models.items():
-                        score = self._predict_with_mlp(embedding, model)
-                        all_scores[emotion] = score
-                        print(f"      {emotion}: {score:.3f}")
+                    with stage('heads'):
+                        for emotion, model in self.mlp_models.items():
+                            score = self._predict_with_mlp(embedding, model)
+                            all_scores[emotion] = score
+                            logger.debug("%s: %.3f", emotion, score)
                     
                     # Ensure all emotions are present
                     for emotion in MAIN_EMOTIONS:
@@ -674,34 +856,16 @@ class SentimentAnalyzer:
                             all_scores[emotion] = 0.0
                 
                 except Exception as e:
-                    print(f"    ⚠️ Model inference failed: {e}")
-                    traceback.print_exc()
-                    print(f"    Falling back to heuristics...")
-                    all_scores = self._compute_heuristic_scores(audio, sr)
+                    logger.exception("⚠️ Model inference failed, falling back to heuristics: %s", e)
+                    all_scores = self._compute_heuristic_scores(audio, sr, rms)
             else:
                 # Use heuristics if no models loaded
-                print(f"    Using heuristic scoring (no models loaded)...")
-                print(f"    Models: {len(self.mlp_models)}, Processor: {self.whisper_processor is not None}")
-                all_scores = self._compute_heuristic_scores(audio, sr)
-            
-            # Compute final scores
-            final_score = float(all_scores.get('Valence', 0.0) * all_scores.get('Arousal', 0.0))
-            advice = self._generate_advice(
-                all_scores.get('Valence', 0.0),
-                all_scores.get('Arousal', 0.0),
-                all_scores.get('Anger', 0.0)
-            )
+                logger.debug("Using heuristic scoring (models: %d, processor: %s)", len(self.mlp_models), self.whisper_processor is not None)
+                all_scores = self._compute_heuristic_scores(audio, sr, rms)
             
-            return {
-                'final_score': final_score,
-                'valence_score': float(all_scores.get('Valence', 0.0)),
-                'arousal_score': float(all_scores.get('Arousal', 0.0)),
-                'all_scores': all_scores,
-                'advice': advice
-            }
+            return self._channel_result(all_scores)
         except Exception as e:
-            print(f"❌ Channel analysis error: {e}")
-            traceback.print_exc()
+            logger.exception("❌ Channel analysis error: %s", e)
             # Return zeros for all emotions
             empty_scores = {e: 0.0 for e in MAIN_EMOTIONS}
             return {
@@ -712,13 +876,105 @@ class SentimentAnalyzer:
                 'advice': 'Error processing audio'
             }
 
-    def _compute_heuristic_scores(self, audio: np.ndarray, sr: int) -> dict:
-        """Fallback heuristic scoring when models unavailable"""
+    def _channel_result(self, all_scores: dict) -> dict:
+        """Final score and advice for one channel's emotion scores"""
+        final_score = float(all_scores.get('Valence', 0.0) * all_scores.get('Arousal', 0.0))
+        advice = self._generate_advice(
+            all_scores.get('Valence', 0.0),
+            all_scores.get('Arousal', 0.0),
+            all_scores.get('Anger', 0.0)
+        )
+        return {
+            'final_score': final_score,
+            'valence_score': float(all_scores.get('Valence', 0.0)),
+            'arousal_score': float(all_scores.get('Arousal', 0.0)),
+            'all_scores': all_scores,
+            'advice': advice
+        }
+
+    @torch.no_grad()
+    def analyze_channels(self, channels: List[np.ndarray]) -> List[dict]:
+        """Score many 16 kHz channels at once: one Whisper encoder pass and one pass per emotion head.
+
+        Same result per channel as _analyze_channel; used by the offline batch scorer.
+        """
+        if not channels:
+            return []
+        if self.use_fallback or not (self.mlp_models or self.backend) or self.whisper_processor is None:
+            return [self._analyze_channel(audio, SAMPLING_RATE) for audio in channels]
+        BATCH_SIZE.observe(len(channels))
+        if self.backend is not None:
+            try:
+                return [self._channel_result(scores) for scores in self._score_with_backend(channels)]
+            except Exception as e:
+                logger.exception("⚠️ %s scorer failed (%s), using heuristics", self.backend.name, e)
+                return [self._channel_result(self._compute_heuristic_scores(audio, SAMPLING_RATE)) for audio in channels]
+        try:
+            embeddings = self._get_whisper_embeddings(channels)
+            with stage('heads'):
+                predictions = {
+                    emotion: torch.sigmoid(model(embeddings).float()).reshape(-1).tolist()
+                    for emotion, model in self.mlp_models.items()
+                }
+        except Exception as e:
+            logger.exception("⚠️ Batched inference failed (%s), scoring channels one by one", e)
+            return [self._analyze_channel(audio, SAMPLING_RATE) for audio in channels]
+
+        results = []
+        for index in range(len(channels)):
+            all_scores = {emotion: float(values[index]) for emotion, values in predictions.items()}
+            for emotion in MAIN_EMOTIONS:
+                all_scores.setdefault(emotion, 0.0)
+            results.append(self._channel_result(all_scores))
+        return results
+
+    def _prepare_waveforms(self, waveforms: List[np.ndarray]) -> List[np.ndarray]:
+        """Mono, peak-normalized to [-1, 1] when louder, as _get_whisper_embedding does"""
+        prepared = []
+        for waveform in waveforms:
+            if waveform.ndim > 1:
+                waveform = np.mean(waveform, axis=0)
+            peak = np.max(np.abs(waveform)) if waveform.size else 0.0
+            if peak > 1:
+                waveform = waveform / peak
+            prepared.append(waveform)
+        return prepared
+
+    def _score_with_backend(self, waveforms: List[np.ndarray]) -> List[dict]:
+        """Emotion scores per 16 kHz waveform from self.backend, every MAIN_EMOTIONS key present"""
+        input_features = self.extract_features(self._prepare_waveforms(waveforms))
+        with stage('scorer'):
+            scores = self.backend(input_features)
+        results = []
+        for row in scores:
+            all_scores = {emotion: float(value) for emotion, value in zip(self.backend.emotions, row)}
+            for emotion in MAIN_EMOTIONS:
+                all_scores.setdefault(emotion, 0.0)
+            results.append(all_scores)
+        return results
+
+    def _get_whisper_embeddings(self, waveforms: List[np.ndarray]) -> torch.Tensor:
+        """Batched _get_whisper_embedding for 16 kHz mono waveforms: (batch, 1500, 768)"""
+        input_features = self.extract_features(self._prepare_waveforms(waveforms))
+        with stage('encoder'):
+            embedding = self.whisper_model.get_encoder()(input_features=input_features).last_hidden_state
+            embedding = self.embedding_projection(embedding)
+
+        target_seq_len = 1500
+        if embedding.shape[1] < target_seq_len:
+            padding = torch.zeros(
+                (embedding.shape[0], target_seq_len - embedding.shape[1], embedding.shape[2]),
+                device=self.device,
+                dtype=embedding.dtype
+            )
+            embedding = torch.cat((embedding, padding), dim=1)
+        return embedding[:, :target_seq_len, :]
+
+    def _compute_heuristic_scores(self, audio: np.ndarray, sr: int, rms: float = None) -> dict:
+        """Fallback heuristic scoring when models unavailable (pass rms when audio is only part of the call)"""
         try:
-            rms = np.sqrt(np.mean(audio ** 2))
-            spec = np.abs(np.fft.rfft(audio))
-            freqs = np.fft.rfftfreq(len(audio), 1/sr)
-            centroid = np.sum(freqs * spec) / np.sum(spec) if np.sum(spec) > 0 else 0
+            if rms is None:
+                rms = np.sqrt(np.mean(audio ** 2))
             
             # Normalize to -1 to 1
             valence = np.tanh(rms * 2.0 - 0.3)
@@ -737,7 +993,7 @@ class SentimentAnalyzer:
                 'Joy': float(joy)
             }
         except Exception as e:
-            print(f"❌ Heuristic scoring failed: {e}")
+            logger.error("❌ Heuristic scoring failed: %s", e)
             return {e: 0.0 for e in MAIN_EMOTIONS}
 
     def _generate_advice(self, valence: float, arousal: float, anger: float) -> str:
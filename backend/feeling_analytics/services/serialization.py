@@ -0,0 +1,41 @@
+"""JSON encoding shared by API responses, exports and JSONB writes.
+
+Uses orjson when installed (datetimes and numpy arrays are encoded natively)
+and falls back to the stdlib encoder with the same conversions.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Encode to UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, ensure_ascii=False).encode("utf-8")
+
+
+def dumps_str(obj):
+    """Encode to a JSON string (e.g. for JSONB parameters)"""
+    return dumps(obj).decode("utf-8")
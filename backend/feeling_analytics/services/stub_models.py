@@ -0,0 +1,50 @@
+"""
+Randomly initialized stand-ins for the Whisper encoder and the Empathic Insight heads.
+
+They have the same shapes and cost as the real models but are built from config,
+so benchmarks and parity checks run without network access or model files.
+Scores they produce are meaningless.
+"""
+
+import torch
+from transformers import WhisperConfig, WhisperFeatureExtractor, WhisperForConditionalGeneration
+
+from .emotions import MAIN_EMOTIONS
+from .sentiment_analyzer import FullEmbeddingMLP, ModelTier, SentimentAnalyzer
+
+# Encoder/decoder shapes of the published checkpoints (WHISPER_MODEL values)
+WHISPER_SHAPES = {
+    'tiny': dict(d_model=384, encoder_layers=4, decoder_layers=4, encoder_attention_heads=6,
+                 decoder_attention_heads=6, encoder_ffn_dim=1536, decoder_ffn_dim=1536),
+    'base': dict(d_model=512, encoder_layers=6, decoder_layers=6, encoder_attention_heads=8,
+                 decoder_attention_heads=8, encoder_ffn_dim=2048, decoder_ffn_dim=2048),
+    'small': dict(d_model=768, encoder_layers=12, decoder_layers=12, encoder_attention_heads=12,
+                  decoder_attention_heads=12, encoder_ffn_dim=3072, decoder_ffn_dim=3072),
+}
+
+
+def build_stub_whisper(size='base'):
+    """Feature extractor and a randomly initialized Whisper model of the given size"""
+    if size not in WHISPER_SHAPES:
+        raise ValueError(f"Unknown Whisper size: {size} (expected one of {', '.join(WHISPER_SHAPES)})")
+    config = WhisperConfig(num_mel_bins=80, max_source_positions=1500, **WHISPER_SHAPES[size])
+    return WhisperFeatureExtractor(feature_size=80), WhisperForConditionalGeneration(config).eval()
+
+
+def build_stub_heads(emotions=MAIN_EMOTIONS):
+    """One randomly initialized FullEmbeddingMLP per emotion"""
+    return {emotion: FullEmbeddingMLP().eval() for emotion in emotions}
+
+
+def build_stub_analyzer(size='base', emotions=MAIN_EMOTIONS, seed=0, tier=None, heads=None):
+    """SentimentAnalyzer wired to stub models; deterministic for a given seed.
+
+    tier names the analyzer's model tier (default: final); heads reuses another stub's heads.
+    """
+    torch.manual_seed(seed)
+    processor, model = build_stub_whisper(size)
+    projection = torch.nn.Linear(model.config.d_model, 768)
+    return SentimentAnalyzer.from_components(
+        processor, model, heads or build_stub_heads(emotions), projection,
+        tier=ModelTier(tier, size) if tier else None,
+    )
@@ -0,0 +1,175 @@
+"""
+Prometheus metrics for the analysis pipeline, exposed by the API at /metrics.
+
+With several uvicorn/gunicorn worker processes, set PROMETHEUS_MULTIPROC_DIR to an
+empty directory shared by the workers so /metrics aggregates all of them.
+
+stage() also records into the StageTimings collector of the current request or job
+(collect_stages), which feeds the Server-Timing header and the analysis_perf table.
+"""
+
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+
+# Pipeline stages go from sub-millisecond (heads on GPU) to minutes (long CPU calls)
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    'feeling_stage_seconds',
+    'Time spent in each analysis stage',
+    ['stage'],
+    buckets=STAGE_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    'feeling_http_request_seconds',
+    'HTTP request latency by route template',
+    ['method', 'route', 'status'],
+    buckets=STAGE_BUCKETS,
+)
+INFERENCE_IN_PROGRESS = Gauge(
+    'feeling_inference_in_progress',
+    'Analyses currently running or waiting for the model in this process',
+    multiprocess_mode='livesum',
+)
+JOB_QUEUE_DEPTH = Gauge(
+    'feeling_job_queue_depth',
+    'Queued and running analysis_jobs rows (sampled at scrape time)',
+    ['status'],
+    multiprocess_mode='max',
+)
+BATCH_SIZE = Histogram(
+    'feeling_inference_batch_size',
+    'Channels per batched model call',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+MODEL_LOAD_SECONDS = Gauge(
+    'feeling_model_load_seconds',
+    'Time taken to load each model component at startup',
+    ['component'],
+    multiprocess_mode='max',
+)
+DB_CONNECT_SECONDS = Histogram(
+    'feeling_db_connection_wait_seconds',
+    'Time spent waiting for a database connection',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+ANALYSIS_AUDIO_MEMORY = Histogram(
+    'feeling_analysis_audio_memory_bytes',
+    'Peak audio buffer memory per analyze_audio call (see ANALYSIS_MEMORY_BUDGET_MB)',
+    buckets=tuple(mb * 1024 * 1024 for mb in (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)),
+)
+ANALYSES_TOTAL = Counter(
+    'feeling_analyses_total',
+    'analyze_audio calls by outcome (ok/error)',
+    ['outcome'],
+)
+
+
+_active_timings = ContextVar('stage_timings', default=None)
+_stage_scope = ContextVar('stage_scope', default=None)
+_trace_stages = ContextVar('trace_stages', default=False)
+
+
+class StageTimings:
+    """Per-stage durations of one request or job, in seconds"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Value for the Server-Timing response header (durations in ms)"""
+        metrics = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        metrics.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+@contextmanager
+def collect_stages():
+    """Collect stage() timings in this context; joins an enclosing collector if there is one"""
+    timings = _active_timings.get()
+    if timings is not None:
+        yield timings
+        return
+    timings = StageTimings()
+    token = _active_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _active_timings.reset(token)
+
+
+def current_timings():
+    return _active_timings.get()
+
+
+@contextmanager
+def stage_scope(prefix):
+    """Record nested stages as "<prefix>.<stage>" (e.g. caller.encoder) in the collector"""
+    token = _stage_scope.set(prefix)
+    try:
+        yield
+    finally:
+        _stage_scope.reset(token)
+
+
+@contextmanager
+def trace_stages():
+    """Label stage() spans with torch.profiler.record_function while a torch profile runs"""
+    token = _trace_stages.set(True)
+    try:
+        yield
+    finally:
+        _trace_stages.reset(token)
+
+
+def _trace_span(label):
+    if not _trace_stages.get():
+        return nullcontext()
+    from torch.profiler import record_function
+    return record_function(label)
+
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage into feeling_stage_seconds{stage=name} and the active collector"""
+    scope = _stage_scope.get()
+    label = f"{scope}.{name}" if scope else name
+    start = time.perf_counter()
+    try:
+        with _trace_span(label):
+            yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(name).observe(elapsed)
+        timings = _active_timings.get()
+        if timings is not None:
+            timings.add(label, elapsed)
+
+
+def render_metrics():
+    """(body, content type) for the /metrics endpoint"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
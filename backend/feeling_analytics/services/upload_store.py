@@ -0,0 +1,248 @@
+"""
+Resumable uploads for large call recordings.
+
+A client creates an upload with the final size, sends byte ranges in any order
+(PATCH with Content-Range) and finalizes it. Each range is written in place into
+one preallocated file at its offset, so parts never need assembling; bytes that
+arrived before a dropped connection are kept, and a retry only sends what
+missing() still reports. Finalize hands the file over by path: renamed into the
+job storage, or analyzed where it is.
+
+State lives next to the data (<id><ext> plus <id>.json) in UPLOAD_STORAGE_DIR,
+so any API worker sharing the directory can serve any request of an upload.
+Keep it on the same filesystem as JOB_STORAGE_DIR so finalize is a rename.
+
+The sidecar is only ever replaced whole (temp file + os.replace), so readers never
+see a partial file; updates to it are serialized with flock on the data file.
+Finalize and delete first claim the upload by renaming <id>.json to <id>.claimed,
+which only one request can do; a finalize that fails renames it back.
+"""
+
+import fcntl
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from .logs import get_logger
+from .serialization import dumps_str
+
+logger = get_logger(__name__)
+
+_UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def merge_ranges(ranges):
+    """Sorted, non-overlapping [start, end) ranges covering the same bytes"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_ranges(received, size):
+    """[start, end) ranges of [0, size) not covered by received"""
+    missing, position = [], 0
+    for start, end in received:
+        if start > position:
+            missing.append([position, start])
+        position = max(position, end)
+    if position < size:
+        missing.append([position, size])
+    return missing
+
+
+class RangeWriter:
+    """Writes consecutive bytes of one range at their offset in the upload file"""
+
+    def __init__(self, fd, start, end):
+        self.fd = fd
+        self.start = start
+        self.end = end
+        self.position = start
+
+    def write(self, data):
+        if self.position + len(data) > self.end:
+            raise ValueError(f"Body is longer than the declared range {self.start}-{self.end - 1}")
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(self.fd, view, self.position)
+            self.position += written
+            view = view[written:]
+
+
+class UploadStore:
+    def __init__(self):
+        self.directory = Path(os.getenv('UPLOAD_STORAGE_DIR', str(Path(__file__).parent.parent.parent / 'upload_storage')))
+        self.ttl_hours = float(os.getenv('UPLOAD_TTL_HOURS', '24'))
+
+    def _read(self, upload_id, suffix='.json'):
+        """(sidecar path, data path, meta); Nones if the id is invalid or the upload is gone (or claimed)"""
+        if not _UPLOAD_ID.match(upload_id or ''):
+            return None, None, None
+        meta_path = self.directory / f"{upload_id}{suffix}"
+        try:
+            meta = json.loads(meta_path.read_text())
+        except FileNotFoundError:
+            return None, None, None
+        return meta_path, self.directory / f"{upload_id}{meta['extension']}", meta
+
+    def _paths(self, upload_id):
+        meta_path, data_path, _ = self._read(upload_id)
+        return meta_path, data_path
+
+    def _write_meta(self, meta_path, meta):
+        """Replace the sidecar atomically: concurrent readers see the old or the new version, never a partial one"""
+        temp_path = meta_path.with_name(f".{meta_path.name}.{uuid.uuid4().hex}.tmp")
+        temp_path.write_text(dumps_str(meta))
+        os.replace(temp_path, meta_path)
+
+    def create(self, filename, size, params=None):
+        """New upload of `size` bytes; the data file is preallocated (sparse) so ranges can land anywhere"""
+        self.purge_expired()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        upload_id = uuid.uuid4().hex
+        meta = {
+            'upload_id': upload_id,
+            'filename': filename,
+            'extension': os.path.splitext(filename)[1].lower(),
+            'size': int(size),
+            'params': params or {},
+            'received': [],
+            'created_at': time.time(),
+        }
+        with open(self.directory / f"{upload_id}{meta['extension']}", 'wb') as f:
+            f.truncate(meta['size'])
+        self._write_meta(self.directory / f"{upload_id}.json", meta)
+        logger.info("📤 Upload %s creado: %s (%d bytes)", upload_id, filename, meta['size'])
+        return self.status(meta)
+
+    def get(self, upload_id):
+        """Upload status (received and missing ranges), or None if unknown or expired"""
+        _, _, meta = self._read(upload_id)
+        return None if meta is None else self.status(meta)
+
+    def status(self, meta):
+        return {
+            **meta,
+            'missing': missing_ranges(meta['received'], meta['size']),
+            'complete': self.is_complete(meta),
+        }
+
+    def is_complete(self, meta):
+        return meta['received'] == [[0, meta['size']]] or meta['size'] == 0
+
+    @contextmanager
+    def write_range(self, upload_id, start, end):
+        """Yield a RangeWriter for bytes [start, end); whatever was written is recorded on exit, even on error"""
+        meta_path, data_path = self._paths(upload_id)
+        if meta_path is None:
+            raise KeyError(upload_id)
+        fd = os.open(data_path, os.O_WRONLY)
+        writer = RangeWriter(fd, start, end)
+        try:
+            yield writer
+        finally:
+            try:
+                if writer.position > start:
+                    self._record(fd, meta_path, start, writer.position)
+            finally:
+                os.close(fd)
+
+    def _record(self, fd, meta_path, start, end):
+        """Add [start, end) to the received ranges; fd is the data file, whose flock serializes sidecar updates"""
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            try:
+                meta = json.loads(meta_path.read_text())
+            except FileNotFoundError:
+                return  # claimed or discarded while this range was arriving
+            meta['received'] = merge_ranges(meta['received'] + [[start, end]])
+            self._write_meta(meta_path, meta)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def claim(self, upload_id):
+        """Data path of the upload, now owned by the caller alone; None if unknown or already claimed.
+
+        Ranges still arriving are not recorded any more. Finish with take() or discard(claimed=True).
+        """
+        meta_path, data_path = self._paths(upload_id)
+        if meta_path is None:
+            return None
+        try:
+            os.rename(meta_path, meta_path.with_suffix('.claimed'))
+        except FileNotFoundError:
+            return None
+        return data_path
+
+    def release(self, upload_id):
+        """Give a claimed upload back unchanged, so it can be finalized again; False if it was not claimed"""
+        claim_path, _, _ = self._read(upload_id, '.claimed')
+        if claim_path is None:
+            return False
+        os.rename(claim_path, claim_path.with_suffix('.json'))
+        return True
+
+    @contextmanager
+    def claimed(self, upload_id):
+        """Claim the upload for the block and yield its data path (None if unknown or already claimed).
+
+        The upload is deleted when the block finishes and released when it raises,
+        so a failed analysis or enqueue does not make the client send it again.
+        """
+        data_path = self.claim(upload_id)
+        if data_path is None:
+            yield None
+            return
+        try:
+            yield data_path
+        except BaseException:
+            self.release(upload_id)
+            raise
+        self.discard(upload_id, claimed=True)
+
+    def take(self, upload_id, destination):
+        """Claim the upload and move its file to destination (a rename on the same filesystem); KeyError if claimed"""
+        with self.claimed(upload_id) as data_path:
+            if data_path is None:
+                raise KeyError(upload_id)
+            shutil.move(str(data_path), str(destination))
+        return Path(destination)
+
+    def discard(self, upload_id, claimed=False):
+        """Delete an upload; claimed=True for one this caller already claimed. False if there was nothing to delete"""
+        if not claimed and self.claim(upload_id) is None:
+            return False
+        claim_path, data_path, _ = self._read(upload_id, '.claimed')
+        if claim_path is None:
+            return False
+        data_path.unlink(missing_ok=True)
+        claim_path.unlink(missing_ok=True)
+        return True
+
+    def purge_expired(self):
+        """Delete uploads created more than UPLOAD_TTL_HOURS ago; returns how many"""
+        if not self.directory.exists():
+            return 0
+        cutoff = time.time() - self.ttl_hours * 3600
+        purged = 0
+        # Claimed uploads left behind by a crashed finalize expire the same way
+        for meta_path in [*self.directory.glob('*.json'), *self.directory.glob('*.claimed')]:
+            try:
+                if json.loads(meta_path.read_text())['created_at'] >= cutoff:
+                    continue
+                if self.discard(meta_path.stem, claimed=meta_path.suffix == '.claimed'):
+                    purged += 1
+            except (OSError, ValueError, KeyError):
+                continue
+        if purged:
+            logger.info("🧹 %d uploads expirados eliminados", purged)
+        return purged
@@ -0,0 +1,167 @@
+"""
+Upload size enforcement without buffering whole files in memory.
+
+BodySizeLimit rejects oversized requests with 413 before the multipart body is
+parsed: from Content-Length when the client sends it, otherwise as soon as the
+streamed body passes the route's limit.
+
+UploadRoute parses multipart bodies with SpoolingMultiPartParser, which writes
+each file part straight into a named temp file instead of Starlette's anonymous
+spool. spool_upload then hard-links that file where the route needs it, so an
+upload is written to disk once; uploads without a named file (or on another
+filesystem) are copied in UPLOAD_CHUNK_BYTES pieces, counting bytes as it goes.
+"""
+
+import asyncio
+import os
+import tempfile
+import uuid
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.formparsers import MultiPartParser, MultiPartException
+from starlette.requests import Request
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Multipart boundaries, part headers and small form fields on top of the file itself
+MULTIPART_SLACK_BYTES = 64 * 1024
+
+
+def _too_large(max_bytes):
+    return HTTPException(status_code=413, detail=f"File too large (max {max_bytes} bytes)")
+
+
+class BodySizeLimit:
+    """ASGI middleware: per-path request body limits, {path: max file bytes}"""
+
+    def __init__(self, app, limits):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.limits.get(scope.get('path')) if scope['type'] == 'http' else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        limit = max_bytes + MULTIPART_SLACK_BYTES
+        headers = dict(scope.get('headers') or [])
+        try:
+            declared = int(headers.get(b'content-length', b''))
+        except ValueError:
+            declared = None
+        if declared is not None and declared > limit:
+            error = _too_large(max_bytes)
+            response = JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit:
+                    # FastAPI re-raises HTTPExceptions from body parsing, so this becomes the 413
+                    raise _too_large(max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def copy_limited(source, destination, max_bytes, chunk_size=UPLOAD_CHUNK_BYTES):
+    """Copy file object source to destination in chunks; raises 413 once more than max_bytes were read"""
+    total = 0
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return total
+        total += len(chunk)
+        if total > max_bytes:
+            raise _too_large(max_bytes)
+        destination.write(chunk)
+
+
+class SpoolingMultiPartParser(MultiPartParser):
+    """Starlette's parser, with file parts written to named temp files that spool_upload can link"""
+
+    def on_headers_finished(self):
+        super().on_headers_finished()
+        upload = self._current_part.file
+        if upload is not None:
+            # Still empty: swap Starlette's anonymous spool for a file with a name.
+            # It is deleted when the form is closed, after the route linked what it keeps
+            spool = upload.file
+            upload.file = tempfile.NamedTemporaryFile(suffix=os.path.splitext(upload.filename or '')[1])
+            self._files_to_close_on_error[-1] = upload.file
+            spool.close()
+
+
+class SpoolingRequest(Request):
+    async def form(self, *, max_files=1000, max_fields=1000, max_part_size=1024 * 1024):
+        if self._form is None and self.headers.get('content-type', '').startswith('multipart/form-data'):
+            parser = SpoolingMultiPartParser(
+                self.headers, self.stream(),
+                max_files=max_files, max_fields=max_fields, max_part_size=max_part_size,
+            )
+            try:
+                self._form = await parser.parse()
+            except MultiPartException as exc:
+                raise HTTPException(status_code=400, detail=exc.message)
+        return await super().form(max_files=max_files, max_fields=max_fields, max_part_size=max_part_size)
+
+
+class UploadRoute(APIRoute):
+    """APIRoute whose requests parse multipart uploads with SpoolingMultiPartParser"""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def spooling_handler(request):
+            return await handler(SpoolingRequest(request.scope, request.receive))
+
+        return spooling_handler
+
+
+def _link_spooled(upload, destination):
+    """Hard-link the upload's named spool file to destination; False if it has none or linking fails"""
+    name = getattr(upload.file, 'name', None)
+    if not isinstance(name, str) or not os.path.isfile(name):
+        return False
+    upload.file.flush()
+    try:
+        os.link(name, destination)
+    except OSError:
+        return False
+    return True
+
+
+def _copy_to(upload, destination, max_bytes):
+    upload.file.seek(0)
+    with open(destination, 'wb') as f:
+        return copy_limited(upload.file, f, max_bytes)
+
+
+async def spool_upload(upload, suffix, max_bytes, destination=None):
+    """(path, size) with the upload's content, at destination or a new temp path; the caller deletes the file"""
+    if upload.size is not None and upload.size > max_bytes:
+        raise _too_large(max_bytes)
+    # Next to the spool file, so the hard link stays on one filesystem
+    name = getattr(upload.file, 'name', None)
+    directory = os.path.dirname(name) if isinstance(name, str) else tempfile.gettempdir()
+    path = str(destination or os.path.join(directory, f"upload_{uuid.uuid4().hex}{suffix}"))
+    try:
+        if await asyncio.to_thread(_link_spooled, upload, path):
+            size = os.path.getsize(path)
+            if size > max_bytes:
+                raise _too_large(max_bytes)
+        else:
+            size = await asyncio.to_thread(_copy_to, upload, path, max_bytes)
+    except BaseException:
+        if os.path.exists(path):
+            os.unlink(path)
+        raise
+    return path, size
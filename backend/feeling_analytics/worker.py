@@ -0,0 +1,149 @@
+"""Analysis worker: drains the analysis_jobs queue filled by POST /api/feeling-analytics/analyze-jobs.
+
+Usage:
+    python -m feeling_analytics.worker [--poll-interval SECONDS] [--visibility-timeout SECONDS] [--once]
+
+Run as many as the hardware allows, on any node that reaches the database and
+shares JOB_STORAGE_DIR with the API. Each loads the model tier a job asks for
+(its "quality" param, FINAL_QUALITY by default) on first use and keeps it, and
+processes one job at a time; SIGTERM/SIGINT finish the current job, then exit.
+While idle, a worker deletes jobs finished more than JOB_RETENTION_DAYS ago (at
+most once per JOB_PURGE_INTERVAL seconds).
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from .services.database_service import DatabaseService
+from .services.job_queue import JobQueue
+from .services.logs import configure_logging, get_logger, log_context
+from .services.telemetry import collect_stages
+
+logger = get_logger(__name__)
+
+JOB_PURGE_INTERVAL = float(os.getenv('JOB_PURGE_INTERVAL', '3600'))
+
+
+class Worker:
+    def __init__(self, router, db_service, queue, poll_interval=2.0, visibility_timeout=None):
+        self.router = router
+        self.db = db_service
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout or queue.visibility_timeout
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._last_purge = 0.0
+
+    def stop(self, *_):
+        logger.info("⏹ Worker %s: stopping after the current job", self.worker_id)
+        self._stop.set()
+
+    def run(self, once=False):
+        logger.info("👷 Worker %s listening for analysis jobs", self.worker_id)
+        while not self._stop.is_set():
+            job = self.queue.claim(self.worker_id, self.visibility_timeout)
+            if job is None:
+                if once:
+                    return
+                self._purge_finished()
+                self._stop.wait(self.poll_interval)
+                continue
+            self.process(job)
+            if once:
+                return
+
+    def process(self, job):
+        job_id = job['id']
+        logger.info("📊 Job %s: %s (attempt %s/%s)", job_id, job['filename'], job['attempts'], job['max_attempts'])
+        lease_lost = threading.Event()
+        done = threading.Event()
+        renewer = threading.Thread(target=self._renew_lease, args=(job_id, done, lease_lost), daemon=True)
+        renewer.start()
+        try:
+            # Stage timings of analysis, transcription and save end up in analysis_perf
+            with collect_stages(), log_context(f"job-{job_id}"):
+                params = job['params'] or {}
+                result = self.router.get(params.get('quality')).analyze_audio(
+                    job['audio_path'], job['filename'], params.get('analyze_channels', 'both')
+                )
+                result['agent_email'] = params.get('agent_email') or 'no-agent'
+                result['agent_name'] = params.get('agent_name') or 'no-agent'
+                result['job_id'] = job_id
+                if lease_lost.is_set():
+                    logger.warning("⚠️ Job %s: lease lost, discarding result", job_id)
+                    return
+                result['saved'] = self.db.save_result(result)
+            if not result['saved']:
+                raise RuntimeError("Could not save result")
+            self.queue.complete(job_id, self.worker_id, result)
+            self._remove_audio(job)
+            logger.info("✓ Job %s done", job_id)
+        except Exception as e:
+            logger.exception("❌ Job %s failed: %s", job_id, e)
+            self.queue.fail(job_id, self.worker_id, e)
+            if job['attempts'] >= job['max_attempts']:
+                self._remove_audio(job)
+        finally:
+            done.set()
+            renewer.join()
+
+    def _purge_finished(self):
+        if time.monotonic() - self._last_purge < JOB_PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            purged = self.queue.purge_finished()
+            if purged:
+                logger.info("🧹 %d finished jobs purged", purged)
+        except Exception as e:
+            logger.warning("Purging finished jobs failed: %s", e)
+
+    def _renew_lease(self, job_id, done, lease_lost):
+        """Extend the lease at a third of the visibility timeout until the job finishes"""
+        while not done.wait(self.visibility_timeout / 3):
+            try:
+                if not self.queue.heartbeat(job_id, self.worker_id, self.visibility_timeout):
+                    lease_lost.set()
+                    return
+            except Exception as e:
+                logger.warning("Lease renewal for job %s failed: %s", job_id, e)
+
+    def _remove_audio(self, job):
+        self.queue.remove_audio(job['audio_path'])
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(prog="python -m feeling_analytics.worker")
+    parser.add_argument("--poll-interval", type=float, default=float(os.getenv('JOB_POLL_INTERVAL', '2')))
+    parser.add_argument("--visibility-timeout", type=int, default=None)
+    parser.add_argument("--once", action="store_true", help="Process at most one job and exit")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    # Imported here so --help works without the model stack
+    from .services.model_tiers import FINAL_QUALITY, ModelRouter
+
+    db_service = DatabaseService()
+    db_service.create_tables()
+    queue = JobQueue(db_service)
+    queue.create_table()
+
+    # Other tiers load on first use; one that fails is logged and served by the
+    # default tier, so only a failed default tier stops the worker
+    router = ModelRouter()
+    router.get(FINAL_QUALITY)
+    worker = Worker(router, db_service, queue, args.poll_interval, args.visibility_timeout)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""UploadStore range bookkeeping and concurrency (run from backend/: python -m pytest tests)"""
+
+import json
+import threading
+
+import pytest
+
+from feeling_analytics.services.upload_store import UploadStore, merge_ranges, missing_ranges
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv('UPLOAD_STORAGE_DIR', str(tmp_path))
+    return UploadStore()
+
+
+def test_merge_ranges():
+    assert merge_ranges([]) == []
+    assert merge_ranges([[10, 20], [0, 5]]) == [[0, 5], [10, 20]]
+    assert merge_ranges([[0, 10], [5, 15], [15, 20]]) == [[0, 20]]
+    assert merge_ranges([[0, 100], [10, 20]]) == [[0, 100]]
+
+
+def test_missing_ranges():
+    assert missing_ranges([], 100) == [[0, 100]]
+    assert missing_ranges([[0, 100]], 100) == []
+    assert missing_ranges([[10, 20], [50, 100]], 100) == [[0, 10], [20, 50]]
+    assert missing_ranges([[0, 30]], 100) == [[30, 100]]
+
+
+def test_write_range_records_bytes(store):
+    upload_id = store.create('call.wav', 10)['upload_id']
+    with store.write_range(upload_id, 4, 10) as writer:
+        writer.write(b'456789')
+    status = store.get(upload_id)
+    assert status['received'] == [[4, 10]]
+    assert status['missing'] == [[0, 4]]
+    assert not status['complete']
+    with pytest.raises(ValueError):
+        with store.write_range(upload_id, 0, 4) as writer:
+            writer.write(b'too long')
+
+
+def test_concurrent_write_range_and_get(store):
+    size, part = 1_000_000, 1_000
+    upload_id = store.create('call.wav', size)['upload_id']
+    errors = []
+    writers_done = threading.Event()
+
+    def write(offsets):
+        try:
+            for start in offsets:
+                with store.write_range(upload_id, start, start + part) as writer:
+                    writer.write(bytes([start // part % 256]) * part)
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        try:
+            while not writers_done.is_set():
+                assert store.get(upload_id) is not None
+        except Exception as e:
+            errors.append(e)
+
+    offsets = list(range(0, size, part))
+    writers = [threading.Thread(target=write, args=(offsets[i::4],)) for i in range(4)]
+    reader = threading.Thread(target=read)
+    reader.start()
+    for thread in writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    writers_done.set()
+    reader.join()
+
+    assert errors == []
+    status = store.get(upload_id)
+    assert status['received'] == [[0, size]]
+    assert status['missing'] == []
+    assert status['complete']
+    data = (store.directory / f"{upload_id}.wav").read_bytes()
+    assert all(data[start] == start // part % 256 for start in offsets)
+
+
+def test_only_one_concurrent_take_wins(store, tmp_path):
+    upload_id = store.create('call.wav', 4)['upload_id']
+    with store.write_range(upload_id, 0, 4) as writer:
+        writer.write(b'data')
+    results = []
+    barrier = threading.Barrier(4)
+
+    def take(index):
+        barrier.wait()
+        try:
+            results.append(store.take(upload_id, tmp_path / f"job_{index}.wav"))
+        except KeyError:
+            results.append(None)
+
+    threads = [threading.Thread(target=take, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    taken = [path for path in results if path is not None]
+    assert len(taken) == 1
+    assert taken[0].read_bytes() == b'data'
+    assert store.get(upload_id) is None
+    assert not store.discard(upload_id)
+    assert not list(store.directory.glob(f"{upload_id}*"))
+
+
+def test_claimed_upload_ignores_late_ranges(store):
+    upload_id = store.create('call.wav', 8)['upload_id']
+    with store.write_range(upload_id, 0, 8) as writer:
+        writer.write(b'abcd')
+        assert store.claim(upload_id) is not None
+        writer.write(b'efgh')
+    assert store.get(upload_id) is None
+    claimed = json.loads((store.directory / f"{upload_id}.claimed").read_text())
+    assert claimed['received'] == []
+    assert store.discard(upload_id, claimed=True)
+    assert not list(store.directory.glob(f"{upload_id}*"))
+
+
+def test_failed_finalize_releases_upload(store):
+    upload_id = store.create('call.wav', 4)['upload_id']
+    with store.write_range(upload_id, 0, 4) as writer:
+        writer.write(b'data')
+    with pytest.raises(RuntimeError):
+        with store.claimed(upload_id) as data_path:
+            assert store.get(upload_id) is None
+            raise RuntimeError("analysis failed")
+    status = store.get(upload_id)
+    assert status['complete']
+    assert data_path.read_bytes() == b'data'
+
+    with store.claimed(upload_id) as data_path:
+        with store.claimed(upload_id) as second:
+            assert second is None
+    assert store.get(upload_id) is None
+    assert not list(store.directory.glob(f"{upload_id}*"))
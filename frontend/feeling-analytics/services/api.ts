@@ -120,4 +120,52 @@ export class FeelingAnalyticsAPI {
       throw error
     }
   }
+
+  static async getRecordsBatch(
+    idCalls: string[],
+  ): Promise<{ records: Record<string, SentimentAnalysisResult>; missing: string[] }> {
+    try {
+      const response = await fetch(`${API_BASE_URL}/api/feeling-analytics/records:batchGet`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ id_calls: idCalls }),
+      })
+
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${await response.text()}`)
+      }
+
+      return await response.json()
+    } catch (error) {
+      if (error instanceof TypeError && error.message.includes("fetch")) {
+        throw new Error("Backend no disponible")
+      }
+      throw error
+    }
+  }
+
+  // Server-Sent Events feed of saved results; returns a function that closes the stream.
+  // Fold each result's stats_delta into the last "statistics" snapshot; on "resync",
+  // refetch. Results already counted by the snapshot (data_version at or below its own)
+  // are skipped, and "invalidate" (retention, backfills) is reported as "resync".
+  static subscribeToResults(
+    onEvent: (type: "statistics" | "result" | "resync", data: any) => void,
+    agentEmail?: string,
+  ): () => void {
+    const query = agentEmail ? `?agent_email=${encodeURIComponent(agentEmail)}` : ""
+    const source = new EventSource(`${API_BASE_URL}/api/feeling-analytics/stream${query}`)
+    let dataVersion = 0
+    for (const type of ["statistics", "result", "resync", "invalidate"] as const) {
+      source.addEventListener(type, (event) => {
+        const data = JSON.parse((event as MessageEvent).data)
+        if (type === "statistics") {
+          dataVersion = data.data_version ?? 0
+        } else if (data.data_version !== undefined && data.data_version <= dataVersion) {
+          return
+        }
+        onEvent(type === "invalidate" ? "resync" : type, data)
+      })
+    }
+    return () => source.close()
+  }
 }